@@ -0,0 +1,331 @@
+"""
+Pool of persistent background Blender processes for model conversion.
+
+Starting Blender costs seconds per launch, which adds up over ~5,500 .preinstanced
+files when every model gets its own process. Here each worker is started once
+(Pipeline/blender_worker.py inside `blender --background`), loads the importer script
+once, and then receives jobs as JSON lines over its stdin pipe, resetting the scene
+between jobs and answering with a per-file status line.
+
+A worker that exits or stops answering within the job timeout is killed and
+respawned; its job is retried on a fresh worker up to max_retries times and then
+reported as failed. The convert command journals every model (Pipeline/journal.py), so
+an interrupted run resumes with the first model it had not finished. With a dedup index
+(RemakeRegistry/dedup.py) only canonical models are converted; duplicates get links to
+their outputs.
+
+The pool is a standalone tool: the models stage of main.py still runs Modules.Model.run,
+and no importer script ships with it, so --importer must point at one.
+
+Usage:
+    python Pipeline/blender_pool.py convert --importer <script.py> [--workers 4] [--export glb fbx] [--all]
+"""
+
+import os
+import sys
+import json
+import queue
+import shutil
+import threading
+import subprocess
+from collections import namedtuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Pipeline.governor import default_governor
+from printer import Logger, colours
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blender_worker.py")
+TEMPLATE_PATH = "blank.blend"
+PROJECT_CONFIG_PATH = "project.json"
+DEFAULT_POOL_SIZE = max(1, min(4, (os.cpu_count() or 1) // 2))
+STARTUP_TIMEOUT = 120
+JOB_TIMEOUT = 600
+MARKER = "@@blender_pool "  # Must match blender_worker.MARKER; that module only imports inside Blender
+
+ModelJob = namedtuple("ModelJob", ["id", "source", "outputs", "options"])
+JobResult = namedtuple("JobResult", ["job", "status", "seconds", "error", "worker", "attempts"])
+
+log = Logger("blender_pool")
+
+class WorkerCrashed(Exception):
+    pass
+
+def find_blender(config_path=PROJECT_CONFIG_PATH):
+    """Returns Blender from project.json (RemakeEngine.Tools.Blender) or PATH, or None."""
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            configured = json.load(f).get("RemakeEngine", {}).get("Tools", {}).get("Blender")
+        if configured and os.path.isfile(configured):
+            return configured
+    except (OSError, ValueError):
+        pass
+    return shutil.which("blender")
+
+class BlenderWorker:
+    """One background Blender process and the thread reading its stdout."""
+
+    def __init__(self, blender, importer, template=None, name="worker"):
+        self.name = name
+        command = [blender, "--background", "--factory-startup", "--python", WORKER_SCRIPT, "--", "--importer", importer]
+        if template:
+            command += ["--template", template]
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                         text=True, encoding="utf-8", errors="replace", bufsize=1)
+        self.messages = queue.Queue()
+        self.reader = threading.Thread(target=self._read, daemon=True)
+        self.reader.start()
+
+    def _read(self):
+        for line in self.process.stdout:
+            if line.startswith(MARKER):
+                self.messages.put(json.loads(line[len(MARKER):]))
+            else:
+                log.debug(f"[{self.name}] {line.rstrip()}")
+        self.messages.put(None)  # Process exited
+
+    def _next_message(self, timeout):
+        try:
+            message = self.messages.get(timeout=timeout)
+        except queue.Empty:
+            raise WorkerCrashed(f"no answer within {timeout}s")
+        if message is None:
+            raise WorkerCrashed(f"Blender exited with code {self.process.wait()}")
+        return message
+
+    def wait_ready(self, timeout=STARTUP_TIMEOUT):
+        message = self._next_message(timeout)
+        if message.get("event") != "ready":
+            raise WorkerCrashed(message.get("error", f"unexpected startup message {message}"))
+
+    def run(self, job, timeout=JOB_TIMEOUT):
+        """Sends one job and returns the worker's status message for it."""
+        try:
+            self.process.stdin.write(json.dumps(job._asdict()) + "\n")
+            self.process.stdin.flush()
+        except OSError as e:
+            raise WorkerCrashed(f"pipe closed: {e}")
+        while True:
+            message = self._next_message(timeout)
+            if message.get("id") == job.id:
+                return message
+
+    def close(self, timeout=10):
+        if self.process.poll() is None:
+            try:
+                self.process.stdin.write(json.dumps({"quit": True}) + "\n")
+                self.process.stdin.close()
+                self.process.wait(timeout)
+            except (OSError, subprocess.TimeoutExpired):
+                self.kill()
+
+    def kill(self):
+        self.process.kill()
+        self.process.wait()
+
+class BlenderPool:
+    """
+    Usage:
+        with BlenderPool(importer="Modules/Model/importer.py", size=4) as pool:
+            for result in pool.map(jobs):
+                ...
+    """
+
+    def __init__(self, importer, size=DEFAULT_POOL_SIZE, blender=None, template=TEMPLATE_PATH,
+                 job_timeout=JOB_TIMEOUT, max_retries=1):
+        self.blender = blender or find_blender()
+        if not self.blender:
+            raise FileNotFoundError("Blender not found: set RemakeEngine.Tools.Blender in project.json or add it to PATH")
+        self.importer = os.path.abspath(importer)
+        self.template = os.path.abspath(template) if template and os.path.isfile(template) else None
+        self.size = max(1, size)
+        self.job_timeout = job_timeout
+        self.max_retries = max_retries
+        self.respawns = 0
+        self._workers = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _spawn(self, slot):
+        worker = BlenderWorker(self.blender, self.importer, self.template, name=f"blender-{slot}")
+        with self._lock:
+            self._workers.append(worker)
+        try:
+            worker.wait_ready()
+        except Exception:
+            self._retire(worker)
+            raise
+        log.verbose(f"[blender-{slot}] ready (pid {worker.process.pid})")
+        return worker
+
+    def _retire(self, worker):
+        worker.kill()
+        with self._lock:
+            self._workers.remove(worker)
+
+    def _serve(self, slot, jobs, results):
+        worker = None
+        while True:
+            item = jobs.get()
+            if item is None:
+                break
+            job, attempt = item
+            try:
+                # The governor admits each job against the machine's CPU and RAM budget
+                with default_governor().slot("blender") as admission:
+                    if worker is None:
+                        worker = self._spawn(slot)
+                    admission.track(worker.process.pid)
+                    message = worker.run(job, self.job_timeout)
+                results.put(JobResult(job, message["status"], message.get("seconds", 0.0), message.get("error"), worker.name, attempt))
+            except WorkerCrashed as e:
+                if worker is not None:
+                    self._retire(worker)
+                    worker = None
+                with self._lock:
+                    self.respawns += 1
+                if attempt <= self.max_retries:
+                    log.warning(f"[blender-{slot}] crashed on {job.source} ({e}); retrying")
+                    jobs.put((job, attempt + 1))
+                else:
+                    results.put(JobResult(job, "failed", 0.0, f"worker crashed: {e}", f"blender-{slot}", attempt))
+            except Exception as e:
+                # Anything else (Blender not found, a reply without a status) fails only this job;
+                # the worker's state is unknown, so it is replaced before the next one
+                if worker is not None:
+                    self._retire(worker)
+                    worker = None
+                log.error(f"[blender-{slot}] {job.source}: {type(e).__name__}: {e}")
+                results.put(JobResult(job, "failed", 0.0, f"{type(e).__name__}: {e}", f"blender-{slot}", attempt))
+        if worker is not None:
+            worker.close()
+            with self._lock:
+                self._workers.remove(worker)
+
+    def map(self, jobs):
+        """Runs every job and yields a JobResult per job, in completion order."""
+        jobs = list(jobs)
+        pending = queue.Queue()
+        results = queue.Queue()
+        for job in jobs:
+            pending.put((job, 1))
+        threads = [threading.Thread(target=self._serve, args=(slot, pending, results), daemon=True)
+                   for slot in range(min(self.size, len(jobs)))]
+        for thread in threads:
+            thread.start()
+        for _ in range(len(jobs)):
+            yield results.get()
+        for _ in threads:
+            pending.put(None)
+        for thread in threads:
+            thread.join()
+
+    def close(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
+
+def model_jobs(entries, export=()):
+    """Builds ModelJobs from asset_index model entries, using their predicted stage paths."""
+    stages = [".blend"] + [f".{fmt}" for fmt in export]
+    jobs = []
+    for entry in entries:
+        outputs = {stage: entry["stages"][stage]["path"] for stage in stages if stage in entry["stages"]}
+        jobs.append(ModelJob(len(jobs), entry["sourcePath"], outputs, {}))
+    return jobs
+
+def convert_models(importer, entries, size=DEFAULT_POOL_SIZE, export=(), journal=None, **pool_options):
+    """
+    Converts model entries on a Blender pool. With a Pipeline.journal.Journal every
+    model is journaled as it finishes, and models finished by an interrupted run
+    (same source hash) are left out.
+
+    Returns:
+        list of JobResult.
+    """
+    log.start()
+    results = []
+    if journal is not None:
+        hashes = {entry["sourcePath"]: entry["fileHash"] for entry in entries}
+        todo = set(journal.pending("models", list(hashes), hashes.get))
+        if len(todo) < len(hashes):
+            log.info(f"Resuming: {len(hashes) - len(todo)} models were already converted by the interrupted run", colours.CYAN)
+        entries = [entry for entry in entries if entry["sourcePath"] in todo]
+    jobs = model_jobs(entries, export)
+    log.info(f"Converting {len(jobs)} models on {min(size, len(jobs))} Blender workers", colours.CYAN)
+    with BlenderPool(importer, size, **pool_options) as pool:
+        for result in pool.map(jobs):
+            results.append(result)
+            if journal is not None:
+                journal.record("models", result.job.source, result.status, hashes[result.job.source])
+            log.progress()
+            log.count(result.status)
+            if result.status == "done":
+                log.verbose(f"{result.job.source}: {result.seconds:.1f}s on {result.worker}")
+            else:
+                log.error(f"{result.job.source}: {result.error}")
+        if pool.respawns:
+            log.warning(f"{pool.respawns} Blender workers were respawned")
+    log.summary()
+    return results
+
+if __name__ == "__main__":
+    import argparse
+    from RemakeRegistry.dedup import (DEDUP_INDEX_PATH, load_dedup_index, split_duplicates, propagate_outputs,
+                                      canonical_paths)
+    from RemakeRegistry.build_state import load_build_state, save_build_state, plan_stage, record_outputs
+    from RemakeRegistry.registry_stream import iter_assets, resolve_index_path
+    from Pipeline.journal import Journal
+    parser = argparse.ArgumentParser(description="Convert models on a pool of persistent Blender workers")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    convert_parser = subparsers.add_parser("convert", help="Convert stale (or --all) models from the asset index")
+    convert_parser.add_argument("--importer", required=True, help="Script defining import_file(source_path, options)")
+    convert_parser.add_argument("--workers", type=int, default=DEFAULT_POOL_SIZE, help="Blender processes")
+    convert_parser.add_argument("--export", nargs="+", choices=["glb", "fbx"], default=[])
+    convert_parser.add_argument("--all", action="store_true", help="Convert every model, not just stale ones")
+    convert_parser.add_argument("--blender", help="Blender executable (default: project.json or PATH)")
+    convert_parser.add_argument("--template", default=TEMPLATE_PATH, help="Scene reopened between jobs")
+    convert_parser.add_argument("--timeout", type=float, default=JOB_TIMEOUT, help="Seconds per model before the worker is restarted")
+    convert_parser.add_argument("--fresh", action="store_true", help="Start over instead of resuming an interrupted run")
+    convert_parser.add_argument("--no-dedup", action="store_true", help="Convert duplicate models too instead of linking them")
+    convert_parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    if args.verbose:
+        log.set_level("verbose")
+
+    state = load_build_state()
+    if args.all:
+        entries = list(iter_assets(resolve_index_path(), "models"))
+    else:
+        entries = [entry for entry, _ in plan_stage("models", ".blend", state)[0]]
+    dedup_index, duplicates = None, []
+    if not args.no_dedup and os.path.exists(DEDUP_INDEX_PATH):
+        dedup_index = load_dedup_index()
+        entries, duplicates = split_duplicates(entries, dedup_index, "models")
+        log.info(f"{len(duplicates)} duplicate models will be linked to their canonical output", colours.CYAN)
+    with Journal("models", fresh=args.fresh) as journal:
+        try:
+            results = convert_models(args.importer, entries, args.workers, args.export, journal, blender=args.blender,
+                                     template=args.template, job_timeout=args.timeout)
+        except FileNotFoundError as e:
+            parser.error(str(e))
+        # Includes models converted by the interrupted run this one resumed
+        record_outputs(state, "models", ".blend", [entry for entry in entries if journal.is_done("models", entry["sourcePath"])])
+        if duplicates:
+            for stage in [".blend"] + [f".{fmt}" for fmt in args.export]:
+                propagate_outputs(dedup_index, "models", stage)
+            # A duplicate is built once its canonical model is built from the same content
+            built = state.get("models", {}).get(".blend", {})
+            canonical = canonical_paths(dedup_index, "models")
+            record_outputs(state, "models", ".blend",
+                           [entry for entry in duplicates if built.get(canonical[entry["sourcePath"]]) == entry["fileHash"]])
+        save_build_state(state)
+        failed = any(result.status != "done" for result in results)
+        if not failed:
+            journal.finish_run()
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,90 @@
+"""
+Long-lived Blender worker for Pipeline/blender_pool.py. Runs inside Blender:
+
+    blender --background --factory-startup --python Pipeline/blender_worker.py -- --importer <script.py> [--template blank.blend]
+
+The importer script is loaded once and must define import_file(source_path, options),
+which imports one model into the current scene. Jobs arrive as JSON lines on stdin:
+
+    {"id": 3, "source": "...preinstanced", "outputs": {".blend": "...", ".glb": "..."}, "options": {}}
+
+For each job the scene is reset (the template is reopened, or factory settings with an
+empty scene are loaded), the model is imported and every requested output is written.
+Status lines go to stdout prefixed with MARKER so they can be told apart from Blender's
+own output; {"quit": true} or end of input stops the worker.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import traceback
+import importlib.util
+
+import bpy
+
+MARKER = "@@blender_pool "
+
+def reply(**message):
+    sys.stdout.write(MARKER + json.dumps(message) + "\n")
+    sys.stdout.flush()
+
+def load_importer(path):
+    spec = importlib.util.spec_from_file_location("blender_pool_importer", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if not hasattr(module, "import_file"):
+        raise AttributeError(f"{path} does not define import_file(source_path, options)")
+    return module
+
+def reset_scene(template):
+    if template:
+        bpy.ops.wm.open_mainfile(filepath=template, load_ui=False)
+    else:
+        bpy.ops.wm.read_factory_settings(use_empty=True)
+
+def write_output(stage, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if stage == ".blend":
+        bpy.ops.wm.save_as_mainfile(filepath=path)
+    elif stage == ".glb":
+        bpy.ops.export_scene.gltf(filepath=path, export_format="GLB")
+    elif stage == ".fbx":
+        bpy.ops.export_scene.fbx(filepath=path)
+    else:
+        raise ValueError(f"Unsupported output stage {stage}")
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="blender_worker")
+    parser.add_argument("--importer", required=True)
+    parser.add_argument("--template")
+    args = parser.parse_args(argv)
+
+    try:
+        importer = load_importer(args.importer)
+    except Exception as e:
+        reply(event="error", error=f"{type(e).__name__}: {e}")
+        return
+    reply(event="ready", pid=os.getpid())
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        job = json.loads(line)
+        if job.get("quit"):
+            break
+        start = time.perf_counter()
+        try:
+            reset_scene(args.template)
+            importer.import_file(job["source"], job.get("options", {}))
+            # Write the .blend first so exports see the same saved scene
+            for stage in sorted(job["outputs"], key=lambda stage: stage != ".blend"):
+                write_output(stage, job["outputs"][stage])
+            reply(id=job["id"], status="done", seconds=time.perf_counter() - start)
+        except Exception as e:
+            reply(id=job["id"], status="failed", seconds=time.perf_counter() - start,
+                  error=f"{type(e).__name__}: {e}", trace=traceback.format_exc())
+
+if __name__ == "__main__":
+    main(sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else [])
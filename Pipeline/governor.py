@@ -0,0 +1,268 @@
+"""
+Resource-aware admission of external tool processes.
+
+Blender, ffmpeg, vgmstream-cli, Noesis and QuickBMS need very different amounts of CPU
+and memory. Each tool has a ToolProfile (threads it keeps busy, peak RSS in MiB), and a
+job only starts once its threads fit in the free CPU budget and its expected RSS fits in
+the free RAM budget, so mixed stages can share the machine without swapping.
+
+Profiles adapt: while jobs run, a sampler reads the RSS of each job's process tree from
+/proc. A job is charged the larger of its estimate and its measured RSS, and after it ends
+the tool's estimate moves towards the measured peak. Learned estimates are kept in
+RemakeRegistry/tool_profiles.json for the next run, saved at most every SAVE_INTERVAL
+while jobs finish and once more at shutdown. Without /proc (Windows) the
+static profiles are used as they are.
+
+Usage:
+    with default_governor().slot("quickbms") as slot:
+        process = subprocess.Popen(...)
+        slot.track(process.pid)
+        process.wait()
+
+    python Pipeline/governor.py status
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+import subprocess
+from contextlib import contextmanager
+from collections import namedtuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from printer import Logger, colours
+
+ToolProfile = namedtuple("ToolProfile", ["threads", "rss_mb"])
+
+# Starting points; rss_mb is replaced by measured peaks as jobs finish
+TOOL_PROFILES = {
+    "blender": ToolProfile(threads=2, rss_mb=1500),
+    "ffmpeg": ToolProfile(threads=4, rss_mb=300),
+    "vgmstream": ToolProfile(threads=1, rss_mb=50),
+    "noesis": ToolProfile(threads=1, rss_mb=400),
+    "quickbms": ToolProfile(threads=1, rss_mb=100),
+}
+DEFAULT_PROFILE = ToolProfile(threads=1, rss_mb=200)
+LEARNED_PROFILES_PATH = "RemakeRegistry/tool_profiles.json"
+SAMPLE_INTERVAL = 0.5
+RAM_RESERVE_MB = 512  # Never start a job while less than this is available
+RAM_BUDGET_FRACTION = 0.9  # Of the memory available when the governor starts
+LEARNING_RATE = 0.3
+PEAK_MARGIN = 1.1
+SAVE_INTERVAL = 30  # Seconds between saves of learned estimates
+
+log = Logger("governor")
+
+def proc_available():
+    return os.path.isdir("/proc/self")
+
+def mem_available_mb():
+    """MemAvailable from /proc/meminfo in MiB, or None without /proc."""
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def process_rss_mb(pid):
+    """RSS of pid and all of its descendants in MiB, 0 once it has exited."""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status", "r") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+                        break
+            with open(f"/proc/{current}/task/{current}/children", "r") as f:
+                pending.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return total / 1024
+
+class Slot:
+    """An admitted job; track() the process it starts so its memory is measured."""
+
+    def __init__(self, tool, threads, estimate_mb):
+        self.tool = tool
+        self.threads = threads
+        self.estimate_mb = estimate_mb
+        self.pids = []
+        self.current_mb = 0.0
+        self.peak_mb = 0.0
+
+    def track(self, pid):
+        self.pids.append(pid)
+
+    @property
+    def charged_mb(self):
+        return max(self.estimate_mb, self.current_mb)
+
+class Governor:
+    def __init__(self, cpu_budget=None, ram_budget_mb=None, profiles=None, learned_path=LEARNED_PROFILES_PATH):
+        self.cpu_budget = cpu_budget or os.cpu_count() or 1
+        available = mem_available_mb()
+        if ram_budget_mb is None:
+            ram_budget_mb = available * RAM_BUDGET_FRACTION if available is not None else float("inf")
+        self.ram_budget_mb = ram_budget_mb
+        self.profiles = dict(TOOL_PROFILES if profiles is None else profiles)
+        self.learned_path = learned_path
+        self.estimates = {tool: profile.rss_mb for tool, profile in self.profiles.items()}
+        self._load_learned()
+        self.running = []
+        self.measuring = proc_available()
+        self._condition = threading.Condition()
+        self._sampler = None
+        self._stop_sampler = None
+        self._save_lock = threading.Lock()
+        self._unsaved = False
+        self._last_save = time.monotonic()
+
+    def _load_learned(self):
+        if not self.learned_path:
+            return
+        try:
+            with open(self.learned_path, "r", encoding="utf-8") as f:
+                self.estimates.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+
+    def save_learned(self):
+        if not self.learned_path:
+            return
+        with self._condition:
+            estimates = {tool: round(mb, 1) for tool, mb in sorted(self.estimates.items())}
+            self._unsaved = False
+            self._last_save = time.monotonic()
+        with self._save_lock:
+            os.makedirs(os.path.dirname(self.learned_path) or ".", exist_ok=True)
+            temp_path = self.learned_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(estimates, f, indent=1)
+            os.replace(temp_path, self.learned_path)
+
+    def profile(self, tool):
+        return self.profiles.get(tool, DEFAULT_PROFILE)
+
+    def estimate_mb(self, tool):
+        return self.estimates.get(tool, self.profile(tool).rss_mb)
+
+    def _fits(self, threads, estimate_mb):
+        if not self.running:
+            return True  # Always let one job through, however large
+        free_cpu = self.cpu_budget - sum(slot.threads for slot in self.running)
+        free_ram = self.ram_budget_mb - sum(slot.charged_mb for slot in self.running)
+        if threads > free_cpu or estimate_mb > free_ram:
+            return False
+        available = mem_available_mb() if self.measuring else None
+        return available is None or available - RAM_RESERVE_MB >= estimate_mb
+
+    def acquire(self, tool):
+        threads = min(self.profile(tool).threads, self.cpu_budget)
+        with self._condition:
+            slot = Slot(tool, threads, self.estimate_mb(tool))
+            waited = time.monotonic()
+            while not self._fits(slot.threads, slot.estimate_mb):
+                # Re-checked whenever a job ends or memory is re-sampled
+                self._condition.wait(SAMPLE_INTERVAL)
+            if time.monotonic() - waited > SAMPLE_INTERVAL:
+                log.verbose(f"{tool}: waited {time.monotonic() - waited:.1f}s for {threads} threads / {slot.estimate_mb:.0f} MiB")
+            self.running.append(slot)
+            if self.measuring and self._sampler is None:
+                self._stop_sampler = threading.Event()
+                self._sampler = threading.Thread(target=self._sample, args=(self._stop_sampler,), daemon=True)
+                self._sampler.start()
+        return slot
+
+    def release(self, slot):
+        with self._condition:
+            self.running.remove(slot)
+            if slot.peak_mb > 0:
+                target = slot.peak_mb * PEAK_MARGIN
+                self.estimates[slot.tool] = self.estimate_mb(slot.tool) * (1 - LEARNING_RATE) + target * LEARNING_RATE
+                self._unsaved = True
+            save = self._unsaved and time.monotonic() - self._last_save >= SAVE_INTERVAL
+            self._condition.notify_all()
+        # Written outside the lock so waiting jobs are not held up by the file write
+        if save:
+            self.save_learned()
+
+    def shutdown(self):
+        """Stops the memory sampler and saves any learned estimates not yet on disk."""
+        with self._condition:
+            sampler, stop = self._sampler, self._stop_sampler
+            self._sampler = self._stop_sampler = None
+        if sampler is not None:
+            stop.set()
+            sampler.join()
+        if self._unsaved:
+            self.save_learned()
+
+    @contextmanager
+    def slot(self, tool):
+        """Admits one job of tool for the duration of the with block."""
+        slot = self.acquire(tool)
+        try:
+            yield slot
+        finally:
+            self.release(slot)
+
+    def _sample(self, stop):
+        while not stop.wait(SAMPLE_INTERVAL):
+            with self._condition:
+                slots = list(self.running)
+            for slot in slots:
+                slot.current_mb = sum(process_rss_mb(pid) for pid in slot.pids)
+                slot.peak_mb = max(slot.peak_mb, slot.current_mb)
+            with self._condition:
+                self._condition.notify_all()
+
+    def run(self, tool, command, **popen_options):
+        """subprocess.run() for an external tool, admitted and measured by the governor."""
+        with self.slot(tool) as slot:
+            process = subprocess.Popen(command, **popen_options)
+            slot.track(process.pid)
+            stdout, stderr = process.communicate()
+        return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
+
+_default = None
+_default_lock = threading.Lock()
+
+def default_governor():
+    """The governor shared by every stage in this process."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Governor()
+            atexit.register(_default.shutdown)
+        return _default
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Show the governor's budgets and tool profiles")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="Budgets and the current estimate per tool")
+    subparsers.add_parser("reset", help="Forget learned RSS estimates")
+    args = parser.parse_args()
+
+    if args.command == "reset":
+        if os.path.exists(LEARNED_PROFILES_PATH):
+            os.remove(LEARNED_PROFILES_PATH)
+        log.info(f"Removed {LEARNED_PROFILES_PATH}", colours.GREEN)
+    else:
+        governor = Governor()
+        ram = "unlimited (no /proc)" if governor.ram_budget_mb == float("inf") else f"{governor.ram_budget_mb:.0f} MiB"
+        log.info(f"CPU budget: {governor.cpu_budget} threads, RAM budget: {ram}", colours.CYAN)
+        for tool in sorted(set(governor.profiles) | set(governor.estimates)):
+            profile = governor.profile(tool)
+            log.info(f"  {tool}: {profile.threads} threads, {governor.estimate_mb(tool):.0f} MiB "
+                     f"(profile {profile.rss_mb} MiB)")
+    log.flush()
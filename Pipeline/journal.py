@@ -0,0 +1,155 @@
+"""
+Append-only, resumable journal of completed work units.
+
+Each long job (the "Run all Steps" pipeline, parallel extraction, the Blender pool)
+keeps its own journal, RemakeRegistry/journal_<name>.ndjson. One JSON line is written per
+finished unit (one asset or archive in one stage) as a single O_APPEND write followed by
+fsync, so a crash or Ctrl-C leaves at most one torn last line, which is ignored on load.
+
+    {"event": "run_start", "run": "20261017-101500"}
+    {"run": "...", "stage": "extract", "unit": "...\\Map_3-05.str", "status": "done", "fingerprint": "...", "data": {...}}
+    {"run": "...", "event": "stage_done", "stage": "extract", "status": "done"}
+    {"run": "...", "event": "run_done"}
+
+If the last run has no run_done line, the next Journal resumes it: units and stages it
+finished are reported done (as long as their fingerprint still matches) and everything
+else runs again. Once a run is done, the next one starts over with a fresh file.
+"""
+
+import os
+import json
+import time
+import threading
+
+JOURNAL_DIR = "RemakeRegistry"
+
+def journal_path(name):
+    return os.path.join(JOURNAL_DIR, f"journal_{name}.ndjson")
+
+def read_records(path):
+    """Yields every complete record of a journal; a torn or garbled last line is skipped."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+    except FileNotFoundError:
+        return
+
+class Journal:
+    """
+    Usage:
+        with Journal("pipeline") as journal:
+            for unit in journal.pending("extract", units):
+                ...
+                journal.record("extract", unit)
+            journal.finish_stage("extract")
+            journal.finish_run()
+    """
+
+    def __init__(self, name, sync=True, fresh=False):
+        self.name = name
+        self.path = journal_path(name)
+        self.sync = sync
+        self.run_id = None
+        self.resumed = False
+        self.units = {}  # (stage, unit) -> record
+        self.stages = {}  # stage -> status
+        self._lock = threading.Lock()
+        if not fresh:
+            self._load()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if not self.resumed:
+            # The previous run finished (or there was none): start a fresh file
+            with open(self.path, "w", encoding="utf-8"):
+                pass
+        else:
+            self._drop_torn_line()
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0))
+        if not self.resumed:
+            self.run_id = time.strftime("%Y%m%d-%H%M%S")
+            self._append({"event": "run_start", "run": self.run_id})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _load(self):
+        finished = True
+        for record in read_records(self.path):
+            event = record.get("event")
+            if event == "run_start":
+                self.run_id, finished = record["run"], False
+                self.units, self.stages = {}, {}
+            elif event == "run_done":
+                finished = True
+            elif event == "stage_done":
+                self.stages[record["stage"]] = record["status"]
+            elif "unit" in record:
+                self.units[(record["stage"], record["unit"])] = record
+        self.resumed = self.run_id is not None and not finished
+        if not self.resumed:
+            self.units, self.stages = {}, {}
+
+    def _drop_torn_line(self):
+        """Cuts a partly written last line so the next record starts on a line of its own."""
+        with open(self.path, "rb+") as f:
+            content = f.read()
+            if content and not content.endswith(b"\n"):
+                f.truncate(content.rfind(b"\n") + 1)
+
+    def _append(self, record):
+        line = (json.dumps(record) + "\n").encode("utf-8")
+        with self._lock:
+            os.write(self._fd, line)
+            if self.sync:
+                os.fsync(self._fd)
+
+    def is_done(self, stage, unit, fingerprint=None):
+        """True if unit finished in this run and, when given, its fingerprint is unchanged."""
+        record = self.units.get((stage, unit))
+        if record is None or record["status"] != "done":
+            return False
+        return fingerprint is None or record.get("fingerprint") == fingerprint
+
+    def data(self, stage, unit):
+        """The data stored with a finished unit, or None."""
+        record = self.units.get((stage, unit))
+        return record.get("data") if record else None
+
+    def pending(self, stage, units, fingerprint=None):
+        """
+        Returns the units still to do, in order. fingerprint is an optional
+        callable unit -> str; a unit whose fingerprint changed is redone.
+        """
+        return [unit for unit in units if not self.is_done(stage, unit, fingerprint(unit) if fingerprint else None)]
+
+    def record(self, stage, unit, status="done", fingerprint=None, data=None):
+        record = {"run": self.run_id, "stage": stage, "unit": unit, "status": status}
+        if fingerprint is not None:
+            record["fingerprint"] = fingerprint
+        if data is not None:
+            record["data"] = data
+        self._append(record)
+        self.units[(stage, unit)] = record
+
+    def stage_finished(self, stage):
+        return self.stages.get(stage) in ("done", "skipped")
+
+    def finish_stage(self, stage, status="done"):
+        self._append({"run": self.run_id, "event": "stage_done", "stage": stage, "status": status})
+        self.stages[stage] = status
+
+    def finish_run(self):
+        self._append({"run": self.run_id, "event": "run_done"})
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,192 @@
+"""
+On-demand profiling of pipeline stages and registry builders.
+
+With --profile each stage is wrapped in one of two profilers:
+
+    cprofile  cProfile over the stage's thread; writes <run>_<stage>.pstats and prints
+              the functions with the most cumulative time.
+    sample    a stack sampler that records every SAMPLE_INTERVAL where the stage's thread
+              (and the threads it starts) are; writes <run>_<stage>.collapsed, one
+              "frame;frame;frame count" line per stack, for flamegraph.pl or speedscope.
+              Its overhead does not grow with the number of calls, so it suits long stages.
+              Threads started by a concurrently running stage can show up in both.
+    auto      sample for stages the last telemetry report timed at LONG_STAGE_SECONDS or
+              more, cprofile otherwise.
+
+Files go to RemakeRegistry/profiles. Read a .pstats file with
+    python -m pstats RemakeRegistry/profiles/<run>_<stage>.pstats
+"""
+
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+from collections import Counter
+
+from Pipeline.telemetry import TELEMETRY_DIR, list_reports, load_report
+from printer import Logger, colours
+
+PROFILE_DIR = "RemakeRegistry/profiles"
+PROFILE_MODES = ("auto", "cprofile", "sample")
+LONG_STAGE_SECONDS = 120
+SAMPLE_INTERVAL = 0.01
+TOP_FUNCTIONS = 15
+
+log = Logger("profiler", flush_interval=0)
+
+# Threads already being sampled for a stage, so concurrent samplers do not claim each other's
+_claimed_threads = set()
+_claimed_lock = threading.Lock()
+
+def profile_path(run_id, stage, extension, directory=PROFILE_DIR):
+    return os.path.join(directory, f"{run_id}_{stage}.{extension}")
+
+def last_wall_seconds(stage, directory=TELEMETRY_DIR):
+    """The stage's wall time in the newest telemetry report that ran it, or None."""
+    for run_id in reversed(list_reports(directory)):
+        try:
+            report = load_report(run_id, directory)
+        except (OSError, ValueError):
+            continue
+        for row in report.get("stages", []):
+            if row["stage"] == stage and row["status"] == "done":
+                return row["wallSeconds"]
+    return None
+
+def choose_mode(stage, mode="auto"):
+    if mode != "auto":
+        return mode
+    seconds = last_wall_seconds(stage)
+    return "sample" if seconds is not None and seconds >= LONG_STAGE_SECONDS else "cprofile"
+
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class StackSampler:
+    """
+    Samples the stacks of the thread that calls start() and of threads started after it.
+
+    Usage:
+        sampler = StackSampler()
+        sampler.start()
+        ...
+        sampler.stop()
+        sampler.write("stage.collapsed")
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._target = None
+        self._existing = set()
+
+    def start(self):
+        self._target = threading.get_ident()
+        self._existing = set(sys._current_frames())
+        with _claimed_lock:
+            _claimed_threads.add(self._target)
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def _owned(self, ident, names):
+        if ident == self._target:
+            return True
+        return (ident not in self._existing and ident not in _claimed_threads
+                and names.get(ident) != "stack-sampler")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if not self._owned(ident, names):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        with _claimed_lock:
+            _claimed_threads.discard(self._target)
+
+    def write(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def top(self, limit=TOP_FUNCTIONS):
+        """(frame, share of samples) for the frames most often on top of a stack."""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return [(frame, count / total) for frame, count in leaves.most_common(limit)]
+
+def profiled(stage, action, run_id=None, mode="auto", directory=PROFILE_DIR):
+    """
+    Wraps action so each call is profiled and the result written under directory.
+
+    Args:
+        stage: Name used in the output file, next to run_id.
+        run_id: Defaults to the time the call starts; pass the telemetry run ID so
+            profiles and reports line up.
+        mode: One of PROFILE_MODES, or None to return action unprofiled.
+    """
+    if mode is None:
+        return action
+
+    def run():
+        label = run_id or time.strftime("%Y%m%d-%H%M%S")
+        chosen = choose_mode(stage, mode)
+        profile = None
+        if chosen == "cprofile":
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Python 3.12+ allows one cProfile at a time; concurrent stages fall back to sampling
+                profile = None
+        sampler = None
+        if profile is None:
+            sampler = StackSampler()
+            sampler.start()
+        try:
+            return action()
+        finally:
+            if profile is not None:
+                profile.disable()
+                path = profile_path(label, stage, "pstats", directory)
+                os.makedirs(directory, exist_ok=True)
+                profile.dump_stats(path)
+                report_cprofile(stage, path)
+            else:
+                sampler.stop()
+                path = profile_path(label, stage, "collapsed", directory)
+                sampler.write(path)
+                report_samples(stage, sampler, path)
+    return run
+
+def report_cprofile(stage, path):
+    stats = pstats.Stats(path)
+    log.info(f"[{stage}] cProfile written to {path}; top {TOP_FUNCTIONS} by cumulative time:", colours.CYAN)
+    rows = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:TOP_FUNCTIONS]
+    for (filename, line, name), (_, calls, own, cumulative, _) in rows:
+        log.info(f"  {cumulative:9.3f}s cum {own:9.3f}s own {calls:>9} calls  {name} ({os.path.basename(filename)}:{line})")
+    log.flush()
+
+def report_samples(stage, sampler, path):
+    log.info(f"[{stage}] {sampler.samples} stack samples written to {path}; most frequent frames:", colours.CYAN)
+    for frame, share in sampler.top():
+        log.info(f"  {share:6.1%}  {frame}")
+    log.flush()
@@ -0,0 +1,189 @@
+"""
+Dependency-graph scheduler for the conversion pipeline.
+
+Each Stage declares the paths it reads (inputs) and writes (outputs). A stage depends
+on every stage that writes a path its inputs lie in (or under), plus any stage named in
+`after`. Stages whose dependencies are finished run concurrently on threads, as long
+as their combined `cost` fits in the pipeline's worker budget, so independent chains
+(e.g. audio and video next to extract -> models) overlap instead of adding up.
+
+A stage that fails or is blocked makes every stage depending on it "blocked"; the rest
+of the graph still runs.
+"""
+
+import os
+import re
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from printer import Logger, colours
+
+DEFAULT_BUDGET = os.cpu_count() or 1
+
+StageResult = namedtuple("StageResult", ["name", "status", "seconds", "error"])
+
+log = Logger("pipeline", flush_interval=0)
+
+def path_key(path):
+    """Splits a path into lowercase components, accepting both separators."""
+    return [part for part in re.split(r"[\\/]+", path.lower()) if part and part != "."]
+
+def overlaps(produced, consumed):
+    """True when consumed lies inside produced or produced inside consumed."""
+    a, b = path_key(produced), path_key(consumed)
+    shorter = min(len(a), len(b))
+    return a[:shorter] == b[:shorter]
+
+class Stage:
+    """
+    One unit of pipeline work.
+
+    Args:
+        name: Unique stage name.
+        action: Callable run on a worker thread. A False return value marks the stage failed.
+        inputs / outputs: Paths read and written; used to derive dependencies.
+        after: Names of stages that must finish first regardless of paths.
+        cost: Share of the worker budget the stage occupies while running.
+        skip_if: Optional callable; when it returns True the stage is recorded as
+            "skipped" and its dependents still run.
+        metrics: Optional dict the action fills in for reporting (see Pipeline/telemetry.py).
+    """
+
+    def __init__(self, name, action, inputs=(), outputs=(), after=(), cost=1, skip_if=None, metrics=None):
+        self.name = name
+        self.action = action
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.after = list(after)
+        self.cost = max(1, cost)
+        self.skip_if = skip_if
+        self.metrics = metrics if metrics is not None else {}
+
+class Pipeline:
+    def __init__(self, stages, budget=DEFAULT_BUDGET):
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Stage names must be unique")
+        self.budget = max(1, budget)
+        self.dependencies = self._resolve_dependencies()
+        self.listeners = []
+
+    def _resolve_dependencies(self):
+        dependencies = {}
+        for stage in self.stages.values():
+            needs = set()
+            for other in self.stages.values():
+                if other is stage:
+                    continue
+                if any(overlaps(out, inp) for out in other.outputs for inp in stage.inputs):
+                    needs.add(other.name)
+            for name in stage.after:
+                if name not in self.stages:
+                    raise ValueError(f"Stage {stage.name} runs after unknown stage {name}")
+                needs.add(name)
+            dependencies[stage.name] = needs
+        self._check_acyclic(dependencies)
+        return dependencies
+
+    @staticmethod
+    def _check_acyclic(dependencies):
+        state = {}
+
+        def visit(name, trail):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Pipeline has a dependency cycle: {' -> '.join(trail + [name])}")
+            state[name] = "visiting"
+            for dependency in sorted(dependencies[name]):
+                visit(dependency, trail + [name])
+            state[name] = "done"
+
+        for name in dependencies:
+            visit(name, [])
+
+    def chain_length(self, name):
+        """Number of stages on the longest dependency chain ending at name."""
+        return 1 + max((self.chain_length(dep) for dep in self.dependencies[name]), default=0)
+
+    def add_listener(self, callback):
+        """callback(event, stage_name, result_or_None) is called on "start" and "finish"."""
+        self.listeners.append(callback)
+
+    def _notify(self, event, name, result=None):
+        for callback in self.listeners:
+            callback(event, name, result)
+
+    def _run_stage(self, stage):
+        start = time.perf_counter()
+        try:
+            if stage.skip_if is not None and stage.skip_if():
+                return StageResult(stage.name, "skipped", time.perf_counter() - start, None)
+            ok = stage.action()
+            status = "failed" if ok is False else "done"
+            return StageResult(stage.name, status, time.perf_counter() - start, None)
+        except Exception as e:
+            return StageResult(stage.name, "failed", time.perf_counter() - start, f"{type(e).__name__}: {e}")
+
+    def run(self, only=None):
+        """
+        Runs the graph (or just `only` plus everything they depend on).
+
+        Returns:
+            dict of stage name -> StageResult, in completion order.
+        """
+        wanted = set(self.stages)
+        if only is not None:
+            wanted = set()
+            pending_names = list(only)
+            while pending_names:
+                name = pending_names.pop()
+                if name not in wanted:
+                    wanted.add(name)
+                    pending_names.extend(self.dependencies[name])
+
+        pending = [name for name in self.stages if name in wanted]
+        results = {}
+        running = {}
+        free = self.budget
+
+        with ThreadPoolExecutor(max_workers=len(pending) or 1) as executor:
+            while pending or running:
+                # Blocked stages resolve immediately
+                for name in list(pending):
+                    failed = [dep for dep in self.dependencies[name]
+                              if dep in results and results[dep].status in ("failed", "blocked")]
+                    if failed:
+                        pending.remove(name)
+                        results[name] = StageResult(name, "blocked", 0.0, f"depends on failed stage {failed[0]}")
+                        log.warning(f"[{name}] blocked: {results[name].error}")
+                        self._notify("finish", name, results[name])
+
+                # Start ready stages, longest remaining chain first, while the budget allows
+                ready = [name for name in pending if all(dep in results for dep in self.dependencies[name] if dep in wanted)]
+                ready.sort(key=lambda name: -self.chain_length(name))
+                for name in ready:
+                    cost = min(self.stages[name].cost, self.budget)
+                    if cost > free and running:
+                        continue
+                    pending.remove(name)
+                    free -= cost
+                    log.info(f"[{name}] started (cost {cost}, {free}/{self.budget} free)", colours.YELLOW)
+                    self._notify("start", name)
+                    running[executor.submit(self._run_stage, self.stages[name])] = (name, cost)
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, cost = running.pop(future)
+                    free += cost
+                    result = future.result()
+                    results[name] = result
+                    colour = colours.GREEN if result.status in ("done", "skipped") else colours.RED
+                    detail = f": {result.error}" if result.error else ""
+                    log.info(f"[{name}] {result.status} in {result.seconds:.1f}s{detail}", colour)
+                    self._notify("finish", name, result)
+        log.flush()
+        return results
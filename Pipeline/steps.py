@@ -0,0 +1,300 @@
+"""
+The "Run all Steps" stages and the paths they read and write.
+
+    extract   USRDIR                      -> quickbms_out
+    models    quickbms_out                -> Model\\GameFiles\\blend_out
+    textures  quickbms_out                -> Texture\\GameFiles\\Textures_out
+    video     USRDIR\\Assets_1_Video_Movies -> Video\\GameFiles\\Assets_1_Video_Movies
+    audio     USRDIR\\Assets_1_Audio_Streams -> Audio\\GameFiles\\Assets_1_Audio_Streams
+
+Video and audio read USRDIR directly, so they only share the worker budget with
+extraction and start straight away; models and textures wait for extract. Converter
+stages only run when the build state says some of their outputs are stale.
+
+Every stage calls its Modules.<name>.run main() on a pipeline thread of this process, so
+concurrent stages share the working directory, module globals and the console. A main()
+must not chdir, and must not keep state in globals another module reads. Output from
+concurrent stages interleaves. The guards below check for the first problem and
+serialise prompts, but cannot detect shared globals:
+
+    guarded             restores the working directory if a stage changed it, and fails that stage
+    serialised_prompts  asks input() prompts one at a time, each labelled with its stage
+"""
+
+import os
+import time
+import builtins
+import threading
+import contextlib
+from pathlib import Path
+
+from Pipeline.scheduler import Stage, Pipeline, DEFAULT_BUDGET
+from Pipeline.journal import Journal
+from Pipeline.telemetry import Telemetry
+from Pipeline.profiler import profiled
+from RemakeRegistry.build_state import (OUTPUT_STAGES, load_build_state, save_build_state, plan_stage,
+                                        record_outputs, summarise)
+from RemakeRegistry.registry_stream import resolve_index_path
+from printer import print, colours
+
+USRDIR_PATH = 'Modules\\Extract\\GameFiles\\USRDIR'
+EXTRACT_OUTPUT_PATH = 'Modules\\Extract\\GameFiles\\quickbms_out'
+MODEL_OUTPUT_PATH = 'Modules\\Model\\GameFiles\\blend_out'
+TEXTURE_OUTPUT_PATH = 'Modules\\Texture\\GameFiles\\Textures_out'
+VIDEO_INPUT_PATH = USRDIR_PATH + '\\Assets_1_Video_Movies'
+VIDEO_OUTPUT_PATH = 'Modules\\Video\\GameFiles\\Assets_1_Video_Movies'
+AUDIO_INPUT_PATH = USRDIR_PATH + '\\Assets_1_Audio_Streams'
+AUDIO_OUTPUT_PATH = 'Modules\\Audio\\GameFiles\\Assets_1_Audio_Streams'
+
+# Share of the worker budget each stage occupies. Model conversion drives Blender and
+# is the heaviest; audio decoding is a single process.
+STAGE_COSTS = {
+    "extract": 2,
+    "models": 4,
+    "textures": 2,
+    "video": 2,
+    "audio": 1,
+}
+
+# Converter stages run concurrently and share build_state.json
+build_state_lock = threading.Lock()
+
+# input() from concurrent stages is asked one prompt at a time
+prompt_lock = threading.Lock()
+_stage_context = threading.local()
+
+def guarded(stage):
+    """Wraps a stage's action so a change of working directory is undone and fails the stage."""
+    action = stage.action
+
+    def run():
+        cwd = os.getcwd()
+        _stage_context.name = stage.name
+        try:
+            result = action()
+        finally:
+            _stage_context.name = None
+            moved = os.getcwd()
+            if moved != cwd:
+                os.chdir(cwd)
+        if moved != cwd:
+            raise RuntimeError(f"changed the working directory to {moved} while other stages share it")
+        return result
+    return run
+
+@contextlib.contextmanager
+def serialised_prompts():
+    """While stages run, input() calls are taken one at a time and prefixed with the asking stage."""
+    original = builtins.input
+
+    def prompt(message=""):
+        name = getattr(_stage_context, "name", None)
+        with prompt_lock:
+            return original(f"[{name}] {message}" if name else message)
+    builtins.input = prompt
+    try:
+        yield
+    finally:
+        builtins.input = original
+
+def has_output(path, pattern=None):
+    """True if path exists and holds any entry (or any file matching pattern)."""
+    path = Path(path)
+    if not path.exists():
+        return False
+    if pattern is None:
+        return any(path.iterdir())
+    return any(f for f in path.glob(pattern) if f.is_file())
+
+def module_missing(module):
+    if not Path(f'Modules\\{module}').exists():
+        print(colours.RED, f"{module} module not found. Skipping.")
+        return True
+    return False
+
+def models_pending():
+    """True when the models stage may run, i.e. its options need asking for."""
+    if not Path('Modules\\Model').exists():
+        return False
+    if not Path(resolve_index_path()).exists():
+        return not has_output(MODEL_OUTPUT_PATH)
+    return bool(plan_stage("models", state=load_build_state())[0])
+
+def run_extract():
+    from StrArchive import extract as str_extract
+    from StrArchive import manifest as extract_manifest
+    verify_report = extract_manifest.verify_extraction()
+    if verify_report is None:
+        tools = (str_extract.QUICKBMS_PATH, str_extract.BMS_SCRIPT_PATH)
+        if all(Path(str_extract.native_path(tool)).is_file() for tool in tools):
+            print(colours.CYAN, "No extraction manifest found. Extracting archives in parallel with QuickBMS (StrArchive.extract)...")
+            # Records the manifest and journals each archive, so an interrupted run resumes
+            return str_extract.main(engine="quickbms")
+        # Fallback: the module's own serial extractor, which may find QuickBMS elsewhere
+        import Modules.Extract.run as run_qbms
+        print(colours.CYAN, f"No extraction manifest found and no QuickBMS at {tools[0]}. Running Archive Extraction (run_qbms)...")
+        run_qbms.main()
+        _, incomplete = extract_manifest.snapshot_extraction(EXTRACT_OUTPUT_PATH, USRDIR_PATH)
+        if incomplete:
+            print(colours.RED, f"Extraction is incomplete for {len(incomplete)} archives; run it again to repair them.")
+            return False
+    elif verify_report["bad"]:
+        print(colours.CYAN, f"Re-extracting missing or corrupt files from {len(verify_report['bad'])} archives...")
+        return extract_manifest.repair_extraction(verify_report)
+    else:
+        print(colours.CYAN, f"Extraction output in '{EXTRACT_OUTPUT_PATH}' matches the manifest. Skipping extraction.")
+
+def run_models(model_options):
+    import Modules.Model.run as run_model
+    if model_options is None:
+        print(colours.RED, "Model conversion configuration cancelled. Skipping.")
+        return
+    print(colours.CYAN, "Running Model Conversion (run_model)...")
+    run_model.main(**model_options)
+
+def run_textures():
+    import Modules.Texture.run as run_texture
+    print(colours.CYAN, "Running Texture Extraction (run_texture)...")
+    run_texture.main()
+
+def run_video():
+    import Modules.Video.run as run_video
+    print(colours.CYAN, "Running Video Conversion (run_video)...")
+    run_video.main()
+
+def run_audio(project_path):
+    import Modules.Audio.run as run_audio
+    print(colours.CYAN, "Running Audio Conversion (run_audio)...")
+    run_audio.main(project_path=project_path)
+
+class AssetStage:
+    """
+    Skip check and action wrapper for a converter stage, driven by the build state.
+
+    With an asset index present, the stage is skipped only when no asset's predicted
+    output is stale (see RemakeRegistry/build_state.py), and afterwards every stale
+    output that was written is recorded as built. Without an index it falls back to
+    the old "output folder is populated" check.
+    """
+
+    def __init__(self, module, asset_type, output_path, pattern, description):
+        self.module = module
+        self.asset_type = asset_type
+        self.output_path = output_path
+        self.pattern = pattern
+        self.description = description
+        self.stale = []
+        self.metrics = {"assetType": asset_type}
+
+    def skip(self):
+        if module_missing(self.module):
+            return True
+        if not Path(resolve_index_path()).exists():
+            if has_output(self.output_path, self.pattern):
+                print(colours.CYAN, f"Output directory '{self.output_path}' is populated and there is no asset index. Skipping {self.description}.")
+                return True
+            return False
+        stage = OUTPUT_STAGES[self.asset_type]
+        with build_state_lock:
+            state = load_build_state()
+            self.stale, adopted = plan_stage(self.asset_type, stage, state)
+            if adopted:
+                record_outputs(state, self.asset_type, stage, adopted)
+                save_build_state(state)
+        if not self.stale:
+            print(colours.CYAN, f"All {self.asset_type} outputs are up to date. Skipping {self.description}.")
+            return True
+        print(colours.CYAN, summarise(self.asset_type, stage, self.stale))
+        return False
+
+    def wrap(self, action):
+        def run():
+            start = time.time()
+            try:
+                return action()
+            finally:
+                # Record whatever was built, even if the converter failed part way
+                if self.stale:
+                    stage = OUTPUT_STAGES[self.asset_type]
+                    with build_state_lock:
+                        state = load_build_state()
+                        recorded = record_outputs(state, self.asset_type, stage, [entry for entry, _ in self.stale], since=start)
+                        save_build_state(state)
+                    self.metrics.update(units=len(self.stale), failed=len(self.stale) - recorded)
+                    colour = colours.GREEN if recorded == len(self.stale) else colours.YELLOW
+                    print(colour, f"{self.asset_type}: built {recorded} of {len(self.stale)} stale outputs")
+        return run
+
+def build_stages(project_path, model_options=None):
+    """
+    Args:
+        project_path: Project root, passed on to the audio module.
+        model_options: run_model.main keyword arguments (verbose, debug_sleep, export),
+            or None if the user cancelled the model prompts.
+    """
+    models = AssetStage("Model", "models", MODEL_OUTPUT_PATH, None, "model conversion")
+    textures = AssetStage("Texture", "textures", TEXTURE_OUTPUT_PATH, None, "texture extraction")
+    video = AssetStage("Video", "video", VIDEO_OUTPUT_PATH, '*.ogv', "video conversion")
+    audio = AssetStage("Audio", "audio", AUDIO_OUTPUT_PATH, '*.wav', "audio conversion")
+    return [
+        Stage("extract", run_extract, inputs=[USRDIR_PATH], outputs=[EXTRACT_OUTPUT_PATH],
+              cost=STAGE_COSTS["extract"], skip_if=lambda: module_missing("Extract"), metrics={"assetType": "archives"}),
+        Stage("models", models.wrap(lambda: run_models(model_options)), inputs=[EXTRACT_OUTPUT_PATH], outputs=[MODEL_OUTPUT_PATH],
+              cost=STAGE_COSTS["models"], skip_if=models.skip, metrics=models.metrics),
+        Stage("textures", textures.wrap(run_textures), inputs=[EXTRACT_OUTPUT_PATH], outputs=[TEXTURE_OUTPUT_PATH],
+              cost=STAGE_COSTS["textures"], skip_if=textures.skip, metrics=textures.metrics),
+        Stage("video", video.wrap(run_video), inputs=[VIDEO_INPUT_PATH], outputs=[VIDEO_OUTPUT_PATH],
+              cost=STAGE_COSTS["video"], skip_if=video.skip, metrics=video.metrics),
+        Stage("audio", audio.wrap(lambda: run_audio(project_path)), inputs=[AUDIO_INPUT_PATH], outputs=[AUDIO_OUTPUT_PATH],
+              cost=STAGE_COSTS["audio"], skip_if=audio.skip, metrics=audio.metrics),
+    ]
+
+def resume_from(journal, stage):
+    """Makes stage skip itself when the journal says it finished in the interrupted run."""
+    skip_if = stage.skip_if
+
+    def skip():
+        if journal.stage_finished(stage.name):
+            print(colours.CYAN, f"Stage {stage.name} finished in the interrupted run. Skipping.")
+            return True
+        return skip_if is not None and skip_if()
+    stage.skip_if = skip
+    return stage
+
+def run_all(project_path, model_options=None, budget=DEFAULT_BUDGET, stages=None, resume=True, profile=None):
+    """
+    Runs every stage (or just the names in stages), independent ones concurrently.
+
+    Finished stages are journaled; if the previous run was interrupted or had failures,
+    its finished stages are skipped (resume=False starts over). Each stage is measured
+    and a telemetry report is written and compared with the last one (Pipeline/telemetry.py).
+    With profile (a Pipeline.profiler.PROFILE_MODES value) every stage is also profiled.
+    Stages share this process (see the module docstring); each is guarded and prompts are serialised.
+
+    Returns:
+        dict of stage name -> StageResult.
+    """
+    with Journal("pipeline", fresh=not resume) as journal:
+        if journal.resumed:
+            finished = [name for name in journal.stages if journal.stage_finished(name)]
+            print(colours.CYAN, f"Resuming run {journal.run_id} ({', '.join(finished) or 'no stages'} already finished)")
+        telemetry = Telemetry()
+        selected = [resume_from(journal, stage) for stage in build_stages(project_path, model_options)
+                    if stages is None or stage.name in stages]
+        for stage in selected:
+            stage.action = guarded(stage)
+            stage.action = profiled(stage.name, stage.action, telemetry.run_id, profile)
+            telemetry.instrument(stage)
+        pipeline = Pipeline(selected, budget)
+        pipeline.add_listener(lambda event, name, result: journal.finish_stage(name, result.status)
+                              if event == "finish" and result.status in ("done", "skipped") else None)
+        pipeline.add_listener(telemetry.on_event)
+        with serialised_prompts():
+            results = pipeline.run()
+        telemetry.finish()
+        if not any(result.status in ("failed", "blocked") for result in results.values()):
+            journal.finish_run()
+    failed = [result for result in results.values() if result.status in ("failed", "blocked")]
+    for result in failed:
+        print(colours.RED, f"Stage {result.name} {result.status}: {result.error or 'see output above'}")
+    return results
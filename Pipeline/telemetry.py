@@ -0,0 +1,311 @@
+"""
+Per-stage performance telemetry for pipeline runs.
+
+Every measured stage records:
+
+    wallSeconds     time the stage's action ran
+    cpuSeconds      CPU time of this process and its finished child processes meanwhile
+    filesIn/bytesIn files and bytes under the stage's input paths when it started
+    filesOut/bytesOut files written (modified) under its output paths while it ran
+    filesPerSecond  filesOut / wallSeconds
+    peakRssMb       peak RSS of this process and all its children while it ran
+    units/failures  assets the stage had to build and how many it did not (converter
+                    stages), or 1 failure for a stage that failed outright
+
+CPU time and RSS are process-wide, so stages that ran at the same time share them;
+such stages list each other under "overlapped". Without /proc (Windows) peakRssMb is
+empty and child CPU time is not counted.
+
+Each run writes RemakeRegistry/telemetry/<run>.json (stages plus totals per asset type)
+and <run>.csv (one row per stage), then prints a comparison with the previous report.
+
+Usage:
+    python Pipeline/telemetry.py show [run]
+    python Pipeline/telemetry.py compare [old_run] [new_run]
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fastwalk import walk_files
+from Pipeline.governor import proc_available, process_rss_mb
+from printer import Logger, colours, format_bytes
+
+TELEMETRY_DIR = "RemakeRegistry/telemetry"
+SAMPLE_INTERVAL = 0.5
+REGRESSION_RATIO = 0.10  # Slower by more than this is reported as a regression...
+REGRESSION_SECONDS = 1.0  # ...if it is also slower by at least this much
+CSV_FIELDS = ["stage", "assetType", "status", "wallSeconds", "cpuSeconds", "filesIn", "bytesIn",
+              "filesOut", "bytesOut", "filesPerSecond", "peakRssMb", "units", "failures", "overlapped", "error"]
+
+log = Logger("telemetry", flush_interval=0)
+
+def tree_totals(paths, since=None):
+    """
+    Counts files and bytes under paths; missing paths count as empty.
+
+    Args:
+        since: Optional time.time() value; only files modified at or after it count.
+
+    Returns:
+        (files, bytes)
+    """
+    files = total = 0
+    for entry in walk_files([path for path in paths if os.path.isdir(path)]):
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        if since is None or stat.st_mtime >= since:
+            files += 1
+            total += stat.st_size
+    return files, total
+
+def cpu_seconds():
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+def report_path(run_id, extension="json", directory=TELEMETRY_DIR):
+    return os.path.join(directory, f"{run_id}.{extension}")
+
+def list_reports(directory=TELEMETRY_DIR):
+    """Run IDs with a JSON report, oldest first."""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(name[:-len(".json")] for name in names if name.endswith(".json"))
+
+def load_report(run_id, directory=TELEMETRY_DIR):
+    with open(report_path(run_id, "json", directory), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+class Telemetry:
+    """
+    Usage:
+        telemetry = Telemetry()
+        for stage in stages:
+            telemetry.instrument(stage)
+        pipeline.add_listener(telemetry.on_event)
+        pipeline.run()
+        telemetry.finish()
+    """
+
+    def __init__(self, run_id=None, directory=TELEMETRY_DIR, measure_io=True):
+        self.run_id = run_id or time.strftime("%Y%m%d-%H%M%S")
+        self.directory = directory
+        self.measure_io = measure_io
+        self.started = time.time()
+        self.records = {}  # stage -> record
+        self.running = set()
+        self.measuring = proc_available()
+        self._lock = threading.Lock()
+        self._sampler = None
+
+    def measure(self, name, action, inputs=(), outputs=(), metrics=None):
+        """
+        Wraps action so running it records a telemetry entry for stage name.
+
+        Args:
+            metrics: Optional dict the action fills in; "assetType", "units" and
+                "failed" are copied into the record after the action returns.
+        """
+        def run():
+            record = {"stage": name, "assetType": None, "status": "failed", "units": None, "failures": 0,
+                      "peakRssMb": None, "error": None}
+            if self.measure_io:
+                record["filesIn"], record["bytesIn"] = tree_totals(inputs)
+            with self._lock:
+                record["overlapped"] = set(self.running)
+                for other in self.running:
+                    self.records[other]["overlapped"].add(name)
+                self.running.add(name)
+                self.records[name] = record
+            self._start_sampler()
+            started, wall, cpu = time.time(), time.perf_counter(), cpu_seconds()
+            try:
+                ok = action()
+                record["status"] = "failed" if ok is False else "done"
+                return ok
+            except BaseException as e:
+                record["error"] = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                record["wallSeconds"] = time.perf_counter() - wall
+                record["cpuSeconds"] = cpu_seconds() - cpu
+                with self._lock:
+                    self.running.discard(name)
+                if self.measure_io:
+                    record["filesOut"], record["bytesOut"] = tree_totals(outputs, since=started)
+                    record["filesPerSecond"] = record["filesOut"] / max(record["wallSeconds"], 1e-9)
+                if metrics:
+                    record["assetType"] = metrics.get("assetType")
+                    record["units"] = metrics.get("units")
+                    record["failures"] = metrics.get("failed", 0)
+                if record["status"] == "failed" and not record["failures"]:
+                    record["failures"] = 1
+        return run
+
+    def instrument(self, stage):
+        """Measures a Pipeline.scheduler.Stage's action from its inputs, outputs and metrics."""
+        stage.action = self.measure(stage.name, stage.action, stage.inputs, stage.outputs, stage.metrics)
+        return stage
+
+    def on_event(self, event, name, result):
+        """Pipeline listener: adds stages that never ran (skipped, blocked) and final statuses."""
+        if event != "finish":
+            return
+        with self._lock:
+            record = self.records.setdefault(name, {"stage": name, "assetType": None, "wallSeconds": result.seconds,
+                                                    "units": None, "failures": 0, "overlapped": set()})
+        record["status"] = result.status
+        record["error"] = result.error or record.get("error")
+        if result.status in ("failed", "blocked") and not record["failures"]:
+            record["failures"] = 1
+
+    def _start_sampler(self):
+        if not self.measuring:
+            return
+        with self._lock:
+            if self._sampler is not None:
+                return
+            self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+
+    def _sample(self):
+        pid = os.getpid()
+        while True:
+            with self._lock:
+                running = list(self.running)
+            if running:
+                rss = process_rss_mb(pid)
+                with self._lock:
+                    for name in running:
+                        record = self.records[name]
+                        record["peakRssMb"] = max(record["peakRssMb"] or 0.0, rss)
+            time.sleep(SAMPLE_INTERVAL)
+
+    def report(self):
+        """The run's report as a JSON-ready dict."""
+        stages = []
+        by_type = {}
+        for record in self.records.values():
+            row = {field: record.get(field) for field in CSV_FIELDS}
+            row["overlapped"] = sorted(record.get("overlapped", ()))
+            for field in ("wallSeconds", "cpuSeconds", "filesPerSecond", "peakRssMb"):
+                if row[field] is not None:
+                    row[field] = round(row[field], 3)
+            stages.append(row)
+            totals = by_type.setdefault(row["assetType"] or row["stage"], {
+                "wallSeconds": 0.0, "cpuSeconds": 0.0, "filesOut": 0, "bytesOut": 0, "units": 0, "failures": 0})
+            for field in totals:
+                totals[field] += row.get(field) or 0
+        for totals in by_type.values():
+            totals["filesPerSecond"] = round(totals["filesOut"] / totals["wallSeconds"], 3) if totals["wallSeconds"] else None
+        return {
+            "run": self.run_id,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "wallSeconds": round(time.time() - self.started, 3),
+            "stages": stages,
+            "assetTypes": by_type,
+        }
+
+    def write(self):
+        """Writes <run>.json and <run>.csv. Returns the report."""
+        report = self.report()
+        os.makedirs(self.directory, exist_ok=True)
+        json_path = report_path(self.run_id, "json", self.directory)
+        with open(json_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+        os.replace(json_path + ".tmp", json_path)
+        with open(report_path(self.run_id, "csv", self.directory), "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            for row in report["stages"]:
+                writer.writerow(dict(row, overlapped=" ".join(row["overlapped"])))
+        return report
+
+    def finish(self):
+        """Writes this run's report and prints it next to the previous one."""
+        previous = [run_id for run_id in list_reports(self.directory) if run_id < self.run_id]
+        report = self.write()
+        show(report)
+        if previous:
+            compare(load_report(previous[-1], self.directory), report)
+        log.info(f"Telemetry written to {report_path(self.run_id, 'json', self.directory)}", colours.GRAY)
+        log.flush()
+        return report
+
+def show(report):
+    log.info(f"Run {report['run']}: {report['wallSeconds']:.1f}s", colours.CYAN)
+    for row in report["stages"]:
+        line = f"  {row['stage']:<9} {row['status']:<8} {row['wallSeconds'] or 0:7.1f}s wall"
+        if row.get("cpuSeconds") is not None:
+            line += f" {row['cpuSeconds']:7.1f}s cpu"
+        if row.get("filesOut") is not None:
+            line += f"  {row['filesIn']} files / {format_bytes(row['bytesIn'])} in"
+            line += f"  {row['filesOut']} files / {format_bytes(row['bytesOut'])} out ({row['filesPerSecond']:.1f} files/s)"
+        if row.get("peakRssMb") is not None:
+            line += f"  peak {row['peakRssMb']:.0f} MiB"
+        if row.get("failures"):
+            line += f"  {row['failures']} failed" + (f" of {row['units']}" if row.get("units") else "")
+        log.info(line, colours.RED if row["failures"] else colours.RESET)
+    log.flush()
+
+def change(old, new):
+    if not old:
+        return ""
+    return f" ({(new - old) / old:+.0%})"
+
+def compare(old, new):
+    """Prints stage by stage how new differs from old; slower stages are flagged."""
+    log.info(f"Compared with run {old['run']}:", colours.CYAN)
+    old_stages = {row["stage"]: row for row in old["stages"]}
+    for row in new["stages"]:
+        before = old_stages.get(row["stage"])
+        if before is None or before["status"] != "done" or row["status"] != "done":
+            state = "new stage" if before is None else f"{before['status']} -> {row['status']}"
+            log.info(f"  {row['stage']:<9} {state}", colours.GRAY)
+            continue
+        slower = row["wallSeconds"] - before["wallSeconds"]
+        regression = slower >= REGRESSION_SECONDS and slower > before["wallSeconds"] * REGRESSION_RATIO
+        line = (f"  {row['stage']:<9} {before['wallSeconds']:.1f}s -> {row['wallSeconds']:.1f}s"
+                f"{change(before['wallSeconds'], row['wallSeconds'])}")
+        if row.get("filesPerSecond") is not None and before.get("filesPerSecond") is not None:
+            line += (f", {before['filesPerSecond']:.1f} -> {row['filesPerSecond']:.1f} files/s"
+                     f"{change(before['filesPerSecond'], row['filesPerSecond'])}")
+        if row.get("peakRssMb") is not None and before.get("peakRssMb") is not None:
+            line += f", peak {before['peakRssMb']:.0f} -> {row['peakRssMb']:.0f} MiB"
+        if (row.get("failures") or 0) != (before.get("failures") or 0):
+            line += f", failures {before.get('failures') or 0} -> {row.get('failures') or 0}"
+        log.info(line + ("  REGRESSION" if regression else ""), colours.RED if regression else colours.RESET)
+    log.flush()
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Show and compare pipeline telemetry reports")
+    parser.add_argument("--dir", default=TELEMETRY_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    show_parser = subparsers.add_parser("show", help="Show a run's report (default: the latest)")
+    show_parser.add_argument("run", nargs="?")
+    compare_parser = subparsers.add_parser("compare", help="Compare two runs (default: the latest two)")
+    compare_parser.add_argument("old", nargs="?")
+    compare_parser.add_argument("new", nargs="?")
+    args = parser.parse_args()
+
+    runs = list_reports(args.dir)
+    if args.command == "show":
+        if not (args.run or runs):
+            parser.error(f"No reports in {args.dir}")
+        show(load_report(args.run or runs[-1], args.dir))
+    else:
+        new = args.new or (runs[-1] if runs else None)
+        old = args.old or next((run_id for run_id in reversed(runs) if run_id < new), None) if new else None
+        if not (old and new):
+            parser.error(f"Need two reports in {args.dir}")
+        compare(load_report(old, args.dir), load_report(new, args.dir))
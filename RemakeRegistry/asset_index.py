@@ -1,7 +1,23 @@
 import os
+import sys
 import json
 import hashlib
+import contextlib
 import shutil  # For copying directories
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from RemakeRegistry.hash_cache import HashCache
+from RemakeRegistry.hash_engine import hash_files, DEFAULT_WORKERS
+from RemakeRegistry.registry_stream import NdjsonWriter, iter_records, JSON_INDEX_PATH, NDJSON_INDEX_PATH
+from printer import Logger, colours
+from fastwalk import walk_files
+
+log = Logger("asset_index")
+
+INDEX_PATH = JSON_INDEX_PATH
+ASSET_TYPES = ("models", "textures", "audio", "video", "unknown")
+SOURCE_SUFFIXES = (".preinstanced", ".txd", ".snu", ".vp6")
 
 def generate_uuid(file_path):
     """Generates a UUID based on the file hash and path hash."""
@@ -44,104 +60,247 @@ def predict_converted_path(source_path, asset_type, stage, source_name):
             return os.path.join(r"A:\Dev\Games\TheSimpsonsGame\PAL\Modules\Video\GameFiles\Assets_1_Video_Movies", os.path.relpath(source_dir, r"Modules\Extract\GameFiles\USRDIR"), f"{name}.ogv")
     return None
 
-def scan_directories(directories):
+def build_entry(file_path, file_hash):
+    """
+    Builds the asset_index entry for a single source file.
+
+    Returns:
+        (asset_type, entry), or (None, None) for file types the index does not track.
+    """
+    filename = os.path.basename(file_path)
+    relative_path = os.path.relpath(file_path, os.getcwd())
+    path_name_hash_md5 = hashlib.md5(relative_path.encode()).hexdigest()
+    uuid = f"{file_hash[:16]}_{path_name_hash_md5[:16]}"
+    entry = {
+        "uuid": uuid, # Unique identifier for the asset
+        "sourceFileName": filename, # Original file name
+        "sourcePath": relative_path, # Relative path from the current working directory
+        "fileHash": file_hash, # SHA256 hash of the file content
+        "pathNameHashMD5": path_name_hash_md5, # MD5 hash of the file relative path
+        "stages": {} # To track different stages of the asset
+    }
+
+    asset_type = "unknown"
+    current_stage = None
+    source_name = os.path.splitext(filename)[0] # Added source_name
+
+    if filename.lower().endswith(('.preinstanced')):
+        asset_type = "models"
+        current_stage = ".preinstanced"
+    elif filename.lower().endswith(('.txd')):
+        asset_type = "textures"
+        current_stage = ".txd"
+    elif filename.lower().endswith(('.snu')):
+        asset_type = "audio"
+        current_stage = ".snu"
+    elif filename.lower().endswith(('.vp6')):
+        asset_type = "video"
+        current_stage = ".vp6"
+    else:
+        #asset_index["unknown"].append(entry)
+        return None, None # Skip the rest of the processing for unknown files
+
+    entry["stages"][current_stage] = {"path": relative_path}
+
+    # Predict other stages
+    if asset_type == "models":
+        predicted_blend = predict_converted_path(relative_path, "models", ".blend", source_name)
+        if predicted_blend:
+            entry["stages"][".blend"] = {"path": predicted_blend}
+        predicted_glb = predict_converted_path(relative_path, "models", ".glb", source_name)
+        if predicted_glb:
+            entry["stages"][".glb"] = {"path": predicted_glb}
+        predicted_fbx = predict_converted_path(relative_path, "models", ".fbx", source_name)
+        if predicted_fbx:
+            entry["stages"][".fbx"] = {"path": predicted_fbx}
+    elif asset_type == "textures":
+        # example path, txd dir is the path where the txd file is located and png files are generated
+        # Modules\Extract\GameFiles\quickbms_out\Assets_2_Characters_Simpsons\GlobalFolder\chars\bart_bc0_grp0_ss1_h0_str\EU_EN\ASSET_RWS\Textures\bart_bc0_grp0_ss1_h0.txd_files
+        txd_dir = predict_converted_path(relative_path, "textures", ".txd", source_name)
+        if txd_dir:
+            entry["stages"][".txd_directory"] = {"path": txd_dir}
+        # example path, png dir is the path where the png files are moved to after extraction, maintaining the same structure as the txd dir after the 'quickbms_out\'
+        # Modules\Texture\GameFiles\Textures_out\Assets_2_Characters_Simpsons\GlobalFolder\chars\bart_bc0_grp0_ss1_h0_str\EU_EN\ASSET_RWS\Textures\bart_bc0_grp0_ss1_h0.txd_files
+        png_dir = predict_converted_path(relative_path, "textures", ".png_directory", source_name)
+        if png_dir:
+            entry["stages"][".png_directory"] = {"path": png_dir}
+    elif asset_type == "audio":
+        predicted_wav = predict_converted_path(relative_path, "audio", ".wav", source_name)
+        if predicted_wav:
+            entry["stages"][".wav"] = {"path": predicted_wav}
+    elif asset_type == "video":
+        predicted_ogv = predict_converted_path(relative_path, "video", ".ogv", source_name)
+        if predicted_ogv:
+            entry["stages"][".ogv"] = {"path": predicted_ogv}
+
+    return asset_type, entry
+
+def iter_source_files(directories, parallel=False):
+    """
+    Yields a DirEntry for every source asset under the given directories, in os.walk order.
+    Only SOURCE_SUFFIXES are returned, so untracked files are never hashed.
+    """
+    for directory in directories:
+        log.info(f"Scanning directory: {directory}")
+        yield from walk_files(directory, SOURCE_SUFFIXES, parallel=parallel,
+                              on_directory=lambda root: log.verbose(f"Processing directory: {root}"))
+
+def load_previous_index(index_path):
+    """
+    Loads an existing asset_index (.json or .ndjson) for an incremental rebuild.
+
+    Returns:
+        (entries_by_path, tombstones): previous entries keyed by sourcePath together with
+        their asset type, and the tombstone list of the previous run. Both are empty if
+        the index does not exist or cannot be read.
+    """
+    entries_by_path = {}
+    tombstones = []
+    try:
+        if index_path.lower().endswith(".ndjson"):
+            for asset_type, entry in iter_records(index_path):
+                if asset_type == "removed":
+                    tombstones.append(entry)
+                else:
+                    entries_by_path[entry["sourcePath"]] = (asset_type, entry)
+            return entries_by_path, tombstones
+
+        with open(index_path, "r") as f:
+            previous_index = json.load(f)
+    except FileNotFoundError:
+        log.info(f"No previous index at {index_path}, building from scratch")
+        return {}, []
+    except (ValueError, OSError) as e:
+        # ValueError covers malformed JSON and an NDJSON index without its end marker
+        log.warning(f"Could not read previous index {index_path} - {e}. Building from scratch")
+        return {}, []
+
+    for asset_type in ASSET_TYPES:
+        for entry in previous_index.get(asset_type, []):
+            entries_by_path[entry["sourcePath"]] = (asset_type, entry)
+    return entries_by_path, previous_index.get("removed", [])
+
+def scan_directories(directories, workers=DEFAULT_WORKERS, incremental=False, index_path=INDEX_PATH):
     """
     Scans the specified directories for source assets and generates the asset_index.json
     with predicted converted paths.
 
+    An index_path ending in .ndjson is written line by line as files are hashed, so
+    memory stays bounded by one entry and registry builders can follow the file
+    while the scan is still running. Any other path gets the legacy grouped JSON.
+
+    In incremental mode the previous index is loaded first. Entries whose file hash is
+    unchanged are carried over as-is (the hash cache means those files are not read
+    again), only added or changed files are rebuilt, and files that disappeared are
+    recorded under "removed" as tombstones.
+
     Args:
         directories: A list of root directory paths to scan.
+        workers: Number of hashing threads. Output is identical for any value.
+        incremental: Reuse the previous index at index_path instead of starting over.
+        index_path: Where the index is read from (incremental) and written to.
+
+    Returns:
+        dict with "added", "changed", "unchanged" and "removed" counts.
     """
+    log.start()
+    previous_entries, tombstones = load_previous_index(index_path) if incremental else ({}, [])
     asset_index = {"models": [], "textures": [], "audio": [], "video": [], "unknown": []}
+    # The NDJSON index goes to a .tmp file that only replaces the old one once complete;
+    # an exception inside the with block leaves the previous index in place
+    ndjson = index_path.lower().endswith(".ndjson")
+    with NdjsonWriter(index_path) if ndjson else contextlib.nullcontext() as writer:
+        def emit(asset_type, entry):
+            if writer:
+                writer.write(asset_type, entry)
+            else:
+                asset_index[asset_type].append(entry)
 
-    for directory in directories:
-        print(f"Scanning directory: {directory}")
-        for root, _, files in os.walk(directory):
-            print(f"Processing directory: {root}")
-            for filename in files:
-                #print(f"Processing file: {filename}")
+        summary = {"added": 0, "changed": 0, "unchanged": 0, "removed": 0}
+        seen_paths = set()
+        hash_cache = HashCache()
+
+        sizes = {}
 
-                file_path = os.path.join(root, filename)
+        def sized(entries):
+            # DirEntry caches its stat, so the hash cache lookup reuses this one
+            for dir_entry in entries:
                 try:
-                    file_hash_full = hashlib.sha256()
-                    with open(file_path, "rb") as f:
-                        while chunk := f.read(4096):
-                            file_hash_full.update(chunk)
-                    file_hash = file_hash_full.hexdigest()
-                    relative_path = os.path.relpath(file_path, os.getcwd())
-                    path_name_hash_md5 = hashlib.md5(relative_path.encode()).hexdigest()
-                    uuid = f"{file_hash[:16]}_{path_name_hash_md5[:16]}"
-                    entry = {
-                        "uuid": uuid, # Unique identifier for the asset
-                        "sourceFileName": filename, # Original file name
-                        "sourcePath": relative_path, # Relative path from the current working directory
-                        "fileHash": file_hash, # SHA256 hash of the file content
-                        "pathNameHashMD5": path_name_hash_md5, # MD5 hash of the file relative path
-                        "stages": {} # To track different stages of the asset
-                    }
-
-                    asset_type = "unknown"
-                    current_stage = None
-                    source_name = os.path.splitext(filename)[0] # Added source_name
-
-                    if filename.lower().endswith(('.preinstanced')):
-                        asset_type = "models"
-                        current_stage = ".preinstanced"
-                    elif filename.lower().endswith(('.txd')):
-                        asset_type = "textures"
-                        current_stage = ".txd"
-                    elif filename.lower().endswith(('.snu')):
-                        asset_type = "audio"
-                        current_stage = ".snu"
-                    elif filename.lower().endswith(('.vp6')):
-                        asset_type = "video"
-                        current_stage = ".vp6"
-                    else:
-                        #asset_index["unknown"].append(entry)
-                        continue # Skip the rest of the processing for unknown files
-
-                    entry["stages"][current_stage] = {"path": relative_path}
-
-                    # Predict other stages
-                    if asset_type == "models":
-                        predicted_blend = predict_converted_path(relative_path, "models", ".blend", source_name)
-                        if predicted_blend:
-                            entry["stages"][".blend"] = {"path": predicted_blend}
-                        predicted_glb = predict_converted_path(relative_path, "models", ".glb", source_name)
-                        if predicted_glb:
-                            entry["stages"][".glb"] = {"path": predicted_glb}
-                        predicted_fbx = predict_converted_path(relative_path, "models", ".fbx", source_name)
-                        if predicted_fbx:
-                            entry["stages"][".fbx"] = {"path": predicted_fbx}
-                    elif asset_type == "textures":
-                        # example path, txd dir is the path where the txd file is located and png files are generated
-                        # Modules\Extract\GameFiles\quickbms_out\Assets_2_Characters_Simpsons\GlobalFolder\chars\bart_bc0_grp0_ss1_h0_str\EU_EN\ASSET_RWS\Textures\bart_bc0_grp0_ss1_h0.txd_files
-                        txd_dir = predict_converted_path(relative_path, "textures", ".txd", source_name)
-                        if txd_dir:
-                            entry["stages"][".txd_directory"] = {"path": txd_dir}
-                        # example path, png dir is the path where the png files are moved to after extraction, maintaining the same structure as the txd dir after the 'quickbms_out\'
-                        # Modules\Texture\GameFiles\Textures_out\Assets_2_Characters_Simpsons\GlobalFolder\chars\bart_bc0_grp0_ss1_h0_str\EU_EN\ASSET_RWS\Textures\bart_bc0_grp0_ss1_h0.txd_files
-                        png_dir = predict_converted_path(relative_path, "textures", ".png_directory", source_name)
-                        if png_dir:
-                            entry["stages"][".png_directory"] = {"path": png_dir}
-                    elif asset_type == "audio":
-                        predicted_wav = predict_converted_path(relative_path, "audio", ".wav", source_name)
-                        if predicted_wav:
-                            entry["stages"][".wav"] = {"path": predicted_wav}
-                    elif asset_type == "video":
-                        predicted_ogv = predict_converted_path(relative_path, "video", ".ogv", source_name)
-                        if predicted_ogv:
-                            entry["stages"][".ogv"] = {"path": predicted_ogv}
-
-                    asset_index[asset_type].append(entry)
-
-                except Exception as e:
-                    print(f"Error processing file: {file_path} - {e}")
-
-    with open("RemakeRegistry/asset_index.json", "w") as f:
-        json.dump(asset_index, f, indent=4)
+                    sizes[dir_entry.path] = dir_entry.stat().st_size
+                except OSError:
+                    pass
+                yield dir_entry
+
+        for file_path, file_hash, error in hash_files(sized(iter_source_files(directories, parallel=workers > 1)), workers, hash_cache):
+            log.progress(num_bytes=sizes.pop(file_path, 0))
+            if error is not None:
+                log.error(f"Error processing file: {file_path} - {error}")
+                continue
+            try:
+                relative_path = os.path.relpath(file_path, os.getcwd())
+                previous = previous_entries.get(relative_path)
+                if previous and previous[1]["fileHash"] == file_hash:
+                    seen_paths.add(relative_path)
+                    emit(previous[0], previous[1])
+                    log.count(previous[0])
+                    summary["unchanged"] += 1
+                    continue
+
+                asset_type, entry = build_entry(file_path, file_hash)
+                if asset_type:
+                    seen_paths.add(relative_path)
+                    emit(asset_type, entry)
+                    log.count(asset_type)
+                    summary["changed" if previous else "added"] += 1
+            except Exception as e:
+                log.error(f"Error processing file: {file_path} - {e}")
+
+        hash_cache.close()
+        log.info(f"Hash cache: {hash_cache.hits} reused, {hash_cache.misses} hashed", colours.GREEN)
+
+        if incremental:
+            removed_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+            tombstones = [t for t in tombstones if t["sourcePath"] not in seen_paths]
+            for source_path, (asset_type, entry) in previous_entries.items():
+                if source_path not in seen_paths:
+                    tombstones.append({
+                        "uuid": entry["uuid"],
+                        "assetType": asset_type,
+                        "sourcePath": source_path,
+                        "fileHash": entry["fileHash"],
+                        "removedAt": removed_at
+                    })
+                    summary["removed"] += 1
+            if writer:
+                for tombstone in tombstones:
+                    writer.write("removed", tombstone)
+            else:
+                asset_index["removed"] = tombstones
+            log.info(f"Incremental update: {summary['added']} added, {summary['changed']} changed, "
+                     f"{summary['removed']} removed, {summary['unchanged']} unchanged", colours.GREEN)
+
+    if not ndjson:
+        with open(index_path + ".tmp", "w") as f:
+            json.dump(asset_index, f, indent=4)
+        os.replace(index_path + ".tmp", index_path)
+    log.summary()
+
+    return summary
 
 if __name__ == "__main__":
+    import argparse
+    from Pipeline.profiler import PROFILE_MODES, profiled
+    parser = argparse.ArgumentParser(description="Generate RemakeRegistry/asset_index.json")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Number of hashing threads")
+    parser.add_argument("--incremental", action="store_true", help="Only re-process files added or changed since the last index")
+    parser.add_argument("--format", choices=["json", "ndjson"], default="json", help="Write the grouped JSON index or the streaming NDJSON index")
+    parser.add_argument("--verbose", action="store_true", help="Print every directory as it is scanned")
+    parser.add_argument("--profile", nargs="?", const="auto", choices=PROFILE_MODES,
+                        help="Profile the build into RemakeRegistry/profiles (default mode: auto)")
+    args = parser.parse_args()
+    if args.verbose:
+        log.set_level("verbose")
+
     directories_to_scan = [
         r"Modules\Extract\GameFiles\quickbms_out",
         r"Modules\Extract\GameFiles\USRDIR\Assets_1_Audio_Streams\EN",
@@ -150,5 +309,7 @@ if __name__ == "__main__":
         r"Modules\Extract\GameFiles\USRDIR\Assets_1_Video_Movies\sf",
     ]
 
-    scan_directories(directories_to_scan)
-    print("Generated asset_index.json")
\ No newline at end of file
+    index_path = NDJSON_INDEX_PATH if args.format == "ndjson" else JSON_INDEX_PATH
+    profiled("asset_index", lambda: scan_directories(directories_to_scan, workers=args.workers, incremental=args.incremental,
+                                                     index_path=index_path), mode=args.profile)()
+    print(f"Generated {index_path}")
\ No newline at end of file
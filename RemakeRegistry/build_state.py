@@ -0,0 +1,169 @@
+"""
+Per-asset build state for make-like incremental conversion.
+
+For every asset and output stage, build_state.json records the source fileHash the
+output was last built from. An asset is stale for a stage when:
+
+1. its predicted output (entry["stages"][stage]["path"], from predict_converted_path)
+   is missing, or is an empty directory for directory stages,
+2. the recorded fileHash differs from the one in the asset index (the source changed), or
+3. there is no record and the output is older than the source.
+
+Outputs that exist without a record but are newer than their source are adopted, so
+trees converted before the build state existed are not converted again.
+
+Usage:
+    python RemakeRegistry/build_state.py status
+    python RemakeRegistry/build_state.py stale --type models    # source paths to convert
+    python RemakeRegistry/build_state.py record --type models   # after a conversion run
+"""
+
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from RemakeRegistry.registry_stream import iter_assets, resolve_index_path
+from printer import Logger, colours
+
+BUILD_STATE_PATH = "RemakeRegistry/build_state.json"
+BUILD_STATE_VERSION = 1
+
+# The output stage each converter produces
+OUTPUT_STAGES = {
+    "models": ".blend",
+    "textures": ".png_directory",
+    "audio": ".wav",
+    "video": ".ogv",
+}
+
+log = Logger("build_state")
+
+def load_build_state(path=BUILD_STATE_PATH):
+    """Returns {asset_type: {stage: {sourcePath: fileHash}}}, empty if there is no usable state."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (json.JSONDecodeError, OSError) as e:
+        log.warning(f"Could not read build state {path} - {e}. Treating every output as unrecorded")
+        return {}
+    if state.get("version") != BUILD_STATE_VERSION:
+        log.warning(f"Ignoring {path}: unsupported build state version {state.get('version')}")
+        return {}
+    return state["assets"]
+
+def save_build_state(state, path=BUILD_STATE_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": BUILD_STATE_VERSION, "assets": state}, f, indent=1)
+    os.replace(temp_path, path)
+
+def output_mtime(path):
+    """Returns the output's mtime, or None if it is missing (or an empty directory)."""
+    try:
+        if os.path.isdir(path):
+            with os.scandir(path) as it:
+                if next(it, None) is None:
+                    return None
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+def check_asset(entry, stage, recorded_hash):
+    """
+    Returns why entry's output for stage needs building ("missing", "source changed",
+    "outdated"), "adopt" for an unrecorded but up-to-date output, or None if it is current.
+    """
+    output_path = entry["stages"].get(stage, {}).get("path")
+    if not output_path:
+        return None
+    built = output_mtime(output_path)
+    if built is None:
+        return "missing"
+    if recorded_hash is not None:
+        return None if recorded_hash == entry["fileHash"] else "source changed"
+    try:
+        source = os.stat(entry["sourcePath"]).st_mtime
+    except OSError:
+        return "adopt"
+    return "adopt" if built >= source else "outdated"
+
+def plan_stage(asset_type, stage=None, state=None, index_path=None):
+    """
+    Compares one asset type's outputs against the build state.
+
+    Returns:
+        (stale, adopted): stale is a list of (entry, reason) to build, adopted the
+        entries whose existing outputs can be recorded as built as-is.
+    """
+    stage = stage or OUTPUT_STAGES[asset_type]
+    records = (state or {}).get(asset_type, {}).get(stage, {})
+    stale, adopted = [], []
+    for entry in iter_assets(index_path or resolve_index_path(), asset_type):
+        reason = check_asset(entry, stage, records.get(entry["sourcePath"]))
+        if reason == "adopt":
+            adopted.append(entry)
+        elif reason:
+            stale.append((entry, reason))
+    return stale, adopted
+
+def record_outputs(state, asset_type, stage, entries, since=None):
+    """
+    Records entries whose output now exists as built from their current fileHash.
+    With since (a time.time() value), only outputs written after it count, so a stale
+    output left over from an earlier build is not mistaken for a new one.
+
+    Returns:
+        Number of entries recorded; the rest are still missing and stay stale.
+    """
+    records = state.setdefault(asset_type, {}).setdefault(stage, {})
+    recorded = 0
+    for entry in entries:
+        output_path = entry["stages"].get(stage, {}).get("path")
+        built = output_mtime(output_path) if output_path else None
+        if built is not None and (since is None or built >= since):
+            records[entry["sourcePath"]] = entry["fileHash"]
+            recorded += 1
+    return recorded
+
+def summarise(asset_type, stage, stale):
+    reasons = {}
+    for _, reason in stale:
+        reasons[reason] = reasons.get(reason, 0) + 1
+    detail = ", ".join(f"{count} {reason}" for reason, count in sorted(reasons.items()))
+    return f"{asset_type} {stage}: {len(stale)} stale" + (f" ({detail})" if detail else "")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Incremental build state for converted assets")
+    parser.add_argument("--state", default=BUILD_STATE_PATH)
+    parser.add_argument("--index", help="asset_index.json/.ndjson to read (defaults to the newest)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="Count stale outputs per asset type")
+    for name, help_text in (("stale", "List the source paths whose outputs need building"),
+                            ("record", "Record existing outputs as built from the current sources")):
+        sub_parser = subparsers.add_parser(name, help=help_text)
+        sub_parser.add_argument("--type", choices=sorted(OUTPUT_STAGES), required=True)
+        sub_parser.add_argument("--stage", help="Output stage, defaults to the converter's (e.g. .blend)")
+    args = parser.parse_args()
+
+    state = load_build_state(args.state)
+    if args.command == "status":
+        for asset_type, stage in OUTPUT_STAGES.items():
+            stale, adopted = plan_stage(asset_type, stage, state, args.index)
+            log.info(summarise(asset_type, stage, stale) + f", {len(adopted)} unrecorded but current",
+                     colours.GREEN if not stale else colours.YELLOW)
+        log.flush()
+    elif args.command == "stale":
+        for entry, reason in plan_stage(args.type, args.stage, state, args.index)[0]:
+            print(entry["sourcePath"])
+    else:
+        stage = args.stage or OUTPUT_STAGES[args.type]
+        stale, adopted = plan_stage(args.type, stage, state, args.index)
+        recorded = record_outputs(state, args.type, stage, [entry for entry, _ in stale] + adopted)
+        save_build_state(state, args.state)
+        log.info(f"Recorded {recorded} {args.type} outputs, {len(stale) + len(adopted) - recorded} still missing", colours.GREEN)
+        log.flush()
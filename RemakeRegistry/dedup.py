@@ -0,0 +1,225 @@
+"""
+Content-addressed deduplication across maps.
+
+Many .txd, .preinstanced and .snu files are byte-identical copies in several
+Map_3-xx folders. This module groups asset_index entries by fileHash, picks one
+canonical representative per group, and lets converters work on canonical
+sources only. propagate_outputs() then hard-links (or copies, across drives)
+each converted output to the predicted output path of every alias.
+
+Pipeline/blender_pool.py convert uses the dedup index when it exists: only canonical
+models are converted, and their outputs are propagated to the duplicates.
+
+Usage:
+    python RemakeRegistry/dedup.py build
+    python RemakeRegistry/dedup.py sources --type models
+    python RemakeRegistry/dedup.py propagate --type models --stage .blend
+"""
+
+import os
+import sys
+import json
+import shutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from RemakeRegistry.registry_stream import iter_assets, resolve_index_path
+from printer import Logger, colours
+
+DEDUP_INDEX_PATH = "RemakeRegistry/dedup_index.json"
+ASSET_TYPES = ("models", "textures", "audio", "video")
+
+log = Logger("dedup")
+
+def build_dedup_index(index_path=None, output_path=DEDUP_INDEX_PATH):
+    """
+    Groups every asset by fileHash and writes dedup_index.json.
+
+    The canonical entry of a group is the one with the lowest sourcePath, so the
+    choice is stable between runs. Only groups with at least one alias are written.
+
+    Returns:
+        The dedup index dict that was written.
+    """
+    if index_path is None:
+        index_path = resolve_index_path()
+    dedup_index = {"groups": {asset_type: [] for asset_type in ASSET_TYPES}, "stats": {}}
+    duplicate_bytes = 0
+
+    for asset_type in ASSET_TYPES:
+        by_hash = {}
+        for entry in iter_assets(index_path, asset_type):
+            by_hash.setdefault(entry["fileHash"], []).append(entry)
+
+        unique = aliases = 0
+        for file_hash, entries in sorted(by_hash.items()):
+            unique += 1
+            if len(entries) < 2:
+                continue
+            entries.sort(key=lambda e: e["sourcePath"])
+            canonical, alias_entries = entries[0], entries[1:]
+            aliases += len(alias_entries)
+            try:
+                duplicate_bytes += os.path.getsize(canonical["sourcePath"]) * len(alias_entries)
+            except OSError:
+                pass
+            dedup_index["groups"][asset_type].append({
+                "fileHash": file_hash,
+                "canonical": {"uuid": canonical["uuid"], "sourcePath": canonical["sourcePath"], "stages": canonical["stages"]},
+                "aliases": [{"uuid": e["uuid"], "sourcePath": e["sourcePath"], "stages": e["stages"]} for e in alias_entries]
+            })
+        dedup_index["stats"][asset_type] = {"unique": unique, "aliases": aliases}
+        log.info(f"{asset_type}: {unique} unique payloads, {aliases} duplicates", colours.CYAN)
+
+    dedup_index["stats"]["duplicateSourceBytes"] = duplicate_bytes
+    temp_path = output_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(dedup_index, f, indent=4)
+    os.replace(temp_path, output_path)
+    log.info(f"Generated {output_path} ({duplicate_bytes} bytes of duplicate source data)", colours.GREEN)
+    log.flush()
+    return dedup_index
+
+def load_dedup_index(path=DEDUP_INDEX_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def current_hashes(asset_type, index_path=None):
+    """Returns a dict of source path -> fileHash for asset_type in the current asset index."""
+    if index_path is None:
+        index_path = resolve_index_path()
+    return {entry["sourcePath"]: entry["fileHash"] for entry in iter_assets(index_path, asset_type)}
+
+def split_duplicates(entries, dedup_index, asset_type, index_path=None):
+    """
+    Splits asset entries into those a converter has to process and the duplicates
+    that propagate_outputs() can serve. An entry only counts as a duplicate while both
+    it and its canonical entry still have the group's fileHash in the asset index, so
+    a dedup index older than the asset index never hides a changed file.
+
+    Returns:
+        (to_convert, duplicates): lists of entries.
+    """
+    current = current_hashes(asset_type, index_path)
+    group_hashes = {}
+    for group in dedup_index["groups"].get(asset_type, []):
+        if current.get(group["canonical"]["sourcePath"]) == group["fileHash"]:
+            for alias in group["aliases"]:
+                group_hashes[alias["sourcePath"]] = group["fileHash"]
+    to_convert, duplicates = [], []
+    for entry in entries:
+        if group_hashes.get(entry["sourcePath"]) == entry["fileHash"]:
+            duplicates.append(entry)
+        else:
+            to_convert.append(entry)
+    return to_convert, duplicates
+
+def canonical_paths(dedup_index, asset_type):
+    """Returns a dict of alias source path -> canonical source path."""
+    return {alias["sourcePath"]: group["canonical"]["sourcePath"]
+            for group in dedup_index["groups"].get(asset_type, []) for alias in group["aliases"]}
+
+def canonical_sources(dedup_index, asset_type, index_path=None):
+    """
+    Yields the source path of every asset of asset_type that a converter has to process:
+    unique files, one canonical per duplicate group, and aliases whose file changed since
+    the dedup index was built (see split_duplicates).
+    """
+    if index_path is None:
+        index_path = resolve_index_path()
+    to_convert, _ = split_duplicates(list(iter_assets(index_path, asset_type)), dedup_index, asset_type, index_path)
+    for entry in to_convert:
+        yield entry["sourcePath"]
+
+def link_or_copy(src, dst):
+    """Hard-links src to dst, falling back to a copy when linking is not possible (e.g. across drives)."""
+    os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+    try:
+        os.link(src, dst)
+        return "linked"
+    except OSError:
+        shutil.copy2(src, dst)
+        return "copied"
+
+def up_to_date(src, dst):
+    """True if dst is src (hard link) or at least as new as it."""
+    try:
+        dst_stat = os.stat(dst)
+    except FileNotFoundError:
+        return False
+    src_stat = os.stat(src)
+    return os.path.samestat(src_stat, dst_stat) or dst_stat.st_mtime >= src_stat.st_mtime
+
+def propagate_file(src, dst, counts):
+    if up_to_date(src, dst):
+        counts["existing"] += 1
+        return
+    if os.path.exists(dst):
+        os.remove(dst)  # Older than the canonical output, e.g. from before the source changed
+    counts[link_or_copy(src, dst)] += 1
+
+def propagate_outputs(dedup_index, asset_type, stage, index_path=None):
+    """
+    Gives every alias the converted output of its canonical entry for one stage.
+
+    Directory stages (e.g. .png_directory) are mirrored file by file. Alias outputs
+    at least as new as the canonical output are left alone; older ones are replaced.
+    Groups and aliases whose files no longer have the group's fileHash in the asset
+    index are skipped, as split_duplicates() sends them to the converter instead.
+
+    Returns:
+        dict of counters: linked, copied, existing, missing_canonical, changed.
+    """
+    current = current_hashes(asset_type, index_path)
+    counts = {"linked": 0, "copied": 0, "existing": 0, "missing_canonical": 0, "changed": 0}
+    for group in dedup_index["groups"].get(asset_type, []):
+        if current.get(group["canonical"]["sourcePath"]) != group["fileHash"]:
+            counts["changed"] += 1 + len(group["aliases"])
+            continue
+        src = group["canonical"]["stages"].get(stage, {}).get("path")
+        if not src or not os.path.exists(src):
+            counts["missing_canonical"] += 1
+            continue
+        for alias in group["aliases"]:
+            if current.get(alias["sourcePath"]) != group["fileHash"]:
+                counts["changed"] += 1
+                continue
+            dst = alias["stages"].get(stage, {}).get("path")
+            if not dst:
+                continue
+            if os.path.isdir(src):
+                for root, _, files in os.walk(src):
+                    for filename in files:
+                        file_src = os.path.join(root, filename)
+                        propagate_file(file_src, os.path.join(dst, os.path.relpath(file_src, src)), counts)
+            else:
+                propagate_file(src, dst, counts)
+            log.verbose(f"{src} -> {dst}")
+    log.info(f"{asset_type} {stage}: {counts['linked']} linked, {counts['copied']} copied, "
+             f"{counts['existing']} already present, {counts['missing_canonical']} canonical outputs missing, "
+             f"{counts['changed']} no longer duplicates", colours.GREEN)
+    log.flush()
+    return counts
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Content-addressed deduplication of registry assets")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="Group assets by fileHash and write dedup_index.json")
+    build_parser.add_argument("--index", help="asset_index.json/.ndjson to read (defaults to the newest)")
+    sources_parser = subparsers.add_parser("sources", help="List the source paths a converter needs to process")
+    sources_parser.add_argument("--type", choices=ASSET_TYPES, required=True)
+    propagate_parser = subparsers.add_parser("propagate", help="Link canonical outputs to every duplicate location")
+    propagate_parser.add_argument("--type", choices=ASSET_TYPES, required=True)
+    propagate_parser.add_argument("--stage", required=True, help="Stage to propagate, e.g. .blend or .png_directory")
+    propagate_parser.add_argument("--verbose", action="store_true", help="Print every linked output")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_dedup_index(args.index)
+    elif args.command == "sources":
+        for source_path in canonical_sources(load_dedup_index(), args.type):
+            print(source_path)
+    else:
+        if args.verbose:
+            log.set_level("verbose")
+        propagate_outputs(load_dedup_index(), args.type, args.stage)
@@ -0,0 +1,113 @@
+"""
+Persistent SHA256 cache shared by the registry builders.
+
+Hashes are stored in a SQLite sidecar keyed by (path, size, mtime_ns, inode),
+so a file that has not changed since the last run is never read again.
+"""
+
+import os
+import hashlib
+import sqlite3
+
+CACHE_DB_PATH = "RemakeRegistry/hash_cache.db"
+READ_CHUNK_SIZE = 4096
+COMMIT_EVERY = 500
+
+def sha256_file(file_path, chunk_size=READ_CHUNK_SIZE):
+    """Calculates the SHA256 hash of a file, reading it in chunks."""
+    file_hash = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+def stat_key(st):
+    """Returns the (size, mtime_ns, inode) part of the cache key for an os.stat_result."""
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+class HashCache:
+    """
+    SHA256 lookup backed by a SQLite sidecar.
+
+    Usage:
+        with HashCache() as cache:
+            file_hash = cache.get_hash(path)
+    """
+
+    def __init__(self, db_path=CACHE_DB_PATH):
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self._pending = 0
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS file_hashes (
+            path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime_ns INTEGER,
+            inode INTEGER,
+            sha256 TEXT
+        )
+        """)
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def _key_path(file_path):
+        return os.path.normcase(os.path.abspath(file_path))
+
+    def lookup(self, file_path, st=None):
+        """
+        Returns the cached hash for file_path if its size, mtime and inode still match,
+        otherwise None. Never reads the file itself.
+        """
+        if st is None:
+            st = os.stat(file_path)
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, inode, sha256 FROM file_hashes WHERE path = ?",
+            (self._key_path(file_path),)
+        ).fetchone()
+        if row and tuple(row[:3]) == stat_key(st):
+            self.hits += 1
+            return row[3]
+        return None
+
+    def store(self, file_path, st, file_hash):
+        """Records the hash of file_path as observed with the given stat result."""
+        size, mtime_ns, inode = stat_key(st)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO file_hashes (path, size, mtime_ns, inode, sha256) VALUES (?, ?, ?, ?, ?)",
+            (self._key_path(file_path), size, mtime_ns, inode, file_hash)
+        )
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self.commit()
+
+    def get_hash(self, file_path, st=None):
+        """Returns the SHA256 of file_path, hashing it only if the cache entry is missing or stale."""
+        if st is None:
+            st = os.stat(file_path)
+        file_hash = self.lookup(file_path, st)
+        if file_hash is None:
+            self.misses += 1
+            file_hash = sha256_file(file_path)
+            self.store(file_path, st, file_hash)
+        return file_hash
+
+    def commit(self):
+        self.conn.commit()
+        self._pending = 0
+
+    def close(self):
+        if self.conn is not None:
+            self.commit()
+            self.conn.close()
+            self.conn = None
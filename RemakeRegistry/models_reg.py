@@ -1,26 +1,18 @@
 import os
+import sys
 import json
 import hashlib
 import uuid
 import time
 
-def printc(message, color=None):
-    """
-    Simple color support for Windows/cmd using ANSI escape codes.
-    Note: On Windows, you might need `os.system('color')` or `colorama` for full support in older terminals.
-    Newer Windows Terminal supports ANSI codes by default.
-    """
-    colors = {
-        'red': '\033[91m', 'green': '\033[92m', 'yellow': '\033[93m',
-        'blue': '\033[94m', 'magenta': '\033[95m', 'cyan': '\033[96m',
-        'white': '\033[97m', 'darkcyan': '\033[36m', 'darkyellow': '\033[33m',
-        'darkred': '\033[31m'
-    }
-    endc = '\033[0m'
-    if color and color.lower() in colors:
-        print(f"{colors[color.lower()]}{message}{endc}")
-    else:
-        print(message)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from RemakeRegistry.hash_cache import HashCache
+from RemakeRegistry.hash_engine import hash_files, DEFAULT_WORKERS
+from RemakeRegistry.registry_stream import iter_assets, resolve_index_path, IncompleteIndexError
+from RemakeRegistry.query import RegistryIndex
+from printer import Logger, colours
+
+log = Logger("models_reg")
 
 def generate_unique_id(main_uuid=None, preinstanced_uuid=None):
     """Generates a unique ID based on main and preinstanced UUIDs."""
@@ -28,59 +20,93 @@ def generate_unique_id(main_uuid=None, preinstanced_uuid=None):
         if main_uuid and preinstanced_uuid:
             # Use a consistent separator and length for reliability
             combined_string = f"{main_uuid[:20]}_{preinstanced_uuid[:20]}"
-            printc(f"Generating unique ID: {combined_string} from main UUID: {main_uuid} and preinstanced UUID: {preinstanced_uuid}", color="cyan")
+            log.verbose(f"Generating unique ID: {combined_string} from main UUID: {main_uuid} and preinstanced UUID: {preinstanced_uuid}", colours.CYAN)
             return combined_string
         elif main_uuid:
              # Handle cases where preinstanced UUID might be missing but main UUID is present
              combined_string = f"{main_uuid[:20]}_no_preinstanced"
-             printc(f"Generating unique ID: {combined_string} from main UUID: {main_uuid} (no preinstanced)", color="cyan")
+             log.verbose(f"Generating unique ID: {combined_string} from main UUID: {main_uuid} (no preinstanced)", colours.CYAN)
              return combined_string
         else:
-            printc(f"Failed to generate unique ID: main UUID is None", color="red")
+            log.error(f"Failed to generate unique ID: main UUID is None")
             return None
     except Exception as e:
-        printc(f"Error generating unique ID: {e}", color="red")
-        return None
-
-def calculate_file_hash(file_path):
-    """Calculates the SHA256 hash of a file."""
-    try:
-        printc(f"Calculating SHA256 for: {file_path}", color="darkyellow")
-        with open(file_path, 'rb') as f:
-            file_content = f.read()
-            return hashlib.sha256(file_content).hexdigest()
-    except FileNotFoundError:
-        printc(f"File not found for hash calculation: {file_path}", color="yellow")
-        return None
-    except Exception as e:
-        printc(f"Error calculating file hash for {file_path}: {e}", color="red")
+        log.error(f"Error generating unique ID: {e}")
         return None
 
 def calculate_path_hash(path):
     """Calculates the MD5 hash of a path string."""
     if path is None:
         return None
-    printc(f"Calculating MD5 for path: {path}", color="darkyellow")
+    log.verbose(f"Calculating MD5 for path: {path}", colours.YELLOW)
     return hashlib.md5(path.encode('utf-8')).hexdigest()
 
-def process_model_entries(asset_index_path, uv_maps_path):
+def reuses_index_hash(entry, stage, stage_path):
+    """True when the stage is the source file asset_index already hashed."""
+    return stage == ".preinstanced" and stage_path == entry.get("sourcePath") and bool(entry.get("fileHash"))
+
+def hash_stage_outputs(model_entries, workers=DEFAULT_WORKERS):
+    """
+    Stats every stage path and hashes the ones that exist and are not covered by the
+    asset_index fileHash (i.e. converted .blend/.glb/.fbx outputs). Hashing is streamed
+    on a thread pool and goes through the hash cache, so unchanged outputs are never read.
+
+    Returns:
+        (stage_hashes, stage_exists): dicts keyed by stage path.
     """
-    Reads the asset_index.json and uv_maps.json, processes model entries,
+    stage_exists = {}
+    sizes = {}
+    for entry in model_entries:
+        for stage, stage_data in entry.get("stages", {}).items():
+            stage_path = stage_data.get("path")
+            if not stage_path or stage_path in stage_exists:
+                continue
+            stage_exists[stage_path] = os.path.exists(stage_path)
+            if stage_exists[stage_path] and os.path.isfile(stage_path) and not reuses_index_hash(entry, stage, stage_path):
+                sizes[stage_path] = os.path.getsize(stage_path)
+    to_hash = list(sizes)
+
+    log.info(f"Hashing {len(to_hash)} converted outputs ({len(stage_exists)} stage paths checked)", colours.GREEN)
+    stage_hashes = {}
+    with HashCache() as hash_cache:
+        for stage_path, file_hash, error in hash_files(to_hash, workers, hash_cache):
+            if error is not None:
+                log.error(f"Error calculating file hash for {stage_path}: {error}")
+            else:
+                stage_hashes[stage_path] = file_hash
+                log.count("outputs hashed")
+            # Files are counted per model entry below; this only adds the bytes read
+            log.progress(files=0, num_bytes=sizes[stage_path])
+        log.info(f"Hash cache: {hash_cache.hits} reused, {hash_cache.misses} hashed", colours.GREEN)
+    return stage_hashes, stage_exists
+
+def process_model_entries(asset_index_path, uv_maps_path, workers=DEFAULT_WORKERS):
+    """
+    Reads the asset index (.json or streamed .ndjson) and uv_maps.json, processes model entries,
     generates IDs, and creates model_reg.json with UV map fixes applied
     based on matching entryid, main uuid, or stage uuids.
+
+    The .preinstanced source hash is taken from the index's fileHash; only converted
+    outputs that exist on disk are hashed (see hash_stage_outputs).
     """
+    log.start()
     try:
-        with open(asset_index_path, 'r', encoding='utf-8') as f:
-            asset_index = json.load(f)
-        printc(f"Successfully loaded {asset_index_path}", color="green")
+        # Model entries are small compared to the whole index; materialise them here so a
+        # truncated or malformed NDJSON index is reported below instead of mid-way, and stage
+        # outputs can be hashed in one parallel pass before the entries are built.
+        model_entries = list(iter_assets(asset_index_path, "models"))
+        log.info(f"Successfully loaded {asset_index_path}", colours.GREEN)
     except FileNotFoundError:
-        printc(f"Error: {asset_index_path} not found.", color="red")
+        log.error(f"Error: {asset_index_path} not found.")
+        return
+    except IncompleteIndexError as e:
+        log.error(f"Error: {e}. Run asset_index.py again.")
         return
     except json.JSONDecodeError:
-        printc(f"Error: Could not decode JSON from {asset_index_path}.", color="red")
+        log.error(f"Error: Could not decode JSON from {asset_index_path}.")
         return
     except Exception as e:
-        printc(f"An error occurred while loading {asset_index_path}: {e}", color="red")
+        log.error(f"An error occurred while loading {asset_index_path}: {e}")
         return
 
     uv_map_fixes = {}
@@ -98,28 +124,28 @@ def process_model_entries(asset_index_path, uv_maps_path):
                         "sourcePath": uv_map.get("json", {}).get("path"),
                         "asset_uuid": asset_uuid,
                     }
-            printc(f"Successfully loaded {uv_maps_path} with {len(uv_map_fixes)} fixes.", color="green")
+            log.info(f"Successfully loaded {uv_maps_path} with {len(uv_map_fixes)} fixes.", colours.GREEN)
     except FileNotFoundError:
-        printc(f"Warning: {uv_maps_path} not found. UV map fixes will not be included.", color="yellow")
+        log.warning(f"Warning: {uv_maps_path} not found. UV map fixes will not be included.")
     except json.JSONDecodeError:
-        printc(f"Error: Could not decode JSON from {uv_maps_path}.", color="red")
+        log.error(f"Error: Could not decode JSON from {uv_maps_path}.")
         # Continue processing without UV fixes
     except Exception as e:
-        printc(f"An error occurred while loading {uv_maps_path}: {e}", color="red")
+        log.error(f"An error occurred while loading {uv_maps_path}: {e}")
         # Continue processing without UV fixes
 
-    printc("Processing model entries...", color="green")
+    log.info("Processing model entries...", colours.GREEN)
 
     # Temporary storage for entries with generated IDs but without applied fixes
     processed_entries_temp = []
     stage_stats = {}
 
-    model_entries = asset_index.get("models", [])
+    stage_hashes, stage_exists = hash_stage_outputs(model_entries, workers)
 
     for entry in model_entries:
         main_uuid = entry.get("uuid")
         source_path = entry.get("sourcePath")
-        printc(f"Processing entry: {main_uuid or 'Unknown'} (Source: {source_path})", color="blue")
+        log.verbose(f"Processing entry: {main_uuid or 'Unknown'} (Source: {source_path})", colours.BLUE)
 
         model_reg_entry_temp = {
             "entryid": None, # Will be generated after stages
@@ -147,12 +173,18 @@ def process_model_entries(asset_index_path, uv_maps_path):
         preinstanced_stage_uuid = None
 
         for stage, stage_data in entry.get("stages", {}).items():
-            printc(f"Processing stage: {stage} for entry: {main_uuid or 'Unknown'}", color="darkcyan")
+            log.verbose(f"Processing stage: {stage} for entry: {main_uuid or 'Unknown'}", colours.CYAN)
             stage_path = stage_data.get("path")
             # stage_uuid_from_index = stage_data.get("uuid") # This UUID from asset_index might not be the one we generate
 
             if stage_path:
-                file_hash_SHA256 = calculate_file_hash(stage_path)
+                if reuses_index_hash(entry, stage, stage_path):
+                    file_hash_SHA256 = entry["fileHash"]
+                else:
+                    file_hash_SHA256 = stage_hashes.get(stage_path)
+                    if not stage_exists.get(stage_path):
+                        log.verbose(f"File not found for hash calculation: {stage_path}", colours.YELLOW)
+                        log.count("missing outputs")
                 path_name_hash_md5 = calculate_path_hash(stage_path)
 
                 # Generate a consistent UUID based on content and path
@@ -160,7 +192,7 @@ def process_model_entries(asset_index_path, uv_maps_path):
                 generated_stage_uuid = f"{file_hash_SHA256[:16] if file_hash_SHA256 else '0'*16}_{path_name_hash_md5[:16] if path_name_hash_md5 else '0'*16}"
 
                 model_reg_entry_temp["stages"][stage] = {
-                    "exists": os.path.exists(stage_path),
+                    "exists": stage_exists.get(stage_path, False),
                     "uuid": generated_stage_uuid, # Use our generated UUID
                     "path": stage_path,
                     "fileHashSHA256": file_hash_SHA256,
@@ -172,7 +204,7 @@ def process_model_entries(asset_index_path, uv_maps_path):
 
                 stage_stats[stage] = stage_stats.get(stage, 0) + 1
             else:
-                printc(f"Warning: stage path is None for stage '{stage}' in entry: {main_uuid or 'Unknown'}", color="yellow")
+                log.warning(f"Warning: stage path is None for stage '{stage}' in entry: {main_uuid or 'Unknown'}")
                 # Add entry even if path is None, with exists: False
                 path_name_hash_md5 = calculate_path_hash(stage_data.get("path"))
                 generated_stage_uuid = f"{'0'*16}_{path_name_hash_md5[:16] if path_name_hash_md5 else '0'*16}"
@@ -191,49 +223,53 @@ def process_model_entries(asset_index_path, uv_maps_path):
 
         # Generate entryid after stage UUIDs are determined
         model_reg_entry_temp["entryid"] = generate_unique_id(main_uuid, preinstanced_stage_uuid)
-        printc(f"Generated entryid: {model_reg_entry_temp['entryid']} for entry: {main_uuid or 'Unknown'}", color="cyan")
+        log.verbose(f"Generated entryid: {model_reg_entry_temp['entryid']} for entry: {main_uuid or 'Unknown'}", colours.CYAN)
 
         processed_entries_temp.append(model_reg_entry_temp)
+        log.progress()
+
+    log.info("Completed processing all entries. Applying UV map fixes...", colours.GREEN)
+
+    # Resolve every fix key against the registry indexes instead of probing each entry's
+    # entryid, uuid and stage uuids. Priority per entry: entryid, then main uuid, then
+    # the first matching stage uuid in stage order.
+    registry_index = RegistryIndex.from_entries(processed_entries_temp, "models")
+    best_fixes = {}
+    for fix_key, fix in uv_map_fixes.items():
+        for match_kind, stage, entry in registry_index.resolve(fix_key):
+            if match_kind == "entryid":
+                rank = (0, 0)
+                message = f"UV Map fix applied via entryid: {fix_key}"
+            elif match_kind == "uuid":
+                rank = (1, 0)
+                message = f"UV Map fix applied via main uuid: {fix_key}"
+            else:
+                rank = (2, list(entry["stages"]).index(stage))
+                message = f"UV Map fix applied via stage '{stage}' uuid: {fix_key}"
+            current = best_fixes.get(id(entry))
+            if current is None or rank < current[0]:
+                best_fixes[id(entry)] = (rank, fix, message)
 
-    printc("Completed processing all entries. Applying UV map fixes...", color="green")
-
-    # Now, iterate through the processed entries and apply UV map fixes
     model_registry = []
     uv_fixes_applied_count = 0
 
     for entry in processed_entries_temp:
-        applied_fix = None
-
-        # Prioritize lookup: entryid, then main uuid, then stage uuids
         entryid = entry.get("entryid")
         main_uuid = entry.get("uuid")
+        best_fix = best_fixes.get(id(entry))
 
-        if entryid and entryid in uv_map_fixes:
-            applied_fix = uv_map_fixes[entryid]
-            printc(f"UV Map fix applied via entryid: {entryid}", color="green")
-        elif main_uuid and main_uuid in uv_map_fixes:
-            applied_fix = uv_map_fixes[main_uuid]
-            printc(f"UV Map fix applied via main uuid: {main_uuid}", color="green")
-        else:
-            for stage, stage_data in entry.get("stages", {}).items():
-                stage_uuid = stage_data.get("uuid")
-                if stage_uuid and stage_uuid in uv_map_fixes:
-                    applied_fix = uv_map_fixes[stage_uuid]
-                    printc(f"UV Map fix applied via stage '{stage}' uuid: {stage_uuid}", color="green")
-                    break # Apply the first stage fix found and stop checking stages
-
-        if applied_fix:
+        if best_fix:
+            _, applied_fix, message = best_fix
+            log.verbose(message, colours.GREEN)
             entry["fixes"]["UV_Map"] = applied_fix
             uv_fixes_applied_count += 1
-            printc(f"UV Map fix applied for entry: {entryid or main_uuid or 'Unknown'}", color="green")
-        # else:
-            #printc(f"No UV Map fix found for entry: {entryid or main_uuid or 'Unknown'}", color="yellow")
-
+            log.count("uv fixes applied")
+            log.verbose(f"UV Map fix applied for entry: {entryid or main_uuid or 'Unknown'}", colours.GREEN)
 
         model_registry.append(entry)
 
-    printc(f"Total UV map fixes applied: {uv_fixes_applied_count}", color="green")
-    printc("Completed applying UV map fixes.", color="green")
+    log.info(f"Total UV map fixes applied: {uv_fixes_applied_count}", colours.GREEN)
+    log.info("Completed applying UV map fixes.", colours.GREEN)
 
     output_dir = "RemakeRegistry"
     os.makedirs(output_dir, exist_ok=True)
@@ -241,18 +277,30 @@ def process_model_entries(asset_index_path, uv_maps_path):
     try:
         with open(output_file_path, "w", encoding='utf-8') as outfile:
             json.dump(model_registry, outfile, indent=4)
-        printc(f"Generated {output_file_path}", color="green")
+        log.info(f"Generated {output_file_path}", colours.GREEN)
     except IOError as e:
-        printc(f"Error writing to {output_file_path}: {e}", color="red")
+        log.error(f"Error writing to {output_file_path}: {e}")
 
 
-    printc("Stage statistics:", color="yellow")
+    log.info("Stage statistics:", colours.YELLOW)
     for stage, count in sorted(stage_stats.items()):
-        printc(f"'{stage}': {count}", color="cyan")
+        log.info(f"'{stage}': {count}", colours.CYAN)
+    log.summary()
 
 
 if __name__ == "__main__":
-    asset_index_file = "RemakeRegistry/asset_index.json"
+    asset_index_file = resolve_index_path()
     uv_maps_file = "RemakeRegistry/Manual_Repair/UV_Maps.json"
 
-    process_model_entries(asset_index_file, uv_maps_file)
\ No newline at end of file
+    import argparse
+    from Pipeline.profiler import PROFILE_MODES, profiled
+    parser = argparse.ArgumentParser(description="Generate RemakeRegistry/model_reg.json")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Number of hashing threads")
+    parser.add_argument("--verbose", action="store_true", help="Print per-model and per-stage messages")
+    parser.add_argument("--profile", nargs="?", const="auto", choices=PROFILE_MODES,
+                        help="Profile the build into RemakeRegistry/profiles (default mode: auto)")
+    args = parser.parse_args()
+    if args.verbose:
+        log.set_level("verbose")
+
+    profiled("models_reg", lambda: process_model_entries(asset_index_file, uv_maps_file, workers=args.workers), mode=args.profile)()
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""
+In-memory indexes over the asset registry.
+
+RegistryIndex answers "which entry has this uuid / fileHash / entryid / stage uuid"
+with dictionary lookups and "everything under this folder" with a path-prefix
+trie, instead of scanning the registry JSON linearly for every question.
+
+Example:
+    python RemakeRegistry/query.py --under Modules\\Extract\\GameFiles\\quickbms_out\\Map_3-05_MobRules --type textures
+    python RemakeRegistry/query.py --hash <sha256>
+"""
+
+import os
+import sys
+import json
+import re
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from RemakeRegistry.registry_stream import iter_records, resolve_index_path
+
+ASSET_TYPES = ("models", "textures", "audio", "video")
+
+def split_path(path):
+    """Splits a registry path into components, accepting both Windows and POSIX separators."""
+    return [part for part in re.split(r"[\\/]+", path) if part and part != "."]
+
+class PathTrie:
+    """Prefix tree keyed by path components. Each node stores the values inserted at exactly that path."""
+
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, path, value):
+        node = self.root
+        for part in split_path(path):
+            node = node.setdefault(part, {})
+        node.setdefault(None, []).append(value)
+
+    def iter_prefix(self, prefix):
+        """Yields every value stored at or below prefix."""
+        node = self.root
+        for part in split_path(prefix):
+            node = node.get(part)
+            if node is None:
+                return
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for key, child in node.items():
+                if key is None:
+                    yield from child
+                else:
+                    stack.append(child)
+
+class RegistryIndex:
+    """
+    Hash indexes by uuid, fileHash, entryid and stage uuid, plus a sourcePath trie.
+
+    Works for both asset_index entries (uuid, fileHash, sourcePath) and model_reg
+    entries (entryid, stages with their own uuid and fileHashSHA256).
+    """
+
+    def __init__(self):
+        self.by_uuid = {}
+        self.by_file_hash = {}
+        self.by_entryid = {}
+        self.by_stage_uuid = {}
+        self.paths = PathTrie()
+
+    def add(self, entry, asset_type=None):
+        uuid = entry.get("uuid")
+        if uuid:
+            self.by_uuid[uuid] = entry
+        file_hash = entry.get("fileHash")
+        if file_hash:
+            self.by_file_hash.setdefault(file_hash, []).append(entry)
+        entryid = entry.get("entryid")
+        if entryid:
+            self.by_entryid[entryid] = entry
+        for stage, stage_data in entry.get("stages", {}).items():
+            stage_uuid = stage_data.get("uuid")
+            if stage_uuid:
+                self.by_stage_uuid.setdefault(stage_uuid, []).append((stage, entry))
+        source_path = entry.get("sourcePath")
+        if source_path:
+            self.paths.insert(source_path, (asset_type, entry))
+
+    @classmethod
+    def from_asset_index(cls, index_path=None):
+        """Builds an index from asset_index.json or asset_index.ndjson (newest by default)."""
+        if index_path is None:
+            index_path = resolve_index_path()
+        index = cls()
+        if index_path.lower().endswith(".ndjson"):
+            for asset_type, entry in iter_records(index_path):
+                if asset_type in ASSET_TYPES:
+                    index.add(entry, asset_type)
+            return index
+        with open(index_path, "r", encoding="utf-8") as f:
+            asset_index = json.load(f)
+        for asset_type in ASSET_TYPES:
+            for entry in asset_index.get(asset_type, []):
+                index.add(entry, asset_type)
+        return index
+
+    @classmethod
+    def from_entries(cls, entries, asset_type=None):
+        """Builds an index from a list of entries, e.g. the contents of model_reg.json."""
+        index = cls()
+        for entry in entries:
+            index.add(entry, asset_type)
+        return index
+
+    def get(self, uuid):
+        return self.by_uuid.get(uuid)
+
+    def with_hash(self, file_hash):
+        """Returns every entry whose content hash is file_hash."""
+        return self.by_file_hash.get(file_hash, [])
+
+    def under(self, prefix, asset_type=None):
+        """Returns the entries whose sourcePath lies under prefix, optionally of one asset type."""
+        return [entry for entry_type, entry in self.paths.iter_prefix(prefix)
+                if asset_type is None or entry_type == asset_type]
+
+    def resolve(self, key):
+        """
+        Finds the entries a fix or relationship key refers to, using the same priority
+        as model_reg UV fixes: entryid, then main uuid, then stage uuid.
+
+        Returns:
+            list of (match_kind, stage, entry) in priority order; match_kind is
+            "entryid", "uuid" or "stage".
+        """
+        matches = []
+        if key in self.by_entryid:
+            matches.append(("entryid", None, self.by_entryid[key]))
+        if key in self.by_uuid:
+            matches.append(("uuid", None, self.by_uuid[key]))
+        matches.extend(("stage", stage, entry) for stage, entry in self.by_stage_uuid.get(key, []))
+        return matches
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Query the asset registry")
+    parser.add_argument("--index", help="asset_index.json/.ndjson to load (defaults to the newest)")
+    parser.add_argument("--uuid", help="Look up one entry by uuid")
+    parser.add_argument("--hash", help="List entries with this fileHash")
+    parser.add_argument("--under", help="List entries whose sourcePath is under this prefix")
+    parser.add_argument("--type", choices=ASSET_TYPES, help="Restrict --under to one asset type")
+    args = parser.parse_args()
+
+    registry = RegistryIndex.from_asset_index(args.index)
+    if args.uuid:
+        result = registry.get(args.uuid)
+    elif args.hash:
+        result = registry.with_hash(args.hash)
+    elif args.under:
+        result = registry.under(args.under, args.type)
+    else:
+        parser.error("one of --uuid, --hash or --under is required")
+    print(json.dumps(result, indent=4))
@@ -0,0 +1,173 @@
+"""
+Line-delimited (NDJSON) asset registry format.
+
+Each line of asset_index.ndjson is one JSON object:
+    {"assetType": "models", "entry": {...}}
+Tombstones from incremental rebuilds use assetType "removed". The writer finishes
+the file with an end marker, {"end": true, "entries": N}, so a reader that starts
+while the scan is still running knows when the index is complete.
+
+The index is written to <path>.tmp and only renamed over <path> once the end marker
+is written, so a crashed scan never replaces the last complete index. Followers read
+the .tmp file while a scan is running.
+"""
+
+import os
+import json
+import time
+
+NDJSON_INDEX_PATH = "RemakeRegistry/asset_index.ndjson"
+JSON_INDEX_PATH = "RemakeRegistry/asset_index.json"
+FOLLOW_POLL_INTERVAL = 0.25
+REPLACE_RETRY_SECONDS = 10  # Windows refuses the rename while a follower still has the file open
+
+class IncompleteIndexError(ValueError):
+    """An NDJSON index without its end marker, i.e. from a scan that did not finish."""
+
+def partial_path(path):
+    return path + ".tmp"
+
+class NdjsonWriter:
+    """
+    Incremental writer for asset_index.ndjson. Every entry is flushed as soon as it
+    is written to <path>.tmp, so downstream builders can follow the file during a
+    scan; closing it complete renames it over path.
+
+    Usage:
+        with NdjsonWriter(path) as writer:
+            writer.write("models", entry)
+    """
+
+    def __init__(self, path=NDJSON_INDEX_PATH):
+        self.path = path
+        self.count = 0
+        path_dir = os.path.dirname(path)
+        if path_dir:
+            os.makedirs(path_dir, exist_ok=True)
+        self.file = open(partial_path(path), "w", encoding="utf-8", newline="\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Only mark the index complete if the scan finished without an exception
+        self.close(complete=exc_type is None)
+
+    def write(self, asset_type, entry):
+        self.file.write(json.dumps({"assetType": asset_type, "entry": entry}) + "\n")
+        self.file.flush()
+        self.count += 1
+
+    def close(self, complete=True):
+        if self.file is None:
+            return
+        if complete:
+            self.file.write(json.dumps({"end": True, "entries": self.count}) + "\n")
+        self.file.close()
+        self.file = None
+        if not complete:
+            os.remove(partial_path(self.path))
+            return
+        deadline = time.monotonic() + REPLACE_RETRY_SECONDS
+        while True:
+            try:
+                os.replace(partial_path(self.path), self.path)
+                return
+            except PermissionError:
+                # Followers close the file right after reading the end marker
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(FOLLOW_POLL_INTERVAL)
+
+def iter_records(path=NDJSON_INDEX_PATH, follow=False, poll_interval=FOLLOW_POLL_INTERVAL):
+    """
+    Returns a generator of (asset_type, entry) for every record in an NDJSON index,
+    reading one line at a time. The file is opened immediately, so a missing index
+    raises FileNotFoundError here rather than on first iteration.
+
+    Without follow, an index that ends before its end marker raises
+    IncompleteIndexError once the records it does hold have been read.
+
+    Args:
+        path: The .ndjson file to read.
+        follow: Keep waiting for new lines until the end marker is written, so
+            processing can start while asset_index is still scanning. The scan's
+            <path>.tmp is followed if one exists; if the scan aborts and removes it,
+            IncompleteIndexError is raised instead of waiting forever.
+        poll_interval: Seconds to sleep between polls in follow mode.
+    """
+    partial = follow and os.path.exists(partial_path(path))
+    if partial:
+        path = partial_path(path)
+    return _read_records(path, open(path, "r", encoding="utf-8"), follow, poll_interval, partial)
+
+def _read_records(path, f, follow, poll_interval, following_partial=False):
+    with f:
+        partial = ""
+        while True:
+            line = f.readline()
+            if not line:
+                if not follow:
+                    raise IncompleteIndexError(f"{path} has no end marker; the scan that wrote it did not finish")
+                if following_partial and not os.path.exists(path):
+                    # A complete scan writes the end marker before renaming the file, so a
+                    # vanished .tmp with nothing left to read means the scan was aborted
+                    line = f.readline()
+                    if not line:
+                        raise IncompleteIndexError(f"{path} was removed before its end marker; the scan was aborted")
+                else:
+                    time.sleep(poll_interval)
+                    continue
+            if not line.endswith("\n"):
+                # The writer is mid-line; keep what we have and read the rest later
+                partial += line
+                if not follow:
+                    raise IncompleteIndexError(f"{path} ends part way through a line; the scan that wrote it did not finish")
+                continue
+            line, partial = partial + line, ""
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("end"):
+                break
+            yield record["assetType"], record["entry"]
+
+def iter_assets(index_path, asset_type, follow=False):
+    """
+    Returns an iterator over the entries of one asset type, from either index format.
+
+    .ndjson files are streamed line by line. Legacy .json files have to be loaded
+    whole (here, so decode errors surface immediately), which means memory use is
+    only bounded for the NDJSON format.
+    """
+    if index_path.lower().endswith(".ndjson"):
+        records = iter_records(index_path, follow=follow)
+        return (entry for record_type, entry in records if record_type == asset_type)
+    with open(index_path, "r", encoding="utf-8") as f:
+        asset_index = json.load(f)
+    return iter(asset_index.get(asset_type, []))
+
+def ndjson_complete(path):
+    """True if the NDJSON index at path ends with its end marker."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 4096))
+            lines = f.read().splitlines()
+    except OSError:
+        return False
+    try:
+        return bool(lines) and json.loads(lines[-1]).get("end") is True
+    except ValueError:
+        return False
+
+def resolve_index_path():
+    """
+    Returns whichever of the NDJSON and legacy JSON index was generated most recently,
+    ignoring an NDJSON index left incomplete by an older, interrupted scan.
+    """
+    existing = [p for p in (NDJSON_INDEX_PATH, JSON_INDEX_PATH) if os.path.exists(p)
+                and (p != NDJSON_INDEX_PATH or ndjson_complete(p))]
+    if not existing:
+        return JSON_INDEX_PATH
+    return max(existing, key=os.path.getmtime)
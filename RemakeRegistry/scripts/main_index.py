@@ -1,15 +1,29 @@
 import os
+import sys
 import hashlib
 import sqlite3
 import json
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from RemakeRegistry.registry_stream import iter_assets
+from fastwalk import walk
+
 DB_PATH = "RemakeRegistry/asset_registry.db"
+BATCH_SIZE = 1000
+SOURCE_SUFFIXES = (".preinstanced", ".txd", ".snu", ".vp6")
+
+INSERT_SQL = """
+INSERT OR REPLACE INTO asset_registry
+    (uuid, sourceFileName, sourcePath, fileHash, pathNameHashMD5, assetType, stages, lastUpdated)
+VALUES (?, ?, ?, ?, ?, ?, ?, datetime('now'))
+"""
 
 def init_db():
-    """Initializes the SQLite database and table if not exists."""
+    """Initializes the SQLite database, table and lookup indexes if not exists."""
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS asset_registry (
         uuid TEXT PRIMARY KEY,
@@ -22,18 +36,15 @@ def init_db():
         lastUpdated TEXT
     )
     """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_asset_registry_fileHash ON asset_registry (fileHash)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_asset_registry_assetType ON asset_registry (assetType)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_asset_registry_sourcePath ON asset_registry (sourcePath)")
     conn.commit()
     conn.close()
 
-def insert_entry(entry, asset_type):
-    """Inserts or replaces an asset entry into the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
-    INSERT OR REPLACE INTO asset_registry 
-        (uuid, sourceFileName, sourcePath, fileHash, pathNameHashMD5, assetType, stages, lastUpdated)
-    VALUES (?, ?, ?, ?, ?, ?, ?, datetime('now'))
-    """, (
+def entry_row(entry, asset_type):
+    """Converts an asset entry into the parameter tuple for INSERT_SQL."""
+    return (
         entry["uuid"],
         entry["sourceFileName"],
         entry["sourcePath"],
@@ -41,7 +52,61 @@ def insert_entry(entry, asset_type):
         entry["pathNameHashMD5"],
         asset_type,
         json.dumps(entry["stages"])
-    ))
+    )
+
+class RegistryWriter:
+    """
+    Keeps one WAL-mode connection open and writes entries in batches.
+
+    Rows are buffered and written with executemany inside a single transaction
+    whenever batch_size rows are pending or flush() is called (scan_directories
+    flushes once per directory), instead of one connection and commit per file.
+    """
+
+    def __init__(self, db_path=DB_PATH, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.rows = []
+        self.written = 0
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def add(self, entry, asset_type):
+        self.rows.append(entry_row(entry, asset_type))
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        with self.conn:  # One transaction per batch
+            self.conn.executemany(INSERT_SQL, self.rows)
+        self.written += len(self.rows)
+        self.rows = []
+
+    def close(self):
+        if self.conn is not None:
+            self.flush()
+            self.conn.close()
+            self.conn = None
+
+def insert_entry(entry, asset_type, writer=None):
+    """
+    Inserts or replaces an asset entry into the database.
+    Pass a RegistryWriter to batch the insert; without one the row is committed immediately.
+    """
+    if writer is not None:
+        writer.add(entry, asset_type)
+        return
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute(INSERT_SQL, entry_row(entry, asset_type))
     conn.commit()
     conn.close()
 
@@ -73,13 +138,16 @@ def predict_converted_path(source_path, asset_type, stage, source_name):
             return os.path.join(r"A:\Dev\Games\TheSimpsonsGame\PAL\Modules\Video\GameFiles\Assets_1_Video_Movies", os.path.relpath(source_dir, r"Modules\Extract\GameFiles\USRDIR"), f"{name}.ogv")
     return None
 
-def scan_directories(directories):
+def scan_directories(directories, batch_size=BATCH_SIZE):
+    writer = RegistryWriter(batch_size=batch_size)
     for directory in directories:
         print(f"Scanning directory: {directory}")
-        for root, _, files in os.walk(directory):
+        for root, files in walk(directory, SOURCE_SUFFIXES):
             print(f"Processing directory: {root}")
-            for filename in files:
-                file_path = os.path.join(root, filename)
+            writer.flush()
+            for file_entry in files:
+                filename = file_entry.name
+                file_path = file_entry.path
                 try:
                     with open(file_path, "rb") as f:
                         file_hash_full = hashlib.sha256()
@@ -139,13 +207,32 @@ def scan_directories(directories):
                         if path:
                             entry["stages"][".ogv"] = {"path": path}
 
-                    insert_entry(entry, asset_type)
+                    insert_entry(entry, asset_type, writer)
 
                 except Exception as e:
                     print(f"Error processing file: {file_path} - {e}")
+    writer.close()
+    print(f"Wrote {writer.written} entries to {DB_PATH}")
+
+def load_asset_index(index_path, batch_size=BATCH_SIZE):
+    """Bulk-loads an existing asset_index (.json or .ndjson) into the database without rescanning."""
+    with RegistryWriter(batch_size=batch_size) as writer:
+        for asset_type in ("models", "textures", "audio", "video"):
+            for entry in iter_assets(index_path, asset_type):
+                writer.add(entry, asset_type)
+    print(f"Loaded {writer.written} entries from {index_path} into {DB_PATH}")
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Update RemakeRegistry/asset_registry.db")
+    parser.add_argument("--from-index", metavar="PATH", help="Load an existing asset_index.json/.ndjson instead of scanning")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Rows per transaction")
+    args = parser.parse_args()
+
     init_db()
+    if args.from_index:
+        load_asset_index(args.from_index, batch_size=args.batch_size)
+        sys.exit(0)
     directories_to_scan = [
         "Modules\\Extract\\GameFiles\\quickbms_out",
         "Source\\USRDIR\\Assets_1_Audio_Streams\\EN",
@@ -153,5 +240,5 @@ if __name__ == "__main__":
         "Source\\USRDIR\\Assets_1_Video_Movies\\en",
         "Source\\USRDIR\\Assets_1_Video_Movies\\sf",
     ]
-    scan_directories(directories_to_scan)
+    scan_directories(directories_to_scan, batch_size=args.batch_size)
     print("Database asset registry updated.")
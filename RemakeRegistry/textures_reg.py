@@ -1,62 +1,78 @@
 import os
+import sys
 import json
 import hashlib
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from RemakeRegistry.hash_cache import HashCache, sha256_file
+from RemakeRegistry.registry_stream import iter_assets, resolve_index_path, IncompleteIndexError
+from printer import Logger, colours
+
+log = Logger("textures_reg")
+
 def generate_uuid_from_path(file_path):
     """Generates a UUID based on the path hash."""
     path_hash = hashlib.md5(file_path.encode()).hexdigest()
     return f"0000000000000000_{path_hash[:16]}" # Placeholder file hash
 
-def generate_file_hash(file_path):
-    """Generates the SHA256 hash of the file content."""
+def generate_file_hash(file_path, hash_cache=None):
+    """Generates the SHA256 hash of the file content, reusing hash_cache when given."""
     try:
-        with open(file_path, 'rb') as f:
-            file_content = f.read()
-            return hashlib.sha256(file_content).hexdigest()
+        if hash_cache is not None:
+            return hash_cache.get_hash(file_path)
+        return sha256_file(file_path)
     except Exception as e:
-        print(f"Error reading file {file_path}: {e}")
+        log.error(f"Error reading file {file_path}: {e}")
         return None
 
 def generate_path_hash(file_path):
     """Generates the MD5 hash of the file path."""
     return hashlib.md5(file_path.encode()).hexdigest()
 
-def create_texture_registry(asset_index_path="RemakeRegistry/asset_index.json", output_path="RemakeRegistry/texture_reg.json"):
+def create_texture_registry(asset_index_path=None, output_path="RemakeRegistry/texture_reg.json"):
     """
-    Reads the asset_index.json, scans .png_directory entries, and creates texture_reg.json.
+    Reads the asset index (.json or streamed .ndjson), scans .png_directory entries, and creates texture_reg.json.
+    Defaults to whichever index format was generated most recently.
     """
+    log.start()
+    if asset_index_path is None:
+        asset_index_path = resolve_index_path()
     try:
-        with open(asset_index_path, 'r') as f:
-            asset_index = json.load(f)
+        # Read every entry up front so a truncated or malformed NDJSON index is reported here
+        texture_entries = list(iter_assets(asset_index_path, "textures"))
     except FileNotFoundError:
-        print(f"Error: {asset_index_path} not found.")
+        log.error(f"Error: {asset_index_path} not found.")
+        return
+    except IncompleteIndexError as e:
+        log.error(f"Error: {e}. Run asset_index.py again.")
         return
     except json.JSONDecodeError:
-        print(f"Error: Could not decode JSON from {asset_index_path}.")
+        log.error(f"Error: Could not decode JSON from {asset_index_path}.")
         return
 
     textures = []
-    for texture_entry in asset_index.get("textures", []):
-        print(f"Processing texture entry: {texture_entry.get('uuid', 'Unknown')}")
+    hash_cache = HashCache()
+    for texture_entry in texture_entries:
+        log.verbose(f"Processing texture entry: {texture_entry.get('uuid', 'Unknown')}")
         if ".txd" in texture_entry["stages"]:
-            print(f"Found .txd stage for texture entry: {texture_entry.get('uuid', 'Unknown')}")
+            log.verbose(f"Found .txd stage for texture entry: {texture_entry.get('uuid', 'Unknown')}")
             txd_stage = texture_entry["stages"][".txd"]
             txd_path = txd_stage["path"]
             txd_uuid = texture_entry["uuid"]
 
             png_directory = texture_entry["stages"].get(".png_directory")
             if png_directory:
-                print(f"Found .png_directory for texture entry: {texture_entry.get('uuid', 'Unknown')}")
+                log.verbose(f"Found .png_directory for texture entry: {texture_entry.get('uuid', 'Unknown')}")
                 png_dir_path = png_directory["path"]
                 if png_dir_path and os.path.isdir(png_dir_path):
-                    print(f"Processing PNG directory: {png_dir_path}")
+                    log.verbose(f"Processing PNG directory: {png_dir_path}")
                     for filename in os.listdir(png_dir_path):
-                        print(f"Processing file: {filename}")
+                        log.verbose(f"Processing file: {filename}")
                         if filename.lower().endswith(".png"):
-                            print(f"Found PNG file: {filename}")
+                            log.verbose(f"Found PNG file: {filename}")
                             png_file_path = os.path.join(png_dir_path, filename)
                             relative_png_path = os.path.relpath(png_file_path, os.getcwd())
-                            file_hash = generate_file_hash(png_file_path)
+                            file_hash = generate_file_hash(png_file_path, hash_cache)
                             path_name_hash_md5 = generate_path_hash(relative_png_path)
                             png_uuid = f"{file_hash[:16]}_{path_name_hash_md5[:16]}" if file_hash else generate_uuid_from_path(relative_png_path)
                             textures_path = os.path.relpath(png_dir_path, os.path.join(os.getcwd(), "Modules", "Texture", "GameFiles", "Textures_out"))
@@ -72,22 +88,39 @@ def create_texture_registry(asset_index_path="RemakeRegistry/asset_index.json",
                                     "uuid": txd_uuid # UUID from the TXD entry
                                 }
                             })
+                            log.progress(num_bytes=os.path.getsize(png_file_path) if file_hash else 0)
                 else:
-                    print(f"Warning: Predicted PNG directory '{png_dir_path}' for '{txd_path}' is not a valid directory.")
+                    log.verbose(f"Warning: Predicted PNG directory '{png_dir_path}' for '{txd_path}' is not a valid directory.", colours.YELLOW)
+                    log.count("missing png directories")
             else:
-                print(f"Warning: No valid '.png_directory' found for '{txd_path}'.")
+                log.verbose(f"Warning: No valid '.png_directory' found for '{txd_path}'.", colours.YELLOW)
+                log.count("missing png directories")
+
+    hash_cache.close()
+    log.info(f"Hash cache: {hash_cache.hits} reused, {hash_cache.misses} hashed", colours.GREEN)
 
     output_data = {"textures": textures}
     try:
         with open(output_path, 'w') as outfile:
             json.dump(output_data, outfile, indent=4)
-        print(f"Successfully created {output_path}")
+        log.info(f"Successfully created {output_path}", colours.GREEN)
         if len(textures) != 7318:
-            print(f"Warning: Expected 7318 textures, but found {len(textures)}.")
+            log.warning(f"Warning: Expected 7318 textures, but found {len(textures)}.")
         else:
-            print(f"{len(textures)} texture entries found.")
+            log.info(f"{len(textures)} texture entries found.", colours.GREEN)
     except IOError:
-        print(f"Error: Could not write to {output_path}.")
+        log.error(f"Error: Could not write to {output_path}.")
+    log.summary()
 
 if __name__ == "__main__":
-    create_texture_registry()
+    import argparse
+    from Pipeline.profiler import PROFILE_MODES, profiled
+    parser = argparse.ArgumentParser(description="Generate RemakeRegistry/texture_reg.json")
+    parser.add_argument("--verbose", action="store_true", help="Print per-entry and per-PNG messages")
+    parser.add_argument("--profile", nargs="?", const="auto", choices=PROFILE_MODES,
+                        help="Profile the build into RemakeRegistry/profiles (default mode: auto)")
+    args = parser.parse_args()
+    if args.verbose:
+        log.set_level("verbose")
+
+    profiled("textures_reg", create_texture_registry, mode=args.profile)()
@@ -1,7 +1,11 @@
 import os
+import sys
 import csv
 import hashlib
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fastwalk import walk_files
+
 # Change this to your directory
 root_dir = r"C:\path\to\your\directory"
 
@@ -13,13 +17,12 @@ def generate_md5(text):
 
 file_map = []
 
-for dirpath, _, filenames in os.walk(root_dir):
-    for filename in filenames:
-        full_path = os.path.join(dirpath, filename)
-        # Use the full path as the unique identifier for hashing
-        hash_input = full_path
-        md5_hash = generate_md5(hash_input)
-        file_map.append([full_path, filename, md5_hash])
+for entry in walk_files(root_dir):
+    full_path = entry.path
+    # Use the full path as the unique identifier for hashing
+    hash_input = full_path
+    md5_hash = generate_md5(hash_input)
+    file_map.append([full_path, entry.name, md5_hash])
 
 # Write to CSV
 with open(output_csv, "w", newline='', encoding="utf-8") as csvfile:
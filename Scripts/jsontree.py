@@ -9,18 +9,15 @@ def generate_key_value_pairs(path):
     # Initialize the result dictionary with the directory name as both key and value
     result = {folder_name: folder_name}
     
-    # List all items in the folder
-    items = os.listdir(path)
-    
-    for item in items:
-        item_path = os.path.join(path, item)
-        
-        # If the item is a directory, recurse into it and add it as a nested dictionary
-        if os.path.isdir(item_path):
-            result[item] = generate_key_value_pairs(item_path)
-        else:
-            # If it's a file, add the file name as value
-            result[item] = item
+    # List all items in the folder; scandir entries already know whether they are directories
+    with os.scandir(path) as items:
+        for item in items:
+            # If the item is a directory, recurse into it and add it as a nested dictionary
+            if item.is_dir():
+                result[item.name] = generate_key_value_pairs(item.path)
+            else:
+                # If it's a file, add the file name as value
+                result[item.name] = item.name
     
     return result
 
@@ -0,0 +1,159 @@
+"""
+In-process decompressor for the dk2 compression used inside SToc .str archives.
+
+QuickBMS calls it "dk2" (from Dklibs); it is EA's RefPack LZ77 variant, recognised by
+the 0x10fb marker at the start of a compressed block:
+
+    byte 0      flags: 0x80 = 4-byte size fields (else 3), 0x01 = a compressed-size field follows
+    byte 1      0xFB
+    [size]      compressed size (only when flags & 0x01)
+    size        decompressed size, big-endian
+
+followed by a stream of commands, each copying 0-3 (or up to 112) literal bytes from the
+input and then optionally a back-reference from the last 128 KiB of output:
+
+    0x00-0x7F  2 bytes   literals 0-3, copy 3-10 bytes, offset 1-1024
+    0x80-0xBF  3 bytes   literals 0-3, copy 4-67 bytes, offset 1-16384
+    0xC0-0xDF  4 bytes   literals 0-3, copy 5-1028 bytes, offset 1-131072
+    0xE0-0xFB  1 byte    literals 4-112, no copy
+    0xFC-0xFF  1 byte    literals 0-3, end of stream
+
+iter_decompress() only keeps that 128 KiB window plus one chunk in memory, so large
+entries can be written to disk in bounded chunks.
+"""
+
+WINDOW_SIZE = 131072
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+class Dk2Error(ValueError):
+    """Raised for data that is not a valid dk2 (RefPack) stream."""
+
+def is_compressed(data):
+    """Returns True if data starts with a dk2 (RefPack) header."""
+    return len(data) >= 2 and data[1] == 0xFB and (data[0] & 0x3E) == 0x10
+
+def read_header(data):
+    """
+    Parses the dk2 header.
+
+    Returns:
+        (decompressed_size, header_length)
+    """
+    if not is_compressed(data):
+        raise Dk2Error("missing dk2 (0x10fb) header")
+    flags = data[0]
+    width = 4 if flags & 0x80 else 3
+    pos = 2
+    if flags & 0x01:
+        pos += width
+    if len(data) < pos + width:
+        raise Dk2Error("truncated dk2 header")
+    size = int.from_bytes(data[pos:pos + width], "big")
+    return size, pos + width
+
+def decompressed_size(data):
+    return read_header(data)[0]
+
+def iter_decompress(data, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Decompresses a dk2 stream, yielding the output as bytes chunks of at most chunk_size.
+
+    Args:
+        data: The compressed block (bytes, bytearray or memoryview, e.g. StocArchive.raw()).
+        chunk_size: Largest chunk yielded; memory use is about chunk_size + 128 KiB.
+    """
+    size, pos = read_header(data)
+    # Indexing bytes is faster than indexing a memoryview; this only copies the compressed block
+    src = data if isinstance(data, (bytes, bytearray)) else bytes(data)
+    end = len(src)
+    out = bytearray()
+    base = 0      # Total output offset of out[0]
+    emitted = 0   # Bytes of out already yielded
+    chunk_size = max(1, chunk_size)
+
+    try:
+        while pos < end:
+            b0 = src[pos]
+            if b0 < 0x80:
+                b1 = src[pos + 1]
+                pos += 2
+                literal = b0 & 0x03
+                length = ((b0 & 0x1C) >> 2) + 3
+                offset = ((b0 & 0x60) << 3) + b1 + 1
+            elif b0 < 0xC0:
+                b1 = src[pos + 1]
+                b2 = src[pos + 2]
+                pos += 3
+                literal = b1 >> 6
+                length = (b0 & 0x3F) + 4
+                offset = ((b1 & 0x3F) << 8) + b2 + 1
+            elif b0 < 0xE0:
+                b1 = src[pos + 1]
+                b2 = src[pos + 2]
+                b3 = src[pos + 3]
+                pos += 4
+                literal = b0 & 0x03
+                length = ((b0 & 0x0C) << 6) + b3 + 5
+                offset = ((b0 & 0x10) << 12) + (b1 << 8) + b2 + 1
+            elif b0 < 0xFC:
+                pos += 1
+                literal = ((b0 & 0x1F) << 2) + 4
+                length = 0
+            else:
+                pos += 1
+                literal = b0 & 0x03
+                out += src[pos:pos + literal]
+                pos += literal
+                break
+
+            if literal:
+                if pos + literal > end:
+                    raise Dk2Error("literal run past end of input")
+                out += src[pos:pos + literal]
+                pos += literal
+
+            if length:
+                start = len(out) - offset
+                if start < 0:
+                    raise Dk2Error(f"back-reference before start of output at input offset {pos}")
+                if offset >= length:
+                    out += out[start:start + length]
+                else:
+                    # Overlapping copy repeats the last `offset` bytes
+                    pattern = out[start:]
+                    repeats, remainder = divmod(length, offset)
+                    out += pattern * repeats + pattern[:remainder]
+
+            if len(out) - emitted >= chunk_size + WINDOW_SIZE:
+                while len(out) - emitted >= chunk_size + WINDOW_SIZE:
+                    yield bytes(out[emitted:emitted + chunk_size])
+                    emitted += chunk_size
+                # Drop everything that is both emitted and outside the window
+                drop = emitted - WINDOW_SIZE
+                if drop > 0:
+                    del out[:drop]
+                    base += drop
+                    emitted -= drop
+    except IndexError:
+        raise Dk2Error("truncated dk2 stream") from None
+
+    total = base + len(out)
+    if total != size:
+        raise Dk2Error(f"decompressed {total} bytes, header says {size}")
+    while emitted < len(out):
+        yield bytes(out[emitted:emitted + chunk_size])
+        emitted += chunk_size
+
+def decompress(data, expected_size=None):
+    """
+    Decompresses a whole dk2 block into bytes.
+
+    Args:
+        data: The compressed block.
+        expected_size: Optional size from the archive table, checked against the result.
+    """
+    size = decompressed_size(data)
+    result = b"".join(iter_decompress(data, chunk_size=max(size, 1)))
+    if expected_size is not None and len(result) != expected_size:
+        raise Dk2Error(f"decompressed {len(result)} bytes, archive table says {expected_size}")
+    return result
@@ -0,0 +1,123 @@
+"""
+Validation and throughput benchmark for the in-process dk2 decompressor.
+
+validate: compares every entry decoded by StrArchive against QuickBMS output produced
+with StrArchive/stoc_raw.bms (one <index>.dat per entry). Pass --quickbms to run
+QuickBMS first, or point --reference at an existing dump.
+
+bench: decodes every entry of the given archives and reports MB/s.
+
+Usage:
+    python StrArchive/dk2_check.py validate archive.str --quickbms path/to/quickbms.exe
+    python StrArchive/dk2_check.py validate archive.str --reference dump_dir
+    python StrArchive/dk2_check.py bench USRDIR/Map_3-00_GameHub/gamehub.str --repeat 3
+"""
+
+import os
+import sys
+import time
+import hashlib
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from StrArchive.stoc import StocArchive
+from RemakeRegistry.hash_engine import sha256_file_buffered
+from printer import Logger, colours, format_bytes
+
+RAW_BMS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stoc_raw.bms")
+
+log = Logger("dk2_check")
+
+def run_quickbms(quickbms, archive_path, output_dir):
+    """Dumps archive_path with stoc_raw.bms into output_dir."""
+    os.makedirs(output_dir, exist_ok=True)
+    subprocess.run([quickbms, "-o", RAW_BMS_PATH, archive_path, output_dir], check=True,
+                   stdout=subprocess.DEVNULL)
+
+def validate(archive_path, reference_dir, chunk_size):
+    """
+    Compares each entry against reference_dir/<index>.dat.
+
+    Returns:
+        Number of mismatching or missing entries.
+    """
+    failures = 0
+    with StocArchive(archive_path) as archive:
+        for entry in archive.entries:
+            reference_path = os.path.join(reference_dir, f"{entry.index:08d}.dat")
+            if not os.path.isfile(reference_path):
+                log.error(f"{archive_path} #{entry.index}: no QuickBMS output {reference_path}")
+                failures += 1
+                continue
+            ours = hashlib.sha256()
+            length = 0
+            for chunk in archive.iter_entry_chunks(entry, chunk_size):
+                ours.update(chunk)
+                length += len(chunk)
+            log.progress(num_bytes=length)
+            if ours.hexdigest() != sha256_file_buffered(reference_path):
+                log.error(f"{archive_path} #{entry.index}: mismatch ({length} bytes vs {os.path.getsize(reference_path)})")
+                failures += 1
+            else:
+                log.count("matched")
+                log.verbose(f"{archive_path} #{entry.index}: ok ({length} bytes, dk2={entry.compressed})")
+    return failures
+
+def bench(archive_paths, chunk_size, repeat):
+    stored = decoded = 0
+    best = None
+    for _ in range(max(1, repeat)):
+        stored = decoded = 0
+        start = time.perf_counter()
+        for archive_path in archive_paths:
+            with StocArchive(archive_path) as archive:
+                for entry in archive.entries:
+                    if not entry.compressed:
+                        continue
+                    stored += entry.stored_size
+                    for chunk in archive.iter_entry_chunks(entry, chunk_size):
+                        decoded += len(chunk)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    best = max(best, 1e-9)
+    log.info(f"dk2: {format_bytes(stored)} -> {format_bytes(decoded)} in {best:.3f}s "
+             f"({decoded / best / 1e6:.1f} MB/s out, {stored / best / 1e6:.1f} MB/s in, best of {max(1, repeat)})", colours.GREEN)
+
+if __name__ == "__main__":
+    import argparse
+    from StrArchive.dk2 import DEFAULT_CHUNK_SIZE
+    parser = argparse.ArgumentParser(description="Validate and benchmark the dk2 decompressor")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    validate_parser = subparsers.add_parser("validate", help="Compare against QuickBMS output")
+    validate_parser.add_argument("archives", nargs="+")
+    group = validate_parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--quickbms", help="QuickBMS executable to produce the reference dump")
+    group.add_argument("--reference", help="Existing stoc_raw.bms dump (single archive only)")
+    validate_parser.add_argument("--verbose", action="store_true")
+    bench_parser = subparsers.add_parser("bench", help="Measure decompression throughput")
+    bench_parser.add_argument("archives", nargs="+")
+    bench_parser.add_argument("--repeat", type=int, default=1)
+    for sub in (validate_parser, bench_parser):
+        sub.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        bench(args.archives, args.chunk_size, args.repeat)
+        log.flush()
+        sys.exit(0)
+
+    if args.verbose:
+        log.set_level("verbose")
+    if args.reference and len(args.archives) != 1:
+        parser.error("--reference takes exactly one archive")
+    failures = 0
+    for archive_path in args.archives:
+        if args.reference:
+            failures += validate(archive_path, args.reference, args.chunk_size)
+            continue
+        with tempfile.TemporaryDirectory() as reference_dir:
+            run_quickbms(args.quickbms, archive_path, reference_dir)
+            failures += validate(archive_path, reference_dir, args.chunk_size)
+    log.summary()
+    sys.exit(1 if failures else 0)
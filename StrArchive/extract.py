@@ -0,0 +1,365 @@
+"""
+Parallel extraction of every .str archive under USRDIR into quickbms_out.
+
+Each archive is extracted into its own folder (USRDIR\\<dir>\\<name>.str ->
+quickbms_out\\<dir>\\<name>_str), so archives are independent jobs and running them
+concurrently produces exactly the same tree as running them one after another.
+
+Engines:
+    quickbms  one QuickBMS process per archive with simpsons_str.bms (reference output)
+    native    StrArchive.stoc + dk2 in a process pool; sub-file names follow the
+              assumptions documented in StrArchive/subfiles.py
+
+Selective extraction:
+    --archive / --skip-archive  globs on the archive path or any folder in it (Map_3-05_*)
+    --include / --exclude       globs on the extracted file path or its name (*.txd)
+    --ext                       shorthand for --include *<ext>
+Archives that are not selected are never opened. Within an archive only matching files
+are written (QuickBMS gets the same globs through its -f filter).
+
+Usage:
+    python StrArchive/extract.py --workers 6
+    python StrArchive/extract.py --engine native --usrdir Modules\\Extract\\GameFiles\\USRDIR
+    python StrArchive/extract.py --archive Map_3-05_* --ext .txd .preinstanced
+
+An interrupted run (crash, Ctrl-C, failed archives) is resumed from its journal
+(Pipeline/journal.py): archives it finished are not extracted again. --fresh starts over.
+"""
+
+import os
+import sys
+import time
+import fnmatch
+import hashlib
+import itertools
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from StrArchive.stoc import StocArchive
+from StrArchive.subfiles import SUBFILE_HEADER, split_entry, single_subfile
+from StrArchive.manifest import MANIFEST_PATH, file_record, snapshot_folder, update_manifest
+from Pipeline.journal import Journal
+from Pipeline.governor import default_governor
+from fastwalk import walk_files
+from printer import Logger, colours, format_bytes
+
+USRDIR_PATH = r"Modules\Extract\GameFiles\USRDIR"
+OUTPUT_PATH = r"Modules\Extract\GameFiles\quickbms_out"
+QUICKBMS_PATH = r"Modules\Extract\Tools\quickbms\quickbms.exe"
+BMS_SCRIPT_PATH = r"Modules\Extract\Tools\quickbms\simpsons_str.bms"
+ENGINES = ("quickbms", "native")
+
+# Extraction is mostly disk bound past a handful of concurrent archives
+MAX_IO_WORKERS = 6
+DEFAULT_WORKERS = max(1, min(os.cpu_count() or 1, MAX_IO_WORKERS))
+
+log = Logger("extract")
+
+def native_path(path):
+    """Converts a backslash registry-style path to the host separator."""
+    return path.replace("\\", os.sep)
+
+def glob_match(path, pattern):
+    """Case-insensitive glob match of a backslash path, its file name or (for folders) any component."""
+    path = path.replace("/", "\\").lower()
+    pattern = pattern.replace("/", "\\").lower()
+    if fnmatch.fnmatchcase(path, pattern):
+        return True
+    return any(fnmatch.fnmatchcase(part, pattern) for part in path.split("\\"))
+
+class Selection:
+    """
+    Include/exclude globs for archives and for the files extracted from them.
+    An empty include list selects everything; excludes always win. names restricts
+    extraction to exact file names (used to repair individual files).
+    """
+
+    def __init__(self, include=None, exclude=None, extensions=None, archives=None, skip_archives=None, names=None):
+        self.names = {name.lower() for name in names} if names else None
+        self.include = list(include or [])
+        for extension in extensions or []:
+            self.include.append("*" + (extension if extension.startswith(".") else "." + extension))
+        self.exclude = list(exclude or [])
+        self.archives = list(archives or [])
+        self.skip_archives = list(skip_archives or [])
+
+    @property
+    def filters_files(self):
+        return bool(self.include or self.exclude or self.names)
+
+    @staticmethod
+    def _selected(path, include, exclude):
+        if include and not any(glob_match(path, pattern) for pattern in include):
+            return False
+        return not any(glob_match(path, pattern) for pattern in exclude)
+
+    def wants_archive(self, relative_archive_path):
+        return self._selected(relative_archive_path, self.archives, self.skip_archives)
+
+    def wants_file(self, name):
+        """name is the path of an extracted file inside its <name>_str folder."""
+        if self.names is not None and name.lower() not in self.names:
+            return False
+        return self._selected(name, self.include, self.exclude)
+
+    def quickbms_filter(self):
+        """Returns the equivalent QuickBMS -f argument, or None when every file is wanted."""
+        if not self.filters_files:
+            return None
+        return ";".join(sorted(self.names or []) + self.include + ["!" + pattern for pattern in self.exclude])
+
+def find_archives(usrdir=USRDIR_PATH, selection=None):
+    """
+    Returns every (selected) .str archive under usrdir, largest first so the long jobs start early.
+    """
+    root = native_path(usrdir)
+    archives = [(entry.stat().st_size, entry.path) for entry in walk_files(root, ".str")
+                if selection is None or selection.wants_archive(os.path.relpath(entry.path, root))]
+    archives.sort(key=lambda item: (-item[0], item[1]))
+    return [path for _, path in archives]
+
+def archive_output_dir(archive_path, usrdir=USRDIR_PATH, output_root=OUTPUT_PATH):
+    """Maps USRDIR\\<dir>\\<name>.str to quickbms_out\\<dir>\\<name>_str."""
+    relative = os.path.relpath(archive_path, native_path(usrdir))
+    folder, filename = os.path.split(relative)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(native_path(output_root), folder, f"{stem}_str")
+
+def extract_with_quickbms(archive_path, output_dir, quickbms=QUICKBMS_PATH, bms_script=BMS_SCRIPT_PATH, selection=None):
+    """
+    Runs QuickBMS on one archive.
+
+    Returns:
+        The manifest records of the output folder (only the repaired names for a repair run).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    command = [native_path(quickbms), "-o", "-Q"]
+    file_filter = selection.quickbms_filter() if selection is not None else None
+    if file_filter:
+        command += ["-f", file_filter]
+    result = default_governor().run("quickbms", command + [native_path(bms_script), archive_path, output_dir],
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"QuickBMS exited with {result.returncode}: {result.stderr.strip()[-500:]}")
+    names = None
+    if selection is not None and selection.names is not None:
+        names = {name for name in snapshot_folder_names(output_dir) if name.lower() in selection.names}
+    return snapshot_folder(output_dir, names)
+
+def snapshot_folder_names(output_dir):
+    return {os.path.relpath(entry.path, output_dir).replace(os.sep, "\\") for entry in walk_files(output_dir)}
+
+def write_chunks(target, chunks, skip=0):
+    """Writes chunks to target, dropping the first skip bytes. Returns the SHA-256 of what was written."""
+    file_hash = hashlib.sha256()
+    with open(target, "wb") as f:
+        for chunk in chunks:
+            if skip:
+                if len(chunk) <= skip:
+                    skip -= len(chunk)
+                    continue
+                chunk, skip = chunk[skip:], 0
+            f.write(chunk)
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+def extract_native(archive_path, output_dir, selection=None):
+    """
+    Extracts one archive in-process, writing only the files selection wants.
+    Entries that hold a single file are streamed with iter_entry_chunks; only entries
+    with several sub-files are decoded whole, since their layout has to be parsed.
+
+    Returns:
+        The manifest records of the files written.
+    """
+    files = {}
+    with StocArchive(archive_path) as archive:
+        for entry in archive.entries:
+            chunks = archive.iter_entry_chunks(entry)
+            head = []
+            while sum(len(chunk) for chunk in head) < SUBFILE_HEADER.size and (chunk := next(chunks, None)) is not None:
+                head.append(chunk)
+            single = single_subfile(b"".join(head)[:SUBFILE_HEADER.size], entry.size, entry.index)
+            if single is not None:
+                if selection is None or selection.wants_file(single.name):
+                    target = os.path.join(output_dir, native_path(single.name))
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    file_hash = write_chunks(target, itertools.chain(head, chunks), skip=single.offset)
+                    files[single.name] = file_record(target, file_hash)
+                chunks.close()
+                continue
+            data = b"".join(itertools.chain(head, chunks))
+            view = memoryview(data)
+            for subfile in split_entry(data, entry.index):
+                if selection is not None and not selection.wants_file(subfile.name):
+                    continue
+                target = os.path.join(output_dir, native_path(subfile.name))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                payload = view[subfile.offset:subfile.offset + subfile.size]
+                with open(target, "wb") as f:
+                    f.write(payload)
+                files[subfile.name] = file_record(target, hashlib.sha256(payload).hexdigest())
+    return files
+
+def extract_archive(archive_path, output_dir, engine="quickbms", quickbms=QUICKBMS_PATH, bms_script=BMS_SCRIPT_PATH,
+                    selection=None):
+    """
+    Extracts one archive and reports the outcome instead of raising, so one bad
+    archive never aborts a batch. Runs in a worker process for the native engine.
+
+    Returns:
+        dict with archive, output, engine, files, bytes, seconds, error (None on success)
+        and manifest (name -> [size, mtimeNs, sha256] of the files written). A native
+        run of the whole archive also carries contents (name -> [size, sha256]), since
+        what it wrote is everything the archive holds.
+    """
+    start = time.perf_counter()
+    result = {"archive": archive_path, "output": output_dir, "engine": engine, "files": 0, "bytes": 0, "error": None,
+              "manifest": None}
+    try:
+        if engine == "native":
+            result["manifest"] = extract_native(archive_path, output_dir, selection)
+            if selection is None or not selection.filters_files:
+                result["contents"] = {name: [record[0], record[2]] for name, record in result["manifest"].items()}
+        else:
+            result["manifest"] = extract_with_quickbms(archive_path, output_dir, quickbms, bms_script, selection)
+        result["files"] = len(result["manifest"])
+        result["bytes"] = sum(record[0] for record in result["manifest"].values())
+    except Exception as e:
+        # Malformed layouts also surface as ValueError, struct.error or IndexError; any of
+        # them only fails this archive
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+def archive_fingerprint(archive_path, engine, selection=None):
+    """Identifies what a journaled extraction was made from: archive size and mtime, engine and file filter."""
+    st = os.stat(archive_path)
+    file_filter = selection.quickbms_filter() if selection is not None else None
+    return f"{st.st_size}:{st.st_mtime_ns}:{engine}:{file_filter or '*'}"
+
+def report(result, done, total):
+    name = os.path.relpath(result["archive"])
+    if result["error"]:
+        log.error(f"[{done}/{total}] {name}: {result['error']}")
+        return
+    log.count("archives")
+    log.info(f"[{done}/{total}] {name}: {result['files']} files, {format_bytes(result['bytes'])} "
+             f"in {result['seconds']:.1f}s", colours.GREEN)
+    log.progress(files=result["files"], num_bytes=result["bytes"])
+
+def extract_all(archives=None, usrdir=USRDIR_PATH, output_root=OUTPUT_PATH, workers=DEFAULT_WORKERS,
+                engine="quickbms", quickbms=QUICKBMS_PATH, bms_script=BMS_SCRIPT_PATH, selection=None,
+                manifest_path=MANIFEST_PATH, journal=None):
+    """
+    Extracts archives (all selected .str under usrdir by default) with up to `workers` running at once.
+    The files written are recorded in the manifest at manifest_path (None to skip).
+
+    With a Pipeline.journal.Journal, every finished archive is journaled as it completes,
+    and archives already finished in an interrupted run are not extracted again; their
+    journaled results are returned as if they had just been extracted.
+
+    QuickBMS jobs are already separate processes, so they are driven from a thread pool;
+    native jobs run in a process pool. workers=1 extracts serially in this process.
+
+    Returns:
+        list of per-archive result dicts (see extract_archive), in completion order.
+    """
+    log.start()
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
+    if engine == "quickbms":
+        for path in (quickbms, bms_script):
+            if not os.path.isfile(native_path(path)):
+                raise FileNotFoundError(f"QuickBMS engine needs {path}")
+    if archives is None:
+        archives = find_archives(usrdir, selection)
+    total = len(archives)
+    results = []
+    fingerprints = {}
+    if journal is not None:
+        fingerprints = {path: archive_fingerprint(path, engine, selection) for path in archives}
+        todo = journal.pending("extract", archives, fingerprints.get)
+        remaining = set(todo)
+        results = [journal.data("extract", path) for path in archives if path not in remaining]
+        if results:
+            log.info(f"Resuming: {len(results)} archives were already extracted by the interrupted run", colours.CYAN)
+        archives = todo
+    log.info(f"Extracting {len(archives)} archives with {workers} worker(s) ({engine})", colours.CYAN)
+
+    def finished(result):
+        results.append(result)
+        report(result, len(results), total)
+        if journal is not None:
+            status = "failed" if result["error"] else "done"
+            journal.record("extract", result["archive"], status, fingerprints[result["archive"]],
+                           data=result if status == "done" else None)
+
+    jobs = [(path, archive_output_dir(path, usrdir, output_root)) for path in archives]
+    if workers <= 1:
+        for archive_path, output_dir in jobs:
+            finished(extract_archive(archive_path, output_dir, engine, quickbms, bms_script, selection))
+    else:
+        executor_class = ProcessPoolExecutor if engine == "native" else ThreadPoolExecutor
+        with executor_class(max_workers=workers) as executor:
+            futures = [executor.submit(extract_archive, archive_path, output_dir, engine, quickbms, bms_script, selection)
+                       for archive_path, output_dir in jobs]
+            for future in as_completed(futures):
+                finished(future.result())
+
+    if manifest_path:
+        update_manifest(results, manifest_path, merge=selection is not None and selection.filters_files,
+                        workers=workers)
+
+    failed = [result for result in results if result["error"]]
+    if failed:
+        log.warning(f"{len(failed)} of {total} archives failed:")
+        for result in failed:
+            log.warning(f"  {result['archive']}: {result['error']}")
+    log.summary()
+    return results
+
+def main(workers=DEFAULT_WORKERS, engine="quickbms"):
+    """Entry point used by main.py. Returns True if every archive extracted; an interrupted run is resumed."""
+    with Journal("extract") as journal:
+        try:
+            results = extract_all(workers=workers, engine=engine, journal=journal)
+        except (FileNotFoundError, ValueError) as e:
+            log.error(str(e))
+            log.flush()
+            return False
+        ok = not any(result["error"] for result in results)
+        if ok:
+            journal.finish_run()
+    return ok
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Extract all .str archives in parallel")
+    parser.add_argument("archives", nargs="*", help="Archives to extract (default: every .str under --usrdir)")
+    parser.add_argument("--usrdir", default=USRDIR_PATH)
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Archives extracted at once (1 = serial)")
+    parser.add_argument("--engine", choices=ENGINES, default="quickbms")
+    parser.add_argument("--quickbms", default=QUICKBMS_PATH)
+    parser.add_argument("--bms", default=BMS_SCRIPT_PATH)
+    parser.add_argument("--archive", nargs="+", default=[], metavar="GLOB", help="Only archives matching, e.g. Map_3-05_*")
+    parser.add_argument("--skip-archive", nargs="+", default=[], metavar="GLOB")
+    parser.add_argument("--include", nargs="+", default=[], metavar="GLOB", help="Only files matching, e.g. *.txd")
+    parser.add_argument("--exclude", nargs="+", default=[], metavar="GLOB")
+    parser.add_argument("--ext", nargs="+", default=[], help="Only files with these extensions, e.g. .txd .preinstanced")
+    parser.add_argument("--fresh", action="store_true", help="Ignore an interrupted run instead of resuming it")
+    args = parser.parse_args()
+
+    selection = Selection(args.include, args.exclude, args.ext, args.archive, args.skip_archive)
+    with Journal("extract", fresh=args.fresh) as journal:
+        try:
+            results = extract_all(args.archives or None, args.usrdir, args.output, args.workers,
+                                  args.engine, args.quickbms, args.bms, selection, journal=journal)
+        except (FileNotFoundError, ValueError) as e:
+            parser.error(str(e))
+        failed = any(result["error"] for result in results)
+        if not failed:
+            journal.finish_run()
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,310 @@
+"""
+Extraction manifest and verification for quickbms_out.
+
+MANIFEST_PATH lists, per archive, every file a complete extraction holds with its size
+and SHA-256, and the mtime each file had when it was last confirmed on disk (None while
+it is missing or differs). An archive is "complete" only when every one of its files is
+confirmed. What "every file" means depends on the engine that extracted the archive:
+
+    native    the archive's table of contents (StrArchive.toc_index.expected_contents),
+              which uses the same layout (StrArchive/subfiles.py) as the native extractor
+    quickbms  the files QuickBMS wrote; that layout is not validated against QuickBMS
+              output yet, so it cannot be the reference
+
+verify_extraction() then checks the tree cheaply:
+
+1. a file that is missing or has the wrong size is bad, no hashing needed,
+2. a file whose mtime still matches the manifest is taken as intact,
+3. only the remaining files (touched since extraction, or all with deep=True) are
+   hashed, in parallel with RemakeRegistry.hash_engine.
+
+repair_extraction() re-extracts just the bad files of the affected archives.
+
+Usage:
+    python StrArchive/manifest.py verify [--deep]
+    python StrArchive/manifest.py repair
+    python StrArchive/manifest.py snapshot    # record an existing QuickBMS extraction
+"""
+
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from RemakeRegistry.hash_engine import hash_files, sha256_file_buffered, DEFAULT_WORKERS
+from fastwalk import walk_files
+from printer import Logger, colours
+
+MANIFEST_PATH = r"Modules\Extract\GameFiles\quickbms_manifest.json"
+MANIFEST_VERSION = 2
+
+log = Logger("manifest")
+
+def native_path(path):
+    return path.replace("\\", os.sep)
+
+def file_record(path, file_hash):
+    """Returns the manifest record [size, mtimeNs, sha256] for a file that was just written."""
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns, file_hash]
+
+def snapshot_folder(output_dir, names=None):
+    """
+    Hashes the files under an archive's output folder.
+
+    Args:
+        output_dir: The <name>_str folder.
+        names: Optional set of backslash-relative names to restrict the snapshot to.
+
+    Returns:
+        dict of backslash-relative name -> [size, mtimeNs, sha256].
+    """
+    files = {}
+    for entry in walk_files(output_dir):
+        name = os.path.relpath(entry.path, output_dir).replace(os.sep, "\\")
+        if names is not None and name not in names:
+            continue
+        files[name] = file_record(entry.path, sha256_file_buffered(entry.path))
+    return files
+
+def load_manifest(path=MANIFEST_PATH):
+    try:
+        with open(native_path(path), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        log.warning(f"Ignoring {path}: unsupported manifest version {manifest.get('version')}")
+        return None
+    return manifest
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    path = native_path(path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(temp_path, path)
+
+def archive_record(output_dir, engine, expected, confirmed):
+    """
+    Builds an archive's manifest record.
+
+    Args:
+        engine: The engine the files come from; repairs use it too.
+        expected: name -> (size, sha256) of everything the archive holds.
+        confirmed: name -> [size, mtimeNs, sha256] of files known to be on disk; one
+            that differs from the expected size or hash is not confirmed.
+    """
+    files = {}
+    for name, (size, file_hash) in expected.items():
+        record = confirmed.get(name)
+        mtime_ns = record[1] if record is not None and (record[0], record[2]) == (size, file_hash) else None
+        files[name] = [size, mtime_ns, file_hash]
+    return {"output": output_dir, "engine": engine, "complete": all(record[1] is not None for record in files.values()),
+            "error": None, "files": files}
+
+def update_manifest(results, path=MANIFEST_PATH, merge=False, workers=DEFAULT_WORKERS):
+    """
+    Records successfully extracted archives. Native extractions are checked against the
+    archive's expected contents; QuickBMS extractions record what QuickBMS wrote.
+
+    Args:
+        results: extract_archive result dicts carrying the engine, a "manifest" of written
+            files and, for native runs, optionally "contents" (name -> [size, sha256]).
+        merge: Keep the files the archive's existing record already holds (partial or
+            repair runs) instead of only those just written (full runs).
+
+    Returns:
+        The saved manifest.
+    """
+    from StrArchive.toc_index import expected_contents
+    manifest = load_manifest(path) or {"version": MANIFEST_VERSION, "archives": {}}
+    done = {result["archive"]: result for result in results
+            if not result["error"] and result.get("manifest") is not None}
+    listed = {archive_path: (result.get("contents"), None) for archive_path, result in done.items()
+              if result.get("engine") == "native"}
+    pending = [archive_path for archive_path, (contents, _) in listed.items() if contents is None]
+    if pending:
+        for archive_path, contents, error in expected_contents(pending, workers=workers):
+            listed[archive_path] = (contents, error)
+    for archive_path, result in done.items():
+        engine = result.get("engine", "quickbms")
+        previous = manifest["archives"].get(archive_path) if merge else None
+        confirmed = {}
+        if previous is not None:
+            confirmed = {name: record for name, record in previous["files"].items() if record[1] is not None}
+        confirmed.update(result["manifest"])
+        if engine == "native":
+            contents, error = listed[archive_path]
+            if contents is None:
+                log.error(f"{archive_path}: cannot list its contents, not recorded as complete - {error}")
+                manifest["archives"][archive_path] = {"output": result["output"], "engine": engine, "complete": False,
+                                                      "error": error, "files": {}}
+                continue
+        else:
+            contents = {name: (record[0], record[2]) for name, record in (previous or {"files": {}})["files"].items()}
+            contents.update((name, (record[0], record[2])) for name, record in result["manifest"].items())
+        manifest["archives"][archive_path] = archive_record(result["output"], engine, contents, confirmed)
+    save_manifest(manifest, path)
+    return manifest
+
+def verify_extraction(path=MANIFEST_PATH, workers=DEFAULT_WORKERS, deep=False):
+    """
+    Checks every file recorded in the manifest.
+
+    Returns:
+        None if there is no manifest, otherwise a dict:
+            "files": number of files checked,
+            "hashed": number of files that had to be hashed,
+            "bad": {archive: {"missing": [names], "corrupt": [names]}} for archives with problems,
+                plus "error" for archives whose contents could not be listed.
+    """
+    manifest = load_manifest(path)
+    if manifest is None:
+        return None
+    report = {"files": 0, "hashed": 0, "bad": {}}
+
+    def mark(archive_path, kind, name):
+        report["bad"].setdefault(archive_path, {"missing": [], "corrupt": []})[kind].append(name)
+
+    to_hash = []
+    for archive_path, record in manifest["archives"].items():
+        if record.get("error"):
+            report["bad"].setdefault(archive_path, {"missing": [], "corrupt": []})["error"] = record["error"]
+            continue
+        output_dir = native_path(record["output"])
+        for name, (size, mtime_ns, file_hash) in record["files"].items():
+            report["files"] += 1
+            file_path = os.path.join(output_dir, native_path(name))
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                mark(archive_path, "missing", name)
+                continue
+            if st.st_size != size:
+                mark(archive_path, "corrupt", name)
+            elif deep or st.st_mtime_ns != mtime_ns:
+                to_hash.append((file_path, archive_path, name, file_hash))
+
+    expected = {item[0]: item for item in to_hash}
+    for file_path, actual_hash, error in hash_files([item[0] for item in to_hash], workers):
+        _, archive_path, name, file_hash = expected[file_path]
+        report["hashed"] += 1
+        log.progress()
+        if error is not None or actual_hash != file_hash:
+            mark(archive_path, "corrupt", name)
+
+    bad_files = sum(len(problems["missing"]) + len(problems["corrupt"]) for problems in report["bad"].values())
+    colour = colours.GREEN if not bad_files else colours.YELLOW
+    log.info(f"Verified {report['files']} files ({report['hashed']} hashed): "
+             f"{bad_files} missing or corrupt in {len(report['bad'])} archives", colour)
+    log.flush()
+    return report
+
+def repair_extraction(report, path=MANIFEST_PATH, engine="quickbms", **extract_options):
+    """
+    Re-extracts only the missing or corrupt files listed in a verify_extraction report;
+    an archive recorded with an error is extracted whole. Each archive is repaired with
+    the engine its record names (engine is the default for records without one), so only
+    names that engine wrote before are asked for.
+
+    Returns:
+        True if every affected archive extracted without error.
+    """
+    from StrArchive.extract import extract_archive, Selection
+    manifest = load_manifest(path)
+    if manifest is None:
+        log.error(f"Cannot repair: no usable manifest at {path}")
+        log.flush()
+        return False
+    results = []
+    ok = True
+    for archive_path, problems in report["bad"].items():
+        record = manifest["archives"].get(archive_path)
+        if record is None:
+            log.error(f"{archive_path}: not in {path}; run snapshot or extract it again")
+            ok = False
+            continue
+        names = problems["missing"] + problems["corrupt"]
+        output_dir = native_path(record["output"])
+        log.info(f"Re-extracting {len(names) or 'all'} files from {archive_path}", colours.CYAN)
+        result = extract_archive(archive_path, output_dir, record.get("engine", engine),
+                                 selection=Selection(names=names), **extract_options)
+        if result["error"]:
+            log.error(f"{archive_path}: {result['error']}")
+        results.append(result)
+    manifest = update_manifest(results, path, merge=True)
+    incomplete = [result["archive"] for result in results if not manifest["archives"][result["archive"]]["complete"]]
+    for archive_path in incomplete:
+        log.error(f"{archive_path}: still incomplete after repair")
+    log.flush()
+    return ok and not incomplete and not any(result["error"] for result in results)
+
+def snapshot_extraction(output_root, usrdir, path=MANIFEST_PATH):
+    """
+    Records the current quickbms_out tree as the manifest, e.g. right after a QuickBMS run:
+    each archive's record is the files its output folder holds. An archive without an
+    output folder is recorded as incomplete, so verify reports it and repair extracts it.
+
+    Returns:
+        (manifest, list of incomplete archive paths)
+    """
+    from StrArchive.extract import find_archives, archive_output_dir
+    results = []
+    incomplete = []
+    for archive_path in find_archives(usrdir):
+        output_dir = archive_output_dir(archive_path, usrdir, output_root)
+        if os.path.isdir(output_dir):
+            results.append({"archive": archive_path, "output": output_dir, "engine": "quickbms", "error": None,
+                            "manifest": snapshot_folder(output_dir)})
+        else:
+            log.warning(f"{archive_path}: no output folder {output_dir}")
+            incomplete.append((archive_path, output_dir))
+    manifest = update_manifest(results, path)
+    for archive_path, output_dir in incomplete:
+        manifest["archives"][archive_path] = {"output": output_dir, "engine": "quickbms", "complete": False,
+                                              "error": "no output folder", "files": {}}
+    if incomplete:
+        save_manifest(manifest, path)
+    colour = colours.GREEN if not incomplete else colours.YELLOW
+    log.info(f"Recorded {sum(len(result['manifest']) for result in results)} files from {len(results)} archives "
+             f"in {path}; {len(incomplete)} archives have no output", colour)
+    log.flush()
+    return manifest, [archive_path for archive_path, _ in incomplete]
+
+if __name__ == "__main__":
+    import argparse
+    from StrArchive.extract import USRDIR_PATH, OUTPUT_PATH, ENGINES
+    parser = argparse.ArgumentParser(description="Verify quickbms_out against the extraction manifest")
+    parser.add_argument("--manifest", default=MANIFEST_PATH)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    verify_parser = subparsers.add_parser("verify", help="Check sizes, and hashes where needed")
+    verify_parser.add_argument("--deep", action="store_true", help="Hash every file, not just ones touched since extraction")
+    verify_parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    repair_parser = subparsers.add_parser("repair", help="Verify, then re-extract missing or corrupt files")
+    repair_parser.add_argument("--deep", action="store_true")
+    repair_parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    repair_parser.add_argument("--engine", choices=ENGINES, default="quickbms",
+                               help="Engine for archives whose manifest record does not name one")
+    snapshot_parser = subparsers.add_parser("snapshot", help="Record the current extraction output")
+    snapshot_parser.add_argument("--usrdir", default=USRDIR_PATH)
+    snapshot_parser.add_argument("--output", default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    if args.command == "snapshot":
+        _, incomplete = snapshot_extraction(args.output, args.usrdir, args.manifest)
+        sys.exit(1 if incomplete else 0)
+    report = verify_extraction(args.manifest, args.workers, args.deep)
+    if report is None:
+        parser.error(f"no manifest at {args.manifest}")
+    for archive_path, problems in report["bad"].items():
+        for kind in ("missing", "corrupt"):
+            for name in problems[kind]:
+                log.warning(f"{kind}: {archive_path} -> {name}")
+        if problems.get("error"):
+            log.warning(f"error: {archive_path} -> {problems['error']}")
+    log.flush()
+    if args.command == "repair" and report["bad"]:
+        sys.exit(0 if repair_extraction(report, args.manifest, args.engine) else 1)
+    sys.exit(1 if report["bad"] else 0)
@@ -0,0 +1,203 @@
+"""
+Native reader for The Simpsons Game "SToc" .str archives.
+
+Layout (see reverse_engineering/Source/TODO/str/readme.md), all big-endian:
+    0x00  char[4]  "SToc"
+    0x08  u8       number of entries (most significant byte of the u32 at 0x08)
+    0x10  u32      offset of the file information table
+    table          one 24-byte record per entry:
+                   +0x00 u64 unknown, +0x08 u32 original size, +0x0C u32 unknown size,
+                   +0x10 u32 stored size, +0x14 u32 unknown
+    data           starts at the end of the table rounded up to 0x800; entry blocks are
+                   stored back to back, each stored_size bytes long. A block starting
+                   with 0x10fb is dk2 compressed.
+
+The archive is memory-mapped and the table is parsed in place with struct.unpack_from,
+so listing an archive never reads the entry data (only the 2-byte compression marker
+of each block) and runs in milliseconds even for multi-gigabyte archives.
+
+Usage:
+    python StrArchive/stoc.py list path/to/archive.str [more.str ...]
+"""
+
+import os
+import sys
+import mmap
+import struct
+from collections import namedtuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from StrArchive import dk2
+
+SIGNATURE = b"SToc"
+COUNT_OFFSET = 0x08
+INFO_TABLE_OFFSET = 0x10
+ENTRY_SIZE = 24
+DATA_ALIGNMENT = 0x800
+DK2_MARKER = 0x10FB
+
+ENTRY_STRUCT = struct.Struct(">QIIII")
+MARKER_STRUCT = struct.Struct(">H")
+
+StocEntry = namedtuple("StocEntry", ["index", "offset", "stored_size", "size", "compressed"])
+
+class StocFormatError(ValueError):
+    """Raised when a file is not a valid SToc archive."""
+
+def align(value, alignment=DATA_ALIGNMENT):
+    return (value + alignment - 1) // alignment * alignment
+
+class StocArchive:
+    """
+    Memory-mapped SToc archive.
+
+    Usage:
+        with StocArchive(path) as archive:
+            for entry in archive.entries:
+                ...
+            data = archive.read_entry(entry)
+    """
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        self._file = open(self.path, "rb")
+        try:
+            if os.fstat(self._file.fileno()).st_size < INFO_TABLE_OFFSET + 4:
+                raise StocFormatError(f"{self.path}: file too small to be an SToc archive")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        self.view = memoryview(self._map)
+        try:
+            self.entries = self._parse_table()
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _parse_table(self):
+        view = self.view
+        if bytes(view[0:4]) != SIGNATURE:
+            raise StocFormatError(f"{self.path}: missing SToc signature")
+        count = view[COUNT_OFFSET]
+        table_offset, = struct.unpack_from(">I", view, INFO_TABLE_OFFSET)
+        table_end = table_offset + count * ENTRY_SIZE
+        if table_end > len(view):
+            raise StocFormatError(f"{self.path}: info table ({count} entries at 0x{table_offset:x}) runs past end of file")
+
+        entries = []
+        offset = align(table_end)
+        for index in range(count):
+            _, size, _, stored_size, _ = ENTRY_STRUCT.unpack_from(view, table_offset + index * ENTRY_SIZE)
+            if offset + stored_size > len(view):
+                raise StocFormatError(f"{self.path}: entry {index} data runs past end of file")
+            compressed = stored_size >= 2 and MARKER_STRUCT.unpack_from(view, offset)[0] == DK2_MARKER
+            entries.append(StocEntry(index, offset, stored_size, size, compressed))
+            offset += stored_size
+        return entries
+
+    def raw(self, entry):
+        """
+        Returns a zero-copy memoryview of an entry's stored bytes. It is only valid
+        while the archive is open; use read_entry() for data that outlives it.
+        """
+        if isinstance(entry, int):
+            entry = self.entries[entry]
+        return self.view[entry.offset:entry.offset + entry.stored_size]
+
+    def stored_data(self, entry):
+        """
+        Returns a zero-copy memoryview of an uncompressed entry's data. Uncompressed blocks
+        are read with the original size, as simpsons_str.bms does; StocFormatError is raised
+        if that runs past the end of a truncated or corrupt archive.
+        """
+        if isinstance(entry, int):
+            entry = self.entries[entry]
+        if entry.offset + entry.size > len(self.view):
+            raise StocFormatError(f"{self.path}: entry {entry.index} ({entry.size} bytes at 0x{entry.offset:x}) "
+                                  f"runs past end of file")
+        return self.view[entry.offset:entry.offset + entry.size]
+
+    def read_entry(self, entry):
+        """Returns an entry's data as bytes, decompressing dk2 blocks."""
+        if isinstance(entry, int):
+            entry = self.entries[entry]
+        if not entry.compressed:
+            with self.stored_data(entry) as data:
+                return bytes(data)
+        with self.raw(entry) as raw:
+            return dk2.decompress(raw, entry.size)
+
+    def iter_entry_chunks(self, entry, chunk_size=dk2.DEFAULT_CHUNK_SIZE):
+        """Yields an entry's data in chunks of at most chunk_size bytes, decompressing on the fly."""
+        if isinstance(entry, int):
+            entry = self.entries[entry]
+        if entry.compressed:
+            with self.raw(entry) as raw:
+                yield from dk2.iter_decompress(raw, chunk_size)
+            return
+        self.stored_data(entry).release()  # Bounds check before the first chunk
+        end = entry.offset + entry.size
+        for start in range(entry.offset, end, chunk_size):
+            yield bytes(self.view[start:min(start + chunk_size, end)])
+
+    @property
+    def total_size(self):
+        """Sum of the original (decompressed) sizes of all entries."""
+        return sum(entry.size for entry in self.entries)
+
+    def close(self):
+        # A slice from raw() (or an unfinished iter_entry_chunks) may still be alive.
+        # The mapping cannot be closed under it, so it is left to be unmapped when the
+        # last slice is garbage collected.
+        if self.view is not None:
+            try:
+                self.view.release()
+            except BufferError:
+                pass
+            self.view = None
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def list_archive(path):
+    """Returns the entries of an archive without keeping it open."""
+    with StocArchive(path) as archive:
+        return list(archive.entries)
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    parser = argparse.ArgumentParser(description="Inspect SToc .str archives")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    list_parser = subparsers.add_parser("list", help="List entries, sizes and compression flags")
+    list_parser.add_argument("archives", nargs="+")
+    args = parser.parse_args()
+
+    for archive_path in args.archives:
+        start = time.perf_counter()
+        try:
+            entries = list_archive(archive_path)
+        except (OSError, StocFormatError) as e:
+            print(e if isinstance(e, StocFormatError) else f"{archive_path}: {e}", file=sys.stderr)
+            continue
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"{archive_path}: {len(entries)} entries ({elapsed_ms:.2f} ms)")
+        print(f"{'index':>5} {'offset':>10} {'stored':>10} {'size':>10}  dk2")
+        for entry in entries:
+            print(f"{entry.index:>5} {entry.offset:>#10x} {entry.stored_size:>10} {entry.size:>10}  {'yes' if entry.compressed else 'no'}")
@@ -0,0 +1,123 @@
+"""
+Splits a decoded SToc entry into the named sub-files simpsons_str.bms writes out.
+
+The readme (reverse_engineering/Source/TODO/str/readme.md) only describes this layer
+loosely, so the layout below is an assumption to be checked against a QuickBMS
+extraction of the same archive:
+
+    +0x00  u32  unknown
+    +0x04  u32  unknown
+    +0x08  u32  unknown
+    +0x0C  u32  HEADER_SIZE, 0 = the rest of the entry is one unnamed file
+    metadata (HEADER_SIZE bytes):
+           u32  string count, then that many u32-length-prefixed strings
+                (the last one is the file name, e.g. EU_EN\\ASSET_RWS\\Textures\\x.txd)
+           u32  sub-file size
+    data   follows the metadata, then the next 16-byte header at the next 16-byte boundary
+
+Whenever an entry does not parse cleanly under these rules split_entry() falls back to
+a single file named <index>.dat, the same name StrArchive/stoc_raw.bms uses, so no data
+is ever dropped or written under an invented path.
+"""
+
+import struct
+from collections import namedtuple
+
+SUBFILE_HEADER = struct.Struct(">IIII")
+SUBFILE_ALIGNMENT = 16
+MAX_NAME_LENGTH = 512
+
+SubFile = namedtuple("SubFile", ["name", "offset", "size"])
+
+class SubfileFormatError(ValueError):
+    """Raised when an entry does not follow the assumed sub-file layout."""
+
+def fallback_name(index):
+    return f"{index:08d}.dat"
+
+def clean_name(raw):
+    """Turns an archive name into a safe relative path with backslash separators, like registry paths."""
+    name = raw.rstrip(b"\0").decode("ascii")
+    parts = [part for part in name.replace("/", "\\").split("\\") if part and part != "."]
+    if not parts or ".." in parts or ":" in name or any(ord(c) < 0x20 for c in name):
+        raise SubfileFormatError(f"unusable sub-file name {name!r}")
+    return "\\".join(parts)
+
+def parse_subfiles(data):
+    """
+    Parses data with the assumed layout.
+
+    Returns:
+        list of SubFile(name, offset, size); name is None for an unnamed sub-file.
+    """
+    data = memoryview(data)
+    end = len(data)
+    subfiles = []
+    offset = 0
+    try:
+        while offset < end:
+            _, _, _, header_size = SUBFILE_HEADER.unpack_from(data, offset)
+            pos = offset + SUBFILE_HEADER.size
+            if header_size == 0:
+                subfiles.append(SubFile(None, pos, end - pos))
+                break
+            meta_end = pos + header_size
+            if meta_end > end:
+                raise SubfileFormatError(f"metadata at 0x{offset:x} runs past end of entry")
+            count, = struct.unpack_from(">I", data, pos)
+            pos += 4
+            if count == 0:
+                raise SubfileFormatError(f"no name strings at 0x{offset:x}")
+            name = None
+            for _ in range(count):
+                length, = struct.unpack_from(">I", data, pos)
+                if length > MAX_NAME_LENGTH or pos + 4 + length > meta_end:
+                    raise SubfileFormatError(f"bad name length {length} at 0x{pos:x}")
+                name = bytes(data[pos + 4:pos + 4 + length])
+                pos += 4 + length
+            size, = struct.unpack_from(">I", data, pos)
+            if meta_end + size > end:
+                raise SubfileFormatError(f"sub-file at 0x{meta_end:x} runs past end of entry")
+            subfiles.append(SubFile(clean_name(name), meta_end, size))
+            offset = (meta_end + size + SUBFILE_ALIGNMENT - 1) // SUBFILE_ALIGNMENT * SUBFILE_ALIGNMENT
+    except (struct.error, UnicodeDecodeError) as e:
+        raise SubfileFormatError(str(e)) from None
+    return subfiles
+
+def single_subfile(head, size, index):
+    """
+    Decides from an entry's first SUBFILE_HEADER.size bytes and its decoded size alone
+    whether split_entry() returns a single file, so such entries can be streamed
+    instead of decoded whole.
+
+    Returns:
+        That SubFile, or None when the rest of the entry has to be parsed.
+    """
+    if size < SUBFILE_HEADER.size:
+        return SubFile(fallback_name(index), 0, size)
+    _, _, _, header_size = SUBFILE_HEADER.unpack_from(head)
+    if header_size == 0:
+        return SubFile(fallback_name(index), SUBFILE_HEADER.size, size - SUBFILE_HEADER.size)
+    if SUBFILE_HEADER.size + header_size > size:
+        return SubFile(fallback_name(index), 0, size)  # Metadata runs past the end: parse_subfiles fails
+    return None
+
+def split_entry(data, index):
+    """
+    Returns the sub-files of one decoded entry, falling back to a single <index>.dat.
+
+    Unnamed sub-files are named after the entry index, with a suffix when an entry has several.
+    """
+    try:
+        subfiles = parse_subfiles(data)
+    except SubfileFormatError:
+        return [SubFile(fallback_name(index), 0, len(data))]
+    if not subfiles:
+        return [SubFile(fallback_name(index), 0, len(data))]
+    named = []
+    for number, subfile in enumerate(subfiles):
+        if subfile.name is None:
+            name = fallback_name(index) if len(subfiles) == 1 else f"{index:08d}_{number}.dat"
+            subfile = subfile._replace(name=name)
+        named.append(subfile)
+    return named
@@ -0,0 +1,311 @@
+"""
+Persistent SQLite table of contents for every .str archive.
+
+One row per extracted file: the archive it comes from, its quickbms_out-relative path,
+where its bytes live (entry block offset and stored size in the archive, offset and size
+inside the decoded entry), whether the block is dk2 compressed, and its SHA-256.
+Building it decodes every archive once (in a process pool); afterwards questions such as
+"which archive holds bart_bc0_grp0_ss1_h0.txd" or "how much does Map_3-09 expand to"
+are single queries. Archives whose size and mtime are unchanged are skipped on rebuild.
+
+predict_asset_index() feeds the rows through RemakeRegistry.asset_index.build_entry, so
+the registry (uuids, predicted stage paths) can be produced before anything is extracted.
+
+Usage:
+    python StrArchive/toc_index.py build
+    python StrArchive/toc_index.py find bart_bc0_grp0_ss1_h0.txd
+    python StrArchive/toc_index.py size Map_3-09_Invasion
+    python StrArchive/toc_index.py predict
+"""
+
+import os
+import sys
+import json
+import hashlib
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from StrArchive.stoc import StocArchive, StocFormatError
+from StrArchive.dk2 import Dk2Error
+from StrArchive.subfiles import split_entry
+from StrArchive.extract import USRDIR_PATH, OUTPUT_PATH, DEFAULT_WORKERS, find_archives, archive_output_dir
+from printer import Logger, colours, format_bytes
+
+TOC_DB_PATH = "RemakeRegistry/str_toc.db"
+PREDICTED_INDEX_PATH = "RemakeRegistry/asset_index_predicted.json"
+
+INSERT_SQL = """
+INSERT INTO str_entries
+    (archive, entryPath, name, entryIndex, blockOffset, storedSize, entrySize, compressed, offset, size, sha256)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+log = Logger("toc_index")
+
+def init_db(db_path=TOC_DB_PATH):
+    """Creates the archive and entry tables and their lookup indexes if not exists."""
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS str_archives (
+        archive TEXT PRIMARY KEY,
+        folder TEXT,
+        size INTEGER,
+        mtimeNs INTEGER,
+        entries INTEGER,
+        files INTEGER,
+        error TEXT,
+        indexedAt TEXT
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS str_entries (
+        archive TEXT,
+        entryPath TEXT,
+        name TEXT,
+        entryIndex INTEGER,
+        blockOffset INTEGER,
+        storedSize INTEGER,
+        entrySize INTEGER,
+        compressed INTEGER,
+        offset INTEGER,
+        size INTEGER,
+        sha256 TEXT
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_str_entries_name ON str_entries (name)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_str_entries_entryPath ON str_entries (entryPath)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_str_entries_archive ON str_entries (archive)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_str_entries_sha256 ON str_entries (sha256)")
+    conn.commit()
+    return conn
+
+def scan_archive(archive_path, folder):
+    """
+    Decodes one archive and returns its rows for INSERT_SQL. Runs in a worker process.
+
+    Returns:
+        (archive_path, entry_count, rows, error)
+    """
+    rows = []
+    try:
+        with StocArchive(archive_path) as archive:
+            for entry in archive.entries:
+                data = archive.read_entry(entry)
+                view = memoryview(data)
+                for subfile in split_entry(data, entry.index):
+                    entry_path = f"{folder}\\{subfile.name}"
+                    file_hash = hashlib.sha256(view[subfile.offset:subfile.offset + subfile.size]).hexdigest()
+                    rows.append((archive_path, entry_path, subfile.name.rsplit("\\", 1)[-1].lower(), entry.index,
+                                 entry.offset, entry.stored_size, entry.size, int(entry.compressed),
+                                 subfile.offset, subfile.size, file_hash))
+                view.release()
+            return archive_path, len(archive.entries), rows, None
+    except (OSError, StocFormatError, Dk2Error) as e:
+        return archive_path, 0, [], f"{type(e).__name__}: {e}"
+
+def build_index(usrdir=USRDIR_PATH, db_path=TOC_DB_PATH, workers=DEFAULT_WORKERS, full=False):
+    """
+    Indexes every archive under usrdir. Unless full is set, archives whose size and
+    mtime match the stored row are skipped, and archives that disappeared are dropped.
+
+    Returns:
+        dict with indexed, unchanged, removed and failed counts.
+    """
+    log.start()
+    conn = init_db(db_path)
+    known = {row[0]: (row[1], row[2]) for row in conn.execute("SELECT archive, size, mtimeNs FROM str_archives")}
+    summary = {"indexed": 0, "unchanged": 0, "removed": 0, "failed": 0}
+
+    jobs = {}
+    for archive_path in find_archives(usrdir):
+        st = os.stat(archive_path)
+        if not full and known.get(archive_path) == (st.st_size, st.st_mtime_ns):
+            summary["unchanged"] += 1
+            continue
+        folder = archive_output_dir(archive_path, usrdir, "").replace(os.sep, "\\")
+        jobs[archive_path] = (folder, st)
+
+    stale = set(known) - {path for path in known if os.path.exists(path)}
+    with conn:
+        for archive_path in stale:
+            conn.execute("DELETE FROM str_entries WHERE archive = ?", (archive_path,))
+            conn.execute("DELETE FROM str_archives WHERE archive = ?", (archive_path,))
+    summary["removed"] = len(stale)
+
+    log.info(f"Indexing {len(jobs)} archives ({summary['unchanged']} unchanged)", colours.CYAN)
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(scan_archive, archive_path, folder) for archive_path, (folder, _) in jobs.items()]
+        for future in as_completed(futures):
+            archive_path, entry_count, rows, error = future.result()
+            folder, st = jobs[archive_path]
+            with conn:  # One transaction per archive
+                conn.execute("DELETE FROM str_entries WHERE archive = ?", (archive_path,))
+                conn.executemany(INSERT_SQL, rows)
+                conn.execute("INSERT OR REPLACE INTO str_archives VALUES (?, ?, ?, ?, ?, ?, ?, datetime('now'))",
+                             (archive_path, folder, st.st_size, st.st_mtime_ns if error is None else None,
+                              entry_count, len(rows), error))
+            if error:
+                summary["failed"] += 1
+                log.error(f"{archive_path}: {error}")
+            else:
+                summary["indexed"] += 1
+                log.verbose(f"{archive_path}: {len(rows)} files")
+            log.progress(files=len(rows), num_bytes=sum(row[9] for row in rows))
+    conn.close()
+    log.info(f"Indexed {summary['indexed']} archives, {summary['unchanged']} unchanged, "
+             f"{summary['removed']} removed, {summary['failed']} failed", colours.GREEN)
+    log.summary()
+    return summary
+
+def expected_contents(archive_paths, db_path=TOC_DB_PATH, workers=DEFAULT_WORKERS):
+    """
+    Lists what a complete extraction of each archive writes, for the extraction manifest.
+    Archives indexed in db_path and unchanged since are read from it; the rest are decoded
+    in a process pool.
+
+    Yields:
+        (archive_path, files, error) with files a dict of output-folder-relative name ->
+        (size, sha256), or None with error set if the archive could not be decoded.
+    """
+    pending = []
+    if os.path.exists(db_path):
+        with TocIndex(db_path) as toc:
+            for archive_path in archive_paths:
+                try:
+                    rows = toc.archive_rows(archive_path)
+                    folder = toc.archive_folder(archive_path)
+                except (OSError, sqlite3.Error):
+                    rows = None
+                if rows is None:
+                    pending.append(archive_path)
+                    continue
+                yield archive_path, {row["entryPath"][len(folder) + 1:]: (row["size"], row["sha256"]) for row in rows}, None
+    else:
+        pending = list(archive_paths)
+    if not pending:
+        return
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as executor:
+        futures = [executor.submit(scan_archive, archive_path, "") for archive_path in pending]
+        for future in as_completed(futures):
+            archive_path, _, rows, error = future.result()
+            if error:
+                yield archive_path, None, error
+            else:
+                yield archive_path, {row[1][1:]: (row[9], row[10]) for row in rows}, None
+
+class TocIndex:
+    """Read-side queries over str_toc.db."""
+
+    def __init__(self, db_path=TOC_DB_PATH):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def find(self, name):
+        """Rows for a file name (case-insensitive) or, if it contains a separator, a path suffix."""
+        name = name.replace("/", "\\")
+        if "\\" not in name:
+            return self.conn.execute("SELECT * FROM str_entries WHERE name = ? ORDER BY entryPath", (name.lower(),)).fetchall()
+        return self.conn.execute("SELECT * FROM str_entries WHERE entryPath LIKE ? ORDER BY entryPath",
+                                 ("%" + name.strip("\\"),)).fetchall()
+
+    def get(self, entry_path):
+        return self.conn.execute("SELECT * FROM str_entries WHERE entryPath = ? COLLATE NOCASE",
+                                 (entry_path.replace("/", "\\"),)).fetchone()
+
+    def archive_rows(self, archive_path):
+        """Rows of one archive in entry order, or None if it is not indexed or has changed since."""
+        indexed = self.conn.execute("SELECT size, mtimeNs FROM str_archives WHERE archive = ?", (archive_path,)).fetchone()
+        st = os.stat(archive_path)
+        if indexed is None or (indexed["size"], indexed["mtimeNs"]) != (st.st_size, st.st_mtime_ns):
+            return None
+        return self.conn.execute("SELECT * FROM str_entries WHERE archive = ? ORDER BY entryIndex, offset",
+                                 (archive_path,)).fetchall()
+
+    def archive_folder(self, archive_path):
+        """The quickbms_out-relative output folder recorded for an archive, or None."""
+        row = self.conn.execute("SELECT folder FROM str_archives WHERE archive = ?", (archive_path,)).fetchone()
+        return row["folder"] if row is not None else None
+
+    def with_hash(self, file_hash):
+        return self.conn.execute("SELECT * FROM str_entries WHERE sha256 = ?", (file_hash,)).fetchall()
+
+    def expanded_size(self, prefix=""):
+        """
+        Returns (files, total bytes) extracted under a quickbms_out-relative path prefix;
+        a partial folder name such as Map_3-09 matches Map_3-09_Invasion.
+        """
+        pattern = prefix.replace("/", "\\").strip("\\") + "%"
+        row = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM str_entries WHERE entryPath LIKE ?",
+                                (pattern,)).fetchone()
+        return row[0], row[1]
+
+    def iter_entries(self, suffixes=None):
+        """Yields every row, optionally only those whose name ends with one of suffixes."""
+        if isinstance(suffixes, str):
+            suffixes = (suffixes,)
+        suffixes = tuple(s.lower() for s in suffixes) if suffixes else None
+        for row in self.conn.execute("SELECT * FROM str_entries ORDER BY entryPath"):
+            if suffixes is None or row["name"].endswith(suffixes):
+                yield row
+
+    def close(self):
+        self.conn.close()
+
+def predict_asset_index(db_path=TOC_DB_PATH, output_path=PREDICTED_INDEX_PATH):
+    """
+    Writes an asset_index-shaped JSON for every source asset inside the archives,
+    using the TOC hashes, without extracting anything.
+    """
+    from RemakeRegistry.asset_index import build_entry, SOURCE_SUFFIXES
+    asset_index = {"models": [], "textures": [], "audio": [], "video": [], "unknown": []}
+    with TocIndex(db_path) as toc:
+        for row in toc.iter_entries(SOURCE_SUFFIXES):
+            asset_type, entry = build_entry(f"{OUTPUT_PATH}\\{row['entryPath']}", row["sha256"])
+            if asset_type:
+                asset_index[asset_type].append(entry)
+    with open(output_path, "w") as f:
+        json.dump(asset_index, f, indent=4)
+    log.info(f"Generated {output_path} ({sum(len(v) for v in asset_index.values())} assets)", colours.GREEN)
+    log.flush()
+    return asset_index
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Build and query the STR table-of-contents index")
+    parser.add_argument("--db", default=TOC_DB_PATH)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="Index every archive under USRDIR")
+    build_parser.add_argument("--usrdir", default=USRDIR_PATH)
+    build_parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    build_parser.add_argument("--full", action="store_true", help="Re-index archives even if unchanged")
+    build_parser.add_argument("--verbose", action="store_true")
+    subparsers.add_parser("find", help="Which archive holds a file").add_argument("name")
+    subparsers.add_parser("size", help="Files and bytes extracted under a folder").add_argument("prefix", nargs="?", default="")
+    predict_parser = subparsers.add_parser("predict", help="Write an asset index predicted from the TOC")
+    predict_parser.add_argument("--output", default=PREDICTED_INDEX_PATH)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        if args.verbose:
+            log.set_level("verbose")
+        build_index(args.usrdir, args.db, args.workers, args.full)
+    elif args.command == "predict":
+        predict_asset_index(args.db, args.output)
+    else:
+        with TocIndex(args.db) as toc:
+            if args.command == "find":
+                for row in toc.find(args.name):
+                    print(f"{row['entryPath']}\n  archive: {row['archive']} entry {row['entryIndex']} "
+                          f"(dk2={bool(row['compressed'])}), offset {row['offset']}, {row['size']} bytes, sha256 {row['sha256']}")
+            else:
+                files, total = toc.expanded_size(args.prefix)
+                print(f"{args.prefix or 'all archives'}: {files} files, {format_bytes(total)} ({total} bytes)")
@@ -0,0 +1,270 @@
+"""
+Read-only virtual filesystem over the .str archives.
+
+Paths are quickbms_out-style relative paths, e.g.
+    Assets_2_Characters_Simpsons\\GlobalFolder\\chars\\bart_bc0_grp0_ss1_h0_str\\EU_EN\\ASSET_RWS\\Textures\\bart.txd
+and resolve to the archive, entry and byte range that extraction would have written to
+Modules\\Extract\\GameFiles\\quickbms_out. Nothing is extracted to disk:
+
+- archives are opened with StocArchive (mmap) and kept in a small LRU of open files,
+- uncompressed entries are copied straight from the mapping, only the bytes asked for,
+- decoded dk2 entries are kept in an LRU cache bounded by bytes.
+
+Each archive is indexed the first time a path inside it is looked up or listed. When
+RemakeRegistry/str_toc.db (StrArchive/toc_index.py) has up-to-date rows for it, the
+listing comes from there and only blocks that are actually read get decoded; otherwise
+every entry has to be decoded once to learn its file names (see StrArchive/subfiles.py).
+
+Usage:
+    python StrArchive/vfs.py ls Map_3-05_MobRules --suffix .txd
+    python StrArchive/vfs.py cat Map_3-00_GameHub\\gamehub_str\\EU_EN\\x.txd > x.txd
+    python StrArchive/vfs.py stat Map_3-00_GameHub\\gamehub_str\\EU_EN\\x.txd
+"""
+
+import os
+import sys
+import io
+import sqlite3
+from collections import OrderedDict, namedtuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from StrArchive.stoc import StocArchive, StocFormatError
+from StrArchive.dk2 import Dk2Error
+from StrArchive.subfiles import split_entry
+from StrArchive.extract import USRDIR_PATH, OUTPUT_PATH, find_archives, archive_output_dir
+from StrArchive.toc_index import TOC_DB_PATH, TocIndex
+
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+DEFAULT_OPEN_ARCHIVES = 32
+
+VfsEntry = namedtuple("VfsEntry", ["path", "archive", "entry_index", "offset", "size", "compressed"])
+
+def normalise(path):
+    """Returns the lookup key for a path: backslashes, no leading quickbms_out prefix, lowercase."""
+    key = path.replace("/", "\\").strip("\\").lower()
+    prefix = OUTPUT_PATH.lower() + "\\"
+    if key.startswith(prefix):
+        key = key[len(prefix):]
+    return key
+
+class BlockCache:
+    """LRU cache of decoded entries, bounded by total bytes."""
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.blocks = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        block = self.blocks.get(key)
+        if block is None:
+            self.misses += 1
+            return None
+        self.blocks.move_to_end(key)
+        self.hits += 1
+        return block
+
+    def put(self, key, block):
+        if len(block) > self.max_bytes:
+            return
+        if key in self.blocks:
+            self.size -= len(self.blocks.pop(key))
+        self.blocks[key] = block
+        self.size += len(block)
+        while self.size > self.max_bytes:
+            _, evicted = self.blocks.popitem(last=False)
+            self.size -= len(evicted)
+
+class StrVfs:
+    """
+    Usage:
+        with StrVfs() as vfs:
+            for path in vfs.iter_files("Map_3-05_MobRules", suffixes=".txd"):
+                data = vfs.read(path)
+    """
+
+    def __init__(self, usrdir=USRDIR_PATH, cache_bytes=DEFAULT_CACHE_BYTES, max_open_archives=DEFAULT_OPEN_ARCHIVES,
+                 toc_db=TOC_DB_PATH):
+        self.usrdir = usrdir
+        self.toc = TocIndex(toc_db) if toc_db and os.path.exists(toc_db) else None
+        self.cache = BlockCache(cache_bytes)
+        self.max_open_archives = max_open_archives
+        self._open = OrderedDict()
+        self.entries = {}
+        self.folder_entries = {}
+        self.errors = {}
+        # <dir>\<name>_str folder key -> (folder as written, archive path); cheap, only lists USRDIR
+        self.archive_dirs = {}
+        for archive_path in find_archives(usrdir):
+            folder = archive_output_dir(archive_path, usrdir, "").replace(os.sep, "\\")
+            self.archive_dirs[normalise(folder)] = (folder, archive_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _archive(self, archive_path):
+        archive = self._open.get(archive_path)
+        if archive is not None:
+            self._open.move_to_end(archive_path)
+            return archive
+        archive = StocArchive(archive_path)
+        self._open[archive_path] = archive
+        while len(self._open) > self.max_open_archives:
+            _, oldest = self._open.popitem(last=False)
+            oldest.close()
+        return archive
+
+    def _decoded(self, archive_path, entry):
+        """Returns a dk2 entry's decoded bytes through the block cache."""
+        key = (archive_path, entry.index)
+        data = self.cache.get(key)
+        if data is None:
+            data = self._archive(archive_path).read_entry(entry)
+            self.cache.put(key, data)
+        return data
+
+    def _read_range(self, archive_path, index, offset, size):
+        """
+        Returns bytes offset..offset+size of a decoded entry. Views of the mapping never
+        leave this method, so an archive evicted from the LRU can always be closed.
+        """
+        archive = self._archive(archive_path)
+        entry = archive.entries[index]
+        if entry.compressed:
+            return self._decoded(archive_path, entry)[offset:offset + size]
+        with archive.stored_data(entry) as data, data[offset:offset + size] as view:
+            return bytes(view)
+
+    def _decode_listing(self, folder_path, archive_path):
+        """Lists an archive by decoding every entry and splitting it into sub-files."""
+        folder = []
+        archive = self._archive(archive_path)
+        for entry in archive.entries:
+            if entry.compressed:
+                subfiles = split_entry(self._decoded(archive_path, entry), entry.index)
+            else:
+                with archive.stored_data(entry) as data:
+                    subfiles = split_entry(data, entry.index)
+            for subfile in subfiles:
+                folder.append(VfsEntry(f"{folder_path}\\{subfile.name}", archive_path, entry.index,
+                                       subfile.offset, subfile.size, entry.compressed))
+        return folder
+
+    def _index_archive(self, folder_key):
+        if folder_key in self.folder_entries:
+            return self.folder_entries[folder_key]
+        folder_path, archive_path = self.archive_dirs[folder_key]
+        try:
+            rows = self.toc.archive_rows(archive_path) if self.toc is not None else None
+            if rows is not None:
+                # Listed from the TOC index: nothing is decoded until a file is read
+                folder = [VfsEntry(row["entryPath"], archive_path, row["entryIndex"], row["offset"], row["size"],
+                                   bool(row["compressed"])) for row in rows]
+            else:
+                folder = self._decode_listing(folder_path, archive_path)
+        except (OSError, sqlite3.Error, StocFormatError, Dk2Error) as e:
+            # An unreadable archive shows up as an empty folder; the reason is kept in errors
+            self.errors[archive_path] = f"{type(e).__name__}: {e}"
+            folder = []
+        for vfs_entry in folder:
+            self.entries[normalise(vfs_entry.path)] = vfs_entry
+        self.folder_entries[folder_key] = folder
+        return folder
+
+    def _archive_folders_for(self, key):
+        """Archive folders that contain key, or lie under it when key is a directory."""
+        for folder_key in self.archive_dirs:
+            if key.startswith(folder_key + "\\") or key == folder_key or not key or folder_key.startswith(key + "\\"):
+                yield folder_key
+
+    def resolve(self, path):
+        """
+        Returns the VfsEntry for a quickbms_out-relative path (archive, entry_index,
+        offset and size within the decoded entry), or None if no archive holds it.
+        """
+        key = normalise(path)
+        entry = self.entries.get(key)
+        if entry is not None:
+            return entry
+        for folder_key in self._archive_folders_for(key):
+            if key.startswith(folder_key + "\\"):
+                self._index_archive(folder_key)
+        return self.entries.get(key)
+
+    def exists(self, path):
+        return self.resolve(path) is not None
+
+    def getsize(self, path):
+        entry = self.resolve(path)
+        if entry is None:
+            raise FileNotFoundError(path)
+        return entry.size
+
+    def read(self, path):
+        entry = self.resolve(path)
+        if entry is None:
+            raise FileNotFoundError(path)
+        return self._read_range(entry.archive, entry.entry_index, entry.offset, entry.size)
+
+    def open(self, path):
+        """Returns a binary file object for path."""
+        return io.BytesIO(self.read(path))
+
+    def iter_files(self, prefix="", suffixes=None):
+        """
+        Yields the quickbms_out-relative path of every file under prefix, indexing the
+        archives below it on demand.
+        """
+        key = normalise(prefix)
+        if isinstance(suffixes, str):
+            suffixes = (suffixes,)
+        suffixes = tuple(s.lower() for s in suffixes) if suffixes else None
+        for folder_key in sorted(self._archive_folders_for(key)):
+            for entry in self._index_archive(folder_key):
+                entry_key = normalise(entry.path)
+                if key and not (entry_key == key or entry_key.startswith(key + "\\")):
+                    continue
+                if suffixes is None or entry_key.endswith(suffixes):
+                    yield entry.path
+
+    def close(self):
+        for archive in self._open.values():
+            archive.close()
+        self._open.clear()
+        if self.toc is not None:
+            self.toc.close()
+            self.toc = None
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Browse .str archives as the quickbms_out tree")
+    parser.add_argument("--usrdir", default=USRDIR_PATH)
+    parser.add_argument("--toc", default=TOC_DB_PATH, help="str_toc.db used for listings (decoded on demand without it)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    ls_parser = subparsers.add_parser("ls", help="List files under a folder")
+    ls_parser.add_argument("prefix", nargs="?", default="")
+    ls_parser.add_argument("--suffix", nargs="+")
+    for name in ("cat", "stat"):
+        subparsers.add_parser(name).add_argument("path")
+    args = parser.parse_args()
+
+    with StrVfs(args.usrdir, toc_db=args.toc) as vfs:
+        if args.command == "ls":
+            for path in vfs.iter_files(args.prefix, args.suffix):
+                print(path)
+            for archive_path, error in vfs.errors.items():
+                print(f"{archive_path}: {error}", file=sys.stderr)
+        elif args.command == "cat":
+            sys.stdout.buffer.write(vfs.read(args.path))
+        else:
+            entry = vfs.resolve(args.path)
+            if entry is None:
+                print(f"{args.path}: not found in any archive", file=sys.stderr)
+                sys.exit(1)
+            print(f"{entry.path}\n  archive: {entry.archive}\n  entry: {entry.entry_index} (dk2={entry.compressed})\n"
+                  f"  offset: {entry.offset}\n  size: {entry.size}")
@@ -0,0 +1,162 @@
+"""
+This module provides a shared, os.scandir based file walker for the project's tools.
+
+Compared to hand-rolled os.walk loops it:
+- keeps the os.DirEntry objects, so is_dir()/stat() reuse what scandir already fetched,
+- filters by file suffix while walking, so callers never see files they do not want,
+- can walk the top-level folders of a root (e.g. the Map_3-xx folders) in parallel,
+- yields lazily, in the same order os.walk would visit the files,
+- like os.walk, does not follow symlinked directories.
+"""
+
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+# Directories a parallel subtree worker may list ahead of the consumer
+SUBTREE_BUFFER = 64
+_DONE = object()
+
+def normalise_suffixes(suffixes):
+    """
+    Converts a suffix or iterable of suffixes into a lowercase tuple for str.endswith.
+
+    :param suffixes: e.g. ".txd" or (".rws.PS3.preinstanced", ".dff.PS3.preinstanced"); None means all files.
+    """
+    if suffixes is None:
+        return None
+    if isinstance(suffixes, str):
+        suffixes = (suffixes,)
+    return tuple(s.lower() for s in suffixes)
+
+def split_entries(entries, suffixes, on_error=None):
+    """
+    Splits scandir entries into (subdirectory paths, matching file entries).
+
+    Symlinked directories are neither descended into nor returned as files. An entry
+    that cannot be checked (e.g. removed mid-scan) is passed to on_error and skipped.
+    """
+    subdirs = []
+    files = []
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+                continue
+            if entry.is_dir():
+                continue
+        except OSError as e:
+            if on_error is not None:
+                on_error(e)
+            continue
+        if suffixes is None or entry.name.lower().endswith(suffixes):
+            files.append(entry)
+    return subdirs, files
+
+def walk(top, suffixes=None, on_error=None):
+    """
+    Top-down directory walk built on os.scandir.
+
+    Yields (dirpath, files) for every directory under top, where files is the list of
+    os.DirEntry objects for the matching files in that directory. Subdirectories are
+    visited in scandir order after the directory's own files, like os.walk.
+
+    :param top: Directory to walk.
+    :param suffixes: Case-insensitive suffix filter, see normalise_suffixes.
+    :param on_error: Optional callable receiving the OSError for unreadable directories and entries.
+    """
+    suffixes = normalise_suffixes(suffixes)
+    stack = [top]
+    while stack:
+        dirpath = stack.pop()
+        try:
+            with os.scandir(dirpath) as it:
+                subdirs, files = split_entries(it, suffixes, on_error)
+        except OSError as e:
+            if on_error is not None:
+                on_error(e)
+            continue
+        yield dirpath, files
+        # Reverse so the first subdirectory is popped (and walked) first
+        stack.extend(reversed(subdirs))
+
+def _put(out, item, stop):
+    """Puts item on a bounded queue, giving up (returning False) once stop is set."""
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def walk_files(roots, suffixes=None, parallel=False, workers=DEFAULT_WORKERS, on_directory=None, on_error=None):
+    """
+    Yields an os.DirEntry for every matching file under one or more roots.
+
+    :param roots: A directory path or a list of them.
+    :param suffixes: Case-insensitive suffix filter, see normalise_suffixes.
+    :param parallel: Walk the immediate subdirectories of each root on a thread pool.
+        Output order is still the same as the serial walk; each worker hands its
+        directories over one at a time, at most SUBTREE_BUFFER ahead of the consumer.
+    :param workers: Thread count for parallel mode.
+    :param on_directory: Optional callable receiving each directory path as it is listed.
+    :param on_error: Optional callable receiving OSErrors for unreadable directories and entries.
+    """
+    if isinstance(roots, (str, os.PathLike)):
+        roots = [roots]
+    suffix_tuple = normalise_suffixes(suffixes)
+
+    def walk_subtree(top, out, stop):
+        if stop.is_set():
+            return
+        try:
+            for item in walk(top, suffixes, on_error):
+                if not _put(out, item, stop):
+                    return
+            _put(out, _DONE, stop)
+        except Exception as e:
+            _put(out, e, stop)
+
+    for root in roots:
+        if not parallel:
+            for dirpath, files in walk(root, suffixes, on_error):
+                if on_directory is not None:
+                    on_directory(dirpath)
+                yield from files
+            continue
+
+        # Files directly in root first, then each top-level subdirectory as one job
+        try:
+            with os.scandir(root) as it:
+                subdirs, files = split_entries(it, suffix_tuple, on_error)
+        except OSError as e:
+            if on_error is not None:
+                on_error(e)
+            continue
+        if on_directory is not None:
+            on_directory(os.fspath(root))
+        yield from files
+
+        stop = threading.Event()
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            try:
+                # Jobs start in submission order, so the subtree being consumed is always running
+                outputs = []
+                for subdir in subdirs:
+                    out = queue.Queue(maxsize=SUBTREE_BUFFER)
+                    executor.submit(walk_subtree, subdir, out, stop)
+                    outputs.append(out)
+                for out in outputs:
+                    while (item := out.get()) is not _DONE:
+                        if isinstance(item, Exception):
+                            raise item
+                        dirpath, files = item
+                        if on_directory is not None:
+                            on_directory(dirpath)
+                        yield from files
+            finally:
+                # Lets workers blocked on a full queue exit if the consumer stops early
+                stop.set()
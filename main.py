@@ -1,215 +1,302 @@
-import questionary
+"""
+RemakeEngine entry point.
+
+Without arguments it shows the interactive menu. With a subcommand it runs the
+same steps unattended: every prompt is a flag, questionary is never imported and
+nothing waits for a key press.
+
+Usage:
+    python main.py
+    python main.py run [--stages extract models ...] [--budget N] [--fresh] [--verbose] [--debug-sleep] [--export fbx glb]
+    python main.py extract [--parallel] [--engine quickbms|native] [--workers N]
+    python main.py models [--verbose] [--debug-sleep] [--export fbx glb]
+    python main.py textures | video | audio
+
+Every subcommand takes --profile [auto|cprofile|sample] to profile its stages (see Pipeline/profiler.py).
+
+Exit codes: 0 success, 1 a step failed, 2 configuration or module missing.
+Batch runs write a per-stage telemetry report to RemakeRegistry/telemetry (see Pipeline/telemetry.py).
+"""
+
 from pathlib import Path
 from printer import print, colours
 import init
 import os
-
-# --- Define your custom style (as per your example) ---
-custom_style_fancy = questionary.Style([
-    ('question', 'white'),
-    ('answer', '#4688f1'),
-    ('pointer', 'green'),
-    ('highlighted', 'blue'),
-    ('selected', '#cc241d'),
-    ('separator', 'white'),
-    ('instruction', ''),
-    ('text', 'darkmagenta'),
-    ('disabled', '#858585 italic')
-])
-
-status, path_value = init.main()
-
-print(colours.CYAN, "Tool initialization complete press any key to continue...")
-input()
-
-
-# Check if essential Module directories exist
-module_paths_exist = (
-    Path('Modules').exists() and
-    Path('Modules\\Extract').exists() and
-    Path('Modules\\Model').exists() and
-    Path('Modules\\Texture').exists() and
-    Path('Modules\\Video').exists() and
-    Path('Modules\\Audio').exists() and
-    Path('Modules\\Godot').exists()
-)
-
-if module_paths_exist:
-    while True: # Start of the main loop
-        # clear all console output for a fresh menu display
-        os.system('cls' if os.name == 'nt' else 'clear')
-
-        # Define the choices for the questionary select prompt
-        choices = [
-            "Extract Archives (.STR)",
-            "Convert Models (.preinstanced -> .blend)",
-            "Extract Textures (.txd -> .png)",
-            "Convert Videos (.vp6 -> .ogv)",
-            "Convert Audio (.snu -> .wav)",
-            #"init Godot",
-            questionary.Separator(),
-            "Run all Steps (1-5)",
-            "Exit"
-        ]
-
-        # Display the interactive menu and get the user's choice
-        choice = questionary.select(
-            "Select operation(s) to perform:",
-            choices=choices,
-            use_shortcuts=True,
-            style=custom_style_fancy
-        ).ask()
-
-        # --- Handle the user's choice ---
-        if choice is None or choice == "Exit":
-            print(colours.CYAN, "Exiting...")
-            break # Exit the while loop
-
-        elif choice == "Extract Archives (.STR)":
-            print(colours.GREEN, f"Running: {choice}")
-            import Modules.Extract.run as run_qbms
-            run_qbms.main()
-
-        elif choice == "Convert Models (.preinstanced -> .blend)":
-            print(colours.GREEN, f"Running: {choice}")
-            import Modules.Model.run as run_model
-            verbose_input = questionary.confirm("Model Conversion: Enable verbose output?", default=False, style=custom_style_fancy).ask()
-            debug_sleep_input = questionary.confirm("Model Conversion: Enable debug sleep?", default=False, style=custom_style_fancy).ask()
-            export_input = questionary.confirm(
-                "Model Conversion: Export additional formats (FBX/GLTF)?",
-                default=False,
+import sys
+import importlib
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_CONFIG = 2
+
+STAGE_NAMES = ("extract", "models", "textures", "video", "audio")
+STAGE_MODULES = {"extract": "Extract", "models": "Model", "textures": "Texture", "video": "Video", "audio": "Audio"}
+
+def modules_present():
+    # Check if essential Module directories exist
+    return (
+        Path('Modules').exists() and
+        Path('Modules\\Extract').exists() and
+        Path('Modules\\Model').exists() and
+        Path('Modules\\Texture').exists() and
+        Path('Modules\\Video').exists() and
+        Path('Modules\\Audio').exists() and
+        Path('Modules\\Godot').exists()
+    )
+
+def interactive_menu(path_value):
+    import questionary
+
+    # --- Define your custom style (as per your example) ---
+    custom_style_fancy = questionary.Style([
+        ('question', 'white'),
+        ('answer', '#4688f1'),
+        ('pointer', 'green'),
+        ('highlighted', 'blue'),
+        ('selected', '#cc241d'),
+        ('separator', 'white'),
+        ('instruction', ''),
+        ('text', 'darkmagenta'),
+        ('disabled', '#858585 italic')
+    ])
+
+    if modules_present():
+        while True: # Start of the main loop
+            # clear all console output for a fresh menu display
+            os.system('cls' if os.name == 'nt' else 'clear')
+
+            # Define the choices for the questionary select prompt
+            choices = [
+                "Extract Archives (.STR)",
+                "Extract Archives in parallel (.STR)",
+                "Convert Models (.preinstanced -> .blend)",
+                "Extract Textures (.txd -> .png)",
+                "Convert Videos (.vp6 -> .ogv)",
+                "Convert Audio (.snu -> .wav)",
+                #"init Godot",
+                questionary.Separator(),
+                "Run all Steps (1-5)",
+                "Exit"
+            ]
+
+            # Display the interactive menu and get the user's choice
+            choice = questionary.select(
+                "Select operation(s) to perform:",
+                choices=choices,
+                use_shortcuts=True,
                 style=custom_style_fancy
             ).ask()
 
-            export = set()
+            # --- Handle the user's choice ---
+            if choice is None or choice == "Exit":
+                print(colours.CYAN, "Exiting...")
+                break # Exit the while loop
 
-            if export_input:
-                export_formats = questionary.checkbox(
-                    "Select export formats:",
-                    choices=["fbx", "glb"],
-                    style=custom_style_fancy,
-                    validate=lambda x: True if len(x) > 0 else "You must select at least one format."
-                ).ask()
-
-                if export_formats:
-                    export.update(export_formats)
-                    print(colours.CYAN, f"Exporting to: {export}")
-                else:
-                    print(colours.RED, "No export formats selected. Skipping export.")
-
-            if verbose_input is None or debug_sleep_input is None or export_input is None:
-                print(colours.RED, "Model conversion configuration err. Skipping.")
-            else:
-                run_model.main(verbose=verbose_input, debug_sleep=debug_sleep_input, export=export)
-
-        elif choice == "Extract Textures (.txd -> .png)":
-            print(colours.GREEN, f"Running: {choice}")
-            import Modules.Texture.run as run_texture
-            run_texture.main()
-
-        elif choice == "Convert Videos (.vp6 -> .ogv)":
-            print(colours.GREEN, f"Running: {choice}")
-            import Modules.Video.run as run_video
-            run_video.main()
-
-        elif choice == "Convert Audio (.snu -> .wav)":
-            print(colours.GREEN, f"Running: {choice}")
-            import Modules.Audio.run as run_audio
-            run_audio.main()
-
-        # elif choice == "Prepare for Godot":
-        #     print(colours.GREEN, f"Running: {choice}")
-        #     import Modules.Godot.run as run_godot
-        #     run_godot.main()
-
-        elif choice == "Run all Steps (1-5)":
-            print(colours.GREEN, f"Running: {choice}")
-            # --- Logic for running steps 1-5 sequentially ---
-
-            print(colours.YELLOW, "\n--- Starting Step: Extract Archives ---")
-            if Path('Modules\\Extract').exists():
+            elif choice == "Extract Archives (.STR)":
+                print(colours.GREEN, f"Running: {choice}")
                 import Modules.Extract.run as run_qbms
-                output_dir_extract = Path('Modules\\Extract\\GameFiles\\quickbms_out')
-                if not output_dir_extract.exists() or not any(output_dir_extract.iterdir()):
-                    print(colours.CYAN, "Running Archive Extraction (run_qbms)...")
-                    run_qbms.main()
-                else:
-                    print(colours.CYAN, f"Extraction output directory '{output_dir_extract}' already exists and is not empty. Skipping extraction.")
-            else:
-                print(colours.RED, "Extract module not found. Skipping.")
+                run_qbms.main()
 
+            elif choice == "Extract Archives in parallel (.STR)":
+                print(colours.GREEN, f"Running: {choice}")
+                import StrArchive.extract as run_parallel_extract
+                run_parallel_extract.main()
 
-            print(colours.YELLOW, "\n--- Starting Step: Convert Models ---")
-            if Path('Modules\\Model').exists():
+            elif choice == "Convert Models (.preinstanced -> .blend)":
+                print(colours.GREEN, f"Running: {choice}")
                 import Modules.Model.run as run_model
-                output_dir_model = Path('Modules\\Model\\GameFiles\\blend_out')
-                if not output_dir_model.exists() or not any(output_dir_model.iterdir()):
-                    print(colours.CYAN, "Running Model Conversion (run_model)...")
-                    verbose_input = questionary.confirm("Model Conversion: Enable verbose output?", default=False, style=custom_style_fancy).ask()
-                    debug_sleep_input = questionary.confirm("Model Conversion: Enable debug sleep?", default=False, style=custom_style_fancy).ask()
-                    export_input = questionary.confirm("Model Conversion: Export additional formats (FBX/GLTF)?", default=True, style=custom_style_fancy).ask()
+                verbose_input = questionary.confirm("Model Conversion: Enable verbose output?", default=False, style=custom_style_fancy).ask()
+                debug_sleep_input = questionary.confirm("Model Conversion: Enable debug sleep?", default=False, style=custom_style_fancy).ask()
+                export_input = questionary.confirm(
+                    "Model Conversion: Export additional formats (FBX/GLTF)?",
+                    default=False,
+                    style=custom_style_fancy
+                ).ask()
+
+                export = set()
 
-                    if verbose_input is None or debug_sleep_input is None or export_input is None:
-                        print(colours.RED, "Model conversion configuration cancelled. Skipping.")
+                if export_input:
+                    export_formats = questionary.checkbox(
+                        "Select export formats:",
+                        choices=["fbx", "glb"],
+                        style=custom_style_fancy,
+                        validate=lambda x: True if len(x) > 0 else "You must select at least one format."
+                    ).ask()
+
+                    if export_formats:
+                        export.update(export_formats)
+                        print(colours.CYAN, f"Exporting to: {export}")
                     else:
-                        run_model.main(verbose=verbose_input, debug_sleep=debug_sleep_input, export=export_input)
+                        print(colours.RED, "No export formats selected. Skipping export.")
+
+                if verbose_input is None or debug_sleep_input is None or export_input is None:
+                    print(colours.RED, "Model conversion configuration err. Skipping.")
                 else:
-                    print(colours.CYAN, f"Model output directory '{output_dir_model}' already exists and is not empty. Skipping model conversion.")
-            else:
-                print(colours.RED, "Model module not found. Skipping.")
+                    run_model.main(verbose=verbose_input, debug_sleep=debug_sleep_input, export=export)
 
-            print(colours.YELLOW, "\n--- Starting Step: Extract Textures ---")
-            if Path('Modules\\Texture').exists():
+            elif choice == "Extract Textures (.txd -> .png)":
+                print(colours.GREEN, f"Running: {choice}")
                 import Modules.Texture.run as run_texture
-                output_dir_texture = Path('Modules\\Texture\\GameFiles\\Textures_out')
-                if not output_dir_texture.exists() or not any(output_dir_texture.iterdir()):
-                    print(colours.CYAN, "Running Texture Extraction (run_texture)...")
-                    run_texture.main()
-                else:
-                    print(colours.CYAN, f"Texture output directory '{output_dir_texture}' already exists and is not empty. Skipping texture extraction.")
-            else:
-                print(colours.RED, "Texture module not found. Skipping.")
+                run_texture.main()
 
-            print(colours.YELLOW, "\n--- Starting Step: Convert Videos ---")
-            if Path('Modules\\Video').exists():
+            elif choice == "Convert Videos (.vp6 -> .ogv)":
+                print(colours.GREEN, f"Running: {choice}")
                 import Modules.Video.run as run_video
-                output_dir_video_check = Path('Modules\\Video\\GameFiles\\Assets_1_Video_Movies')
-                if not output_dir_video_check.exists() or not any(f for f in output_dir_video_check.glob('*.ogv') if f.is_file()):
-                    print(colours.CYAN, "Running Video Conversion (run_video)...")
-                    run_video.main()
-                else:
-                    print(colours.CYAN, f"Video output directory '{output_dir_video_check}' appears to contain '.ogv' files. Skipping video conversion.")
-            else:
-                print(colours.RED, "Video module not found. Skipping.")
+                run_video.main()
 
-            print(colours.YELLOW, "\n--- Starting Step: Convert Audio ---")
-            if Path('Modules\\Audio').exists():
+            elif choice == "Convert Audio (.snu -> .wav)":
+                print(colours.GREEN, f"Running: {choice}")
                 import Modules.Audio.run as run_audio
-                output_dir_audio_check = Path('Modules\\Audio\\GameFiles\\Assets_1_Audio_Streams')
-                if not output_dir_audio_check.exists() or not any(f for f in output_dir_audio_check.glob('*.wav') if f.is_file()):
-                    print(colours.CYAN, "Running Audio Conversion (run_audio)...")
-                    run_audio.main(project_path=path_value)
-                else:
-                    print(colours.CYAN, f"Audio output directory '{output_dir_audio_check}' appears to contain '.wav' files. Skipping audio conversion.")
-            else:
-                print(colours.RED, "Audio module not found. Skipping.")
+                run_audio.main()
 
-            print(colours.GREEN, "\n--- ALL Essential Steps Completed ---")
+            # elif choice == "Prepare for Godot":
+            #     print(colours.GREEN, f"Running: {choice}")
+            #     import Modules.Godot.run as run_godot
+            #     run_godot.main()
 
-        else: # Should not be reached if choices are handled correctly
-            print(colours.RED, f"Invalid selection: {choice}")
+            elif choice == "Run all Steps (1-5)":
+                print(colours.GREEN, f"Running: {choice}")
+                # --- Ask everything up front, then run steps 1-5 as a dependency graph ---
+                from Pipeline import steps as pipeline_steps
 
-        # After an operation (or "Run all Steps") is done, pause before re-displaying menu
-        if choice != "Exit" and choice is not None:
-            print(colours.MAGENTA, "\nOperation finished. Press any key to return to the menu.")
-            input()
-            # The loop will then clear the screen and show the menu again
+                model_options = None
+                if pipeline_steps.models_pending():
+                    verbose_input = questionary.confirm("Model Conversion: Enable verbose output?", default=False, style=custom_style_fancy).ask()
+                    debug_sleep_input = questionary.confirm("Model Conversion: Enable debug sleep?", default=False, style=custom_style_fancy).ask()
+                    export_input = questionary.confirm("Model Conversion: Export additional formats (FBX/GLTF)?", default=True, style=custom_style_fancy).ask()
+                    if not (verbose_input is None or debug_sleep_input is None or export_input is None):
+                        model_options = {"verbose": verbose_input, "debug_sleep": debug_sleep_input, "export": export_input}
 
-else:
-    print(colours.RED, "Error: One or more essential 'Modules' subdirectories are missing.")
-    print(colours.YELLOW, "Please ensure Modules, Modules\\Extract, Modules\\Model, etc., exist.")
-    # This exit() is fine as it's for a fatal startup error
+                results = pipeline_steps.run_all(path_value, model_options)
 
-# This part is reached only after breaking from the loop (i.e., user selected Exit)
-print(colours.MAGENTA, "\nAll operations exited. Press any key to close the tool.")
-input()
\ No newline at end of file
+                failed = [result for result in results.values() if result.status in ("failed", "blocked")]
+                if failed:
+                    print(colours.RED, f"\n--- {len(failed)} of {len(results)} Steps Did Not Complete: "
+                                       f"{', '.join(f'{result.name} ({result.status})' for result in failed)} ---")
+                else:
+                    print(colours.GREEN, "\n--- ALL Essential Steps Completed ---")
+
+            else: # Should not be reached if choices are handled correctly
+                print(colours.RED, f"Invalid selection: {choice}")
+
+            # After an operation (or "Run all Steps") is done, pause before re-displaying menu
+            if choice != "Exit" and choice is not None:
+                print(colours.MAGENTA, "\nOperation finished. Press any key to return to the menu.")
+                input()
+                # The loop will then clear the screen and show the menu again
+
+    else:
+        print(colours.RED, "Error: One or more essential 'Modules' subdirectories are missing.")
+        print(colours.YELLOW, "Please ensure Modules, Modules\\Extract, Modules\\Model, etc., exist.")
+        # This exit() is fine as it's for a fatal startup error
+
+    # This part is reached only after breaking from the loop (i.e., user selected Exit)
+    print(colours.MAGENTA, "\nAll operations exited. Press any key to close the tool.")
+    input()
+
+def run_step(name, action):
+    """Runs one step for the batch CLI and turns its outcome into an exit code."""
+    print(colours.GREEN, f"Running: {name}")
+    try:
+        ok = action()
+    except Exception as e:
+        print(colours.RED, f"{name} failed: {type(e).__name__}: {e}")
+        return EXIT_FAILED
+    return EXIT_FAILED if ok is False else EXIT_OK
+
+def run_module(module_name, *args, **kwargs):
+    """Imports a step's module and calls its main(); import errors count as a failed step."""
+    return importlib.import_module(module_name).main(*args, **kwargs)
+
+def model_options_from(args):
+    return {"verbose": args.verbose, "debug_sleep": args.debug_sleep, "export": set(args.export)}
+
+def run_batch(args, path_value):
+    """Runs the step chosen on the command line. Returns the process exit code."""
+    if args.command == "run":
+        from Pipeline import steps as pipeline_steps
+        results = pipeline_steps.run_all(path_value, model_options_from(args), args.budget, args.stages,
+                                         resume=not args.fresh, profile=args.profile)
+        failed = any(result.status in ("failed", "blocked") for result in results.values())
+        return EXIT_FAILED if failed else EXIT_OK
+
+    module = STAGE_MODULES[args.command]
+    if not Path(f'Modules\\{module}').exists():
+        print(colours.RED, f"{module} module not found.")
+        return EXIT_CONFIG
+
+    if args.command == "extract" and args.parallel:
+        name, action = ("Extract Archives in parallel (.STR)",
+                        lambda: run_module("StrArchive.extract", args.workers, args.engine))
+    elif args.command == "extract":
+        name, action = "Extract Archives (.STR)", lambda: run_module("Modules.Extract.run")
+    elif args.command == "models":
+        name, action = ("Convert Models (.preinstanced -> .blend)",
+                        lambda: run_module("Modules.Model.run", **model_options_from(args)))
+    elif args.command == "textures":
+        name, action = "Extract Textures (.txd -> .png)", lambda: run_module("Modules.Texture.run")
+    elif args.command == "video":
+        name, action = "Convert Videos (.vp6 -> .ogv)", lambda: run_module("Modules.Video.run")
+    else:
+        name, action = "Convert Audio (.snu -> .wav)", lambda: run_module("Modules.Audio.run", project_path=path_value)
+
+    # Measured like the same stage of a pipeline run, so the reports compare
+    from Pipeline.steps import build_stages
+    from Pipeline.telemetry import Telemetry
+    from Pipeline.profiler import profiled
+    stage = next(stage for stage in build_stages(path_value) if stage.name == args.command)
+    telemetry = Telemetry()
+    action = profiled(stage.name, action, telemetry.run_id, args.profile)
+    exit_code = run_step(name, telemetry.measure(stage.name, action, stage.inputs, stage.outputs, stage.metrics))
+    telemetry.finish()
+    return exit_code
+
+if __name__ == "__main__":
+    import argparse
+    from Pipeline.scheduler import DEFAULT_BUDGET
+    from Pipeline.profiler import PROFILE_MODES
+    from StrArchive.extract import ENGINES, DEFAULT_WORKERS as EXTRACT_WORKERS
+
+    profile_flags = argparse.ArgumentParser(add_help=False)
+    profile_flags.add_argument("--profile", nargs="?", const="auto", choices=PROFILE_MODES,
+                               help="Profile each stage into RemakeRegistry/profiles (default mode: auto)")
+
+    model_flags = argparse.ArgumentParser(add_help=False)
+    model_flags.add_argument("--verbose", action="store_true", help="Model conversion: verbose output")
+    model_flags.add_argument("--debug-sleep", action="store_true", help="Model conversion: debug sleep")
+    model_flags.add_argument("--export", nargs="+", choices=["fbx", "glb"], default=[], help="Model conversion: additional export formats")
+
+    parser = argparse.ArgumentParser(description="RemakeEngine: run without arguments for the interactive menu")
+    subparsers = parser.add_subparsers(dest="command")
+    run_parser = subparsers.add_parser("run", parents=[model_flags, profile_flags], help="Run all steps (or --stages) as a pipeline")
+    run_parser.add_argument("--stages", nargs="+", choices=STAGE_NAMES, help="Only these stages (default: all)")
+    run_parser.add_argument("--budget", type=int, default=DEFAULT_BUDGET, help="Worker budget shared by concurrent stages")
+    run_parser.add_argument("--fresh", action="store_true", help="Start over instead of resuming an interrupted run")
+    extract_parser = subparsers.add_parser("extract", parents=[profile_flags], help="Extract archives (.STR)")
+    extract_parser.add_argument("--parallel", action="store_true", help="Use the parallel extractor")
+    extract_parser.add_argument("--engine", choices=ENGINES, default="quickbms", help="Parallel extractor engine")
+    extract_parser.add_argument("--workers", type=int, default=EXTRACT_WORKERS, help="Archives extracted at once")
+    subparsers.add_parser("models", parents=[model_flags, profile_flags], help="Convert models (.preinstanced -> .blend)")
+    subparsers.add_parser("textures", parents=[profile_flags], help="Extract textures (.txd -> .png)")
+    subparsers.add_parser("video", parents=[profile_flags], help="Convert videos (.vp6 -> .ogv)")
+    subparsers.add_parser("audio", parents=[profile_flags], help="Convert audio (.snu -> .wav)")
+    args = parser.parse_args()
+
+    if args.command is None:
+        status, path_value = init.main()
+
+        print(colours.CYAN, "Tool initialization complete press any key to continue...")
+        input()
+        interactive_menu(path_value)
+        sys.exit(EXIT_OK)
+
+    # Nothing may wait for input in batch mode; init's prompts hit EOF instead
+    sys.stdin = open(os.devnull)
+    try:
+        status, path_value = init.main()
+    except EOFError:
+        status, path_value = None, None
+    if status != init.EXISTS_VALID:
+        print(colours.RED, "project.json has no valid SourcePath. Run main.py interactively once to set it up.")
+        sys.exit(EXIT_CONFIG)
+    sys.exit(run_batch(args, path_value))
@@ -1,11 +1,14 @@
 """
 This module provides utility functions for logging messages with ANSI colour codes.
-It includes functions for standard, error, verbose, and debug logging.
+It includes functions for standard, error, verbose, and debug logging,
+and a leveled, buffered Logger with progress and summary counters for bulk tools.
 """
 
+import atexit
 import builtins
 import sys
 import os  # Import os for environment variable check
+import time
 
 # --- ANSI colour Codes ---
 class colours(object):
@@ -57,3 +60,166 @@ def print_debug(message: str) -> None:
     """
     if "DEBUG" in os.environ and os.environ["DEBUG"].lower() == "true":
         print(colours.MAGENTA, f"DEBUG: {message}")
+
+# --- Leveled, Buffered Logger ---
+LEVELS = {"debug": 10, "verbose": 15, "info": 20, "warning": 30, "error": 40}
+
+def _default_level() -> str:
+    if os.environ.get("DEBUG", "").lower() == "true":
+        return "debug"
+    if os.environ.get("VERBOSE", "").lower() == "true":
+        return "verbose"
+    return "info"
+
+def format_bytes(num_bytes: float) -> str:
+    """
+    Formats a byte count with a binary unit suffix, e.g. 1536 -> '1.5 KiB'.
+
+    :param num_bytes: The number of bytes.
+    """
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(num_bytes) < 1024 or unit == "GiB":
+            return f"{num_bytes:.1f} {unit}" if unit != "B" else f"{int(num_bytes)} B"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} TiB"
+
+class Logger:
+    """
+    Leveled logger for tools that handle thousands of files.
+
+    Lines below the active level are dropped before they are formatted into output,
+    lines that pass are buffered and written in blocks, and progress is shown as a
+    single throttled status line with files/s and bytes/s. Named counters are
+    collected per stage and printed by summary(). Errors skip the buffer and go
+    straight to stderr, and whatever is still buffered is written at interpreter exit.
+
+    The level defaults to 'info', or 'verbose'/'debug' when the VERBOSE/DEBUG
+    environment variables are 'true' (matching print_verbose and print_debug).
+    """
+
+    def __init__(self, name: str, level: str = None, buffer_lines: int = 200,
+                 flush_interval: float = 0.5, progress_interval: float = 0.2, stream=None,
+                 error_stream=None) -> None:
+        """
+        :param name: Stage name shown in the progress line and summary.
+        :param level: One of LEVELS; defaults from the environment.
+        :param buffer_lines: Flush after this many buffered lines.
+        :param flush_interval: Flush at least this often, in seconds.
+        :param progress_interval: Minimum seconds between progress line redraws.
+        :param stream: Output stream, sys.stdout by default.
+        :param error_stream: Stream for error(), sys.stderr by default.
+        """
+        self.name = name
+        self.level = LEVELS[level or _default_level()]
+        self.buffer_lines = buffer_lines
+        self.flush_interval = flush_interval
+        self.progress_interval = progress_interval
+        self.stream = stream or sys.stdout
+        self.error_stream = error_stream or sys.stderr
+        self.show_progress = hasattr(self.stream, "isatty") and self.stream.isatty()
+        self._buffer = []
+        self._progress_visible = False
+        self.start()
+        self._last_flush = self.start_time
+        atexit.register(self._flush_at_exit)
+
+    def start(self) -> None:
+        """
+        Resets the counters, file/byte totals and clock that summary() reports.
+        Loggers are created at import, so call this at the start of each run.
+        """
+        self.counters = {}
+        self.files = 0
+        self.bytes = 0
+        self.start_time = time.monotonic()
+        self._last_progress = 0.0
+
+    def _flush_at_exit(self) -> None:
+        try:
+            self.flush()
+        except (OSError, ValueError):
+            pass  # The stream was already closed
+
+    def set_level(self, level: str) -> None:
+        self.level = LEVELS[level]
+
+    def enabled(self, level: str) -> bool:
+        """Returns True if messages at level would be shown; use it to skip building expensive messages."""
+        return LEVELS[level] >= self.level
+
+    def _emit(self, level: str, colour: str, message: str) -> None:
+        if LEVELS[level] < self.level:
+            return
+        self._buffer.append(f"{colour}{message}{colours.RESET}")
+        now = time.monotonic()
+        if len(self._buffer) >= self.buffer_lines or now - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def debug(self, message: str) -> None:
+        self._emit("debug", colours.MAGENTA, message)
+
+    def verbose(self, message: str, colour: str = colours.GRAY) -> None:
+        self._emit("verbose", colour, message)
+
+    def info(self, message: str, colour: str = colours.RESET) -> None:
+        self._emit("info", colour, message)
+
+    def warning(self, message: str) -> None:
+        self._emit("warning", colours.YELLOW, message)
+
+    def error(self, message: str) -> None:
+        """Counts the error and writes it to error_stream at once, after any buffered lines."""
+        self.count("errors")
+        if LEVELS["error"] < self.level:
+            return
+        self.flush()
+        self.error_stream.write(f"{colours.RED}{message}{colours.RESET}\n")
+        self.error_stream.flush()
+
+    def count(self, key: str, amount: int = 1) -> None:
+        """Adds amount to the named summary counter."""
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def progress(self, files: int = 1, num_bytes: int = 0) -> None:
+        """
+        Records processed files/bytes and redraws the progress line at most every progress_interval.
+
+        :param files: Number of files completed since the last call.
+        :param num_bytes: Number of bytes processed since the last call.
+        """
+        self.files += files
+        self.bytes += num_bytes
+        now = time.monotonic()
+        if not self.show_progress or now - self._last_progress < self.progress_interval:
+            return
+        self._last_progress = now
+        self.flush()
+        self.stream.write(f"\r\033[K{colours.CYAN}{self._rate_line(now)}{colours.RESET}")
+        self.stream.flush()
+        self._progress_visible = True
+
+    def _rate_line(self, now: float) -> str:
+        elapsed = max(now - self.start_time, 1e-9)
+        if not self.bytes:
+            return f"[{self.name}] {self.files} files ({self.files / elapsed:.1f} files/s)"
+        return (f"[{self.name}] {self.files} files, {format_bytes(self.bytes)} "
+                f"({self.files / elapsed:.1f} files/s, {format_bytes(self.bytes / elapsed)}/s)")
+
+    def flush(self) -> None:
+        """Writes buffered lines, clearing the progress line first if one is showing."""
+        if self._progress_visible:
+            self.stream.write("\r\033[K")
+            self._progress_visible = False
+        if self._buffer:
+            self.stream.write("\n".join(self._buffer) + "\n")
+            self._buffer = []
+        self.stream.flush()
+        self._last_flush = time.monotonic()
+
+    def summary(self) -> None:
+        """Prints the final rate line and all counters, then flushes."""
+        now = time.monotonic()
+        self._buffer.append(f"{colours.GREEN}{self._rate_line(now)} in {now - self.start_time:.1f}s{colours.RESET}")
+        for key, value in sorted(self.counters.items()):
+            self._buffer.append(f"{colours.CYAN}  {key}: {value}{colours.RESET}")
+        self.flush()
@@ -7,6 +7,10 @@ import string # For checking printable characters
 import argparse
 from pathlib import Path
 import gc
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[4]))
+from fastwalk import walk_files
 
 # --- Configuration ---
 DEFAULT_HEADER_SIZE = 64       # Bytes to consider for header comparison
@@ -56,10 +60,8 @@ def find_bsp_files(start_dir):
     """Recursively finds all files ending with .bsp (case-insensitive)."""
     bsp_files = []
     print(f"[*] Searching for .bsp files in: {start_dir}")
-    for root, _, files in os.walk(start_dir):
-        for file in files:
-            if file.lower().endswith(".bsp"):
-                bsp_files.append(os.path.join(root, file))
+    for entry in walk_files(start_dir, ".bsp"):
+        bsp_files.append(entry.path)
     print(f"[+] Found {len(bsp_files)} .bsp files.")
     return bsp_files
 
@@ -1,10 +1,16 @@
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from fastwalk import walk
 
 def asset_pattern_stats(root_dir):
     rws_notexpected = rws_total = rws_matched = rws_ps3 = 0
     dff_notexpected = dff_total = dff_matched = dff_ps3 = 0
 
-    for dirpath, _, filenames in os.walk(root_dir):
+    # Only .ps3 files (which includes .hkt.ps3/.hko.ps3) and .preinstanced models matter here
+    for dirpath, entries in walk(root_dir, (".ps3", ".preinstanced")):
+        filenames = [entry.name for entry in entries]
         # Normalize filenames to lowercase for consistent matching
         files_lower = [f.lower() for f in filenames]
 